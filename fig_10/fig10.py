@@ -22,6 +22,10 @@ import landlab
 from landlab.plot import imshow_grid
 from landlab import RasterModelGrid
 from landlab.io.esri_ascii import read_esri_ascii
+import sys
+#the raster cache lives with the model code
+sys.path.append('../model_simulations')
+from raster_cache import read_raster
 import seaborn as sbn
 import matplotlib as mpl
 from matplotlib import cm
@@ -30,41 +34,41 @@ from mycolorpy import colorlist as mcp
 ################import results of model runs: post-run topography for each scenario and watershed
 
 #ben creek
-mg_pre_control, bc_z_pre_control = read_esri_ascii('../model_simulations/bencreek/bencreek_pre_10m.asc', name='topographic__elevation')
+mg_pre_control, bc_z_pre_control = read_raster('../model_simulations/bencreek/bencreek_pre_10m.asc', name='topographic__elevation')
 np.all(mg_pre_control.at_node['topographic__elevation'] == bc_z_pre_control)
 bc_z_pre_control[bc_z_pre_control < 1] = -9999
 
-mg_mod, bc_z_mod_control = read_esri_ascii('../model_simulations/bencreek/control_unmined_elev_01.asc', name='topographic__elevation')
+mg_mod, bc_z_mod_control = read_raster('../model_simulations/bencreek/control_unmined_elev_01.asc', name='topographic__elevation')
 np.all(mg_mod.at_node['topographic__elevation'] == bc_z_mod_control)
 bc_z_mod_control[bc_z_mod_control < 1] = -9999
 bc_diff_control = bc_z_mod_control - bc_z_pre_control
 bc_diff_control = bc_diff_control[bc_diff_control > -9999]
 
-mg_post, bc_z_post = read_esri_ascii('../model_simulations/bencreek/bencreek_post_10m.asc', name='topographic__elevation')
+mg_post, bc_z_post = read_raster('../model_simulations/bencreek/bencreek_post_10m.asc', name='topographic__elevation')
 np.all(mg_post.at_node['topographic__elevation'] == bc_z_post)
 bc_z_post[bc_z_post < 1] = -9999
 
-mg_mod, bc_z_mod_0 = read_esri_ascii('../model_simulations/bencreek/scenario_0_elev_01.asc', name='topographic__elevation')
+mg_mod, bc_z_mod_0 = read_raster('../model_simulations/bencreek/scenario_0_elev_01.asc', name='topographic__elevation')
 np.all(mg_mod.at_node['topographic__elevation'] == bc_z_mod_0)
 bc_z_mod_0[bc_z_mod_0 < 1] = -9999
 bc_diff_0 = bc_z_mod_0 - bc_z_post
 bc_diff_0 = bc_diff_0[bc_diff_0 > -9999]
 
 
-mg_mod, bc_z_mod_5 = read_esri_ascii('../model_simulations/bencreek/scenario_5_elev_01.asc', name='topographic__elevation')
+mg_mod, bc_z_mod_5 = read_raster('../model_simulations/bencreek/scenario_5_elev_01.asc', name='topographic__elevation')
 np.all(mg_mod.at_node['topographic__elevation'] == bc_z_mod_5)
 bc_z_mod_5[bc_z_mod_5 < 1] = -9999
 bc_diff_5 = bc_z_mod_5 - bc_z_post
 bc_diff_5 = bc_diff_5[bc_diff_5 > -9999]
 
 
-mg_mod, bc_z_mod_10 = read_esri_ascii('../model_simulations/bencreek/scenario_10_elev_01.asc', name='topographic__elevation')
+mg_mod, bc_z_mod_10 = read_raster('../model_simulations/bencreek/scenario_10_elev_01.asc', name='topographic__elevation')
 np.all(mg_mod.at_node['topographic__elevation'] == bc_z_mod_10)
 bc_z_mod_10[bc_z_mod_10 < 1] = -9999
 bc_diff_10 = bc_z_mod_10 - bc_z_post
 bc_diff_10 = bc_diff_10[bc_diff_10 > -9999]
 
-mg_mod, bc_z_mod_control_mined = read_esri_ascii('../model_simulations/bencreek/control_mined_elev_01.asc', name='topographic__elevation')
+mg_mod, bc_z_mod_control_mined = read_raster('../model_simulations/bencreek/control_mined_elev_01.asc', name='topographic__elevation')
 np.all(mg_mod.at_node['topographic__elevation'] == bc_z_mod_control_mined)
 bc_z_mod_control_mined[bc_z_mod_control_mined < 1] = -9999
 bc_diff_control_mined = bc_z_mod_control_mined - bc_z_post
@@ -72,39 +76,39 @@ bc_diff_control_mined = bc_diff_control_mined[bc_diff_control_mined > -9999]
 
 
 #laurel creek
-mg_pre_control, lc_z_pre_control = read_esri_ascii('../model_simulations/laurelcreek/laurelcreek_pre_10m.asc', name='topographic__elevation')
+mg_pre_control, lc_z_pre_control = read_raster('../model_simulations/laurelcreek/laurelcreek_pre_10m.asc', name='topographic__elevation')
 np.all(mg_pre_control.at_node['topographic__elevation'] == lc_z_pre_control)
 lc_z_pre_control[lc_z_pre_control < 1] = -9999
 
-mg_mod, lc_z_mod_control = read_esri_ascii('../model_simulations/laurelcreek/control_unmined_elev_01.asc', name='topographic__elevation')
+mg_mod, lc_z_mod_control = read_raster('../model_simulations/laurelcreek/control_unmined_elev_01.asc', name='topographic__elevation')
 np.all(mg_mod.at_node['topographic__elevation'] == lc_z_mod_control)
 lc_z_mod_control[lc_z_mod_control < 1] = -9999
 lc_diff_control = lc_z_mod_control - lc_z_pre_control
 lc_diff_control = lc_diff_control[lc_diff_control > -9999]
 
-mg_post, lc_z_post = read_esri_ascii('../model_simulations/laurelcreek/laurelcreek_post_10m.asc', name='topographic__elevation')
+mg_post, lc_z_post = read_raster('../model_simulations/laurelcreek/laurelcreek_post_10m.asc', name='topographic__elevation')
 np.all(mg_post.at_node['topographic__elevation'] == lc_z_post)
 lc_z_post[lc_z_post < 1] = -9999
 
-mg_mod, lc_z_mod_0 = read_esri_ascii('../model_simulations/laurelcreek/scenario_0_elev_01.asc', name='topographic__elevation')
+mg_mod, lc_z_mod_0 = read_raster('../model_simulations/laurelcreek/scenario_0_elev_01.asc', name='topographic__elevation')
 np.all(mg_mod.at_node['topographic__elevation'] == lc_z_mod_0)
 lc_z_mod_0[lc_z_mod_0 < 1] = -9999
 lc_diff_0 = lc_z_mod_0 - lc_z_post
 lc_diff_0 = lc_diff_0[lc_diff_0 > -9999]
 
-mg_mod, lc_z_mod_5 = read_esri_ascii('../model_simulations/laurelcreek/scenario_5_elev_01.asc', name='topographic__elevation')
+mg_mod, lc_z_mod_5 = read_raster('../model_simulations/laurelcreek/scenario_5_elev_01.asc', name='topographic__elevation')
 np.all(mg_mod.at_node['topographic__elevation'] == lc_z_mod_5)
 lc_z_mod_5[lc_z_mod_5 < 1] = -9999
 lc_diff_5 = lc_z_mod_5 - lc_z_post
 lc_diff_5 = lc_diff_5[lc_diff_5 > -9999]
 
-mg_mod, lc_z_mod_10 = read_esri_ascii('../model_simulations/laurelcreek/scenario_10_elev_01.asc', name='topographic__elevation')
+mg_mod, lc_z_mod_10 = read_raster('../model_simulations/laurelcreek/scenario_10_elev_01.asc', name='topographic__elevation')
 np.all(mg_mod.at_node['topographic__elevation'] == lc_z_mod_10)
 lc_z_mod_10[lc_z_mod_10 < 1] = -9999
 lc_diff_10 = lc_z_mod_10 - lc_z_post
 lc_diff_10 = lc_diff_10[lc_diff_10 > -9999]
 
-mg_mod, lc_z_mod_control_mined = read_esri_ascii('../model_simulations/laurelcreek/control_mined_elev_01.asc', name='topographic__elevation')
+mg_mod, lc_z_mod_control_mined = read_raster('../model_simulations/laurelcreek/control_mined_elev_01.asc', name='topographic__elevation')
 np.all(mg_mod.at_node['topographic__elevation'] == lc_z_mod_control_mined)
 lc_z_mod_control_mined[lc_z_mod_control_mined < 1] = -9999
 lc_diff_control_mined = lc_z_mod_control_mined - lc_z_post
@@ -112,39 +116,39 @@ lc_diff_control_mined = lc_diff_control_mined[lc_diff_control_mined > -9999]
 
 
 #mud river
-mg_pre_control, mr_z_pre_control = read_esri_ascii('../model_simulations/mudriver/mudriver_pre_10m.asc', name='topographic__elevation')
+mg_pre_control, mr_z_pre_control = read_raster('../model_simulations/mudriver/mudriver_pre_10m.asc', name='topographic__elevation')
 np.all(mg_pre_control.at_node['topographic__elevation'] == mr_z_pre_control)
 mr_z_pre_control[mr_z_pre_control < 1] = -9999
 
-mg_mod, mr_z_mod_control = read_esri_ascii('../model_simulations/mudriver/control_unmined_elev_01.asc', name='topographic__elevation')
+mg_mod, mr_z_mod_control = read_raster('../model_simulations/mudriver/control_unmined_elev_01.asc', name='topographic__elevation')
 np.all(mg_mod.at_node['topographic__elevation'] == mr_z_mod_control)
 mr_z_mod_control[mr_z_mod_control < 1] = -9999
 mr_diff_control = mr_z_mod_control - mr_z_pre_control
 mr_diff_control = mr_diff_control[mr_diff_control > -9999]
 
-mg_post, mr_z_post = read_esri_ascii('../model_simulations/mudriver/mudriver_post_10m.asc', name='topographic__elevation')
+mg_post, mr_z_post = read_raster('../model_simulations/mudriver/mudriver_post_10m.asc', name='topographic__elevation')
 np.all(mg_post.at_node['topographic__elevation'] == mr_z_post)
 mr_z_post[mr_z_post < 1] = -9999
 
-mg_mod, mr_z_mod_0 = read_esri_ascii('../model_simulations/mudriver/scenario_0_elev_01.asc', name='topographic__elevation')
+mg_mod, mr_z_mod_0 = read_raster('../model_simulations/mudriver/scenario_0_elev_01.asc', name='topographic__elevation')
 np.all(mg_mod.at_node['topographic__elevation'] == mr_z_mod_0)
 mr_z_mod_0[mr_z_mod_0 < 1] = -9999
 mr_diff_0 = mr_z_mod_0 - mr_z_post
 mr_diff_0 = mr_diff_0[mr_diff_0 > -9999]
 
-mg_mod, mr_z_mod_5 = read_esri_ascii('../model_simulations/mudriver/scenario_5_elev_01.asc', name='topographic__elevation')
+mg_mod, mr_z_mod_5 = read_raster('../model_simulations/mudriver/scenario_5_elev_01.asc', name='topographic__elevation')
 np.all(mg_mod.at_node['topographic__elevation'] == mr_z_mod_5)
 mr_z_mod_5[mr_z_mod_5 < 1] = -9999
 mr_diff_5 = mr_z_mod_5 - mr_z_post
 mr_diff_5 = mr_diff_5[mr_diff_5 > -9999]
 
-mg_mod, mr_z_mod_10 = read_esri_ascii('../model_simulations/mudriver/scenario_10_elev_01.asc', name='topographic__elevation')
+mg_mod, mr_z_mod_10 = read_raster('../model_simulations/mudriver/scenario_10_elev_01.asc', name='topographic__elevation')
 np.all(mg_mod.at_node['topographic__elevation'] == mr_z_mod_10)
 mr_z_mod_10[mr_z_mod_10 < 1] = -9999
 mr_diff_10 = mr_z_mod_10 - mr_z_post
 mr_diff_10 = mr_diff_10[mr_diff_10 > -9999]
 
-mg_mod, mr_z_mod_control_mined = read_esri_ascii('../model_simulations/mudriver/control_mined_elev_01.asc', name='topographic__elevation')
+mg_mod, mr_z_mod_control_mined = read_raster('../model_simulations/mudriver/control_mined_elev_01.asc', name='topographic__elevation')
 np.all(mg_mod.at_node['topographic__elevation'] == mr_z_mod_control_mined)
 mr_z_mod_control_mined[mr_z_mod_control_mined < 1] = -9999
 mr_diff_control_mined = mr_z_mod_control_mined - mr_z_post
@@ -152,39 +156,39 @@ mr_diff_control_mined = mr_diff_control_mined[mr_diff_control_mined > -9999]
 
 
 #spruce fork
-mg_pre_control, sf_z_pre_control = read_esri_ascii('../model_simulations/sprucefork/sprucefork_pre_10m.asc', name='topographic__elevation')
+mg_pre_control, sf_z_pre_control = read_raster('../model_simulations/sprucefork/sprucefork_pre_10m.asc', name='topographic__elevation')
 np.all(mg_pre_control.at_node['topographic__elevation'] == sf_z_pre_control)
 sf_z_pre_control[sf_z_pre_control < 1] = -9999
 
-mg_mod, sf_z_mod_control = read_esri_ascii('../model_simulations/sprucefork/control_unmined_elev_01.asc', name='topographic__elevation')
+mg_mod, sf_z_mod_control = read_raster('../model_simulations/sprucefork/control_unmined_elev_01.asc', name='topographic__elevation')
 np.all(mg_mod.at_node['topographic__elevation'] == sf_z_mod_control)
 sf_z_mod_control[sf_z_mod_control < 1] = -9999
 sf_diff_control = sf_z_mod_control - sf_z_pre_control
 sf_diff_control = sf_diff_control[sf_diff_control > -9999]
 
-mg_post, sf_z_post = read_esri_ascii('../model_simulations/sprucefork/sprucefork_post_10m.asc', name='topographic__elevation')
+mg_post, sf_z_post = read_raster('../model_simulations/sprucefork/sprucefork_post_10m.asc', name='topographic__elevation')
 np.all(mg_post.at_node['topographic__elevation'] == sf_z_post)
 sf_z_post[sf_z_post < 1] = -9999
 
-mg_mod, sf_z_mod_0 = read_esri_ascii('../model_simulations/sprucefork/scenario_0_elev_01.asc', name='topographic__elevation')
+mg_mod, sf_z_mod_0 = read_raster('../model_simulations/sprucefork/scenario_0_elev_01.asc', name='topographic__elevation')
 np.all(mg_mod.at_node['topographic__elevation'] == sf_z_mod_0)
 sf_z_mod_0[sf_z_mod_0 < 1] = -9999
 sf_diff_0 = sf_z_mod_0 - sf_z_post
 sf_diff_0 = sf_diff_0[sf_diff_0 > -9999]
 
-mg_mod, sf_z_mod_5 = read_esri_ascii('../model_simulations/sprucefork/scenario_5_elev_01.asc', name='topographic__elevation')
+mg_mod, sf_z_mod_5 = read_raster('../model_simulations/sprucefork/scenario_5_elev_01.asc', name='topographic__elevation')
 np.all(mg_mod.at_node['topographic__elevation'] == sf_z_mod_5)
 sf_z_mod_5[sf_z_mod_5 < 1] = -9999
 sf_diff_5 = sf_z_mod_5 - sf_z_post
 sf_diff_5 = sf_diff_5[sf_diff_5 > -9999]
 
-mg_mod, sf_z_mod_10 = read_esri_ascii('../model_simulations/sprucefork/scenario_10_elev_01.asc', name='topographic__elevation')
+mg_mod, sf_z_mod_10 = read_raster('../model_simulations/sprucefork/scenario_10_elev_01.asc', name='topographic__elevation')
 np.all(mg_mod.at_node['topographic__elevation'] == sf_z_mod_10)
 sf_z_mod_10[sf_z_mod_10 < 1] = -9999
 sf_diff_10 = sf_z_mod_10 - sf_z_post
 sf_diff_10 = sf_diff_10[sf_diff_10 > -9999]
 
-mg_mod, sf_z_mod_control_mined = read_esri_ascii('../model_simulations/sprucefork/control_mined_elev_01.asc', name='topographic__elevation')
+mg_mod, sf_z_mod_control_mined = read_raster('../model_simulations/sprucefork/control_mined_elev_01.asc', name='topographic__elevation')
 np.all(mg_mod.at_node['topographic__elevation'] == sf_z_mod_control_mined)
 sf_z_mod_control_mined[sf_z_mod_control_mined < 1] = -9999
 sf_diff_control_mined = sf_z_mod_control_mined - sf_z_post
@@ -192,39 +196,39 @@ sf_diff_control_mined = sf_diff_control_mined[sf_diff_control_mined > -9999]
 
 
 #white oak creek
-mg_pre_control, wo_z_pre_control = read_esri_ascii('../model_simulations/whiteoak/whiteoak_pre_10m.asc', name='topographic__elevation')
+mg_pre_control, wo_z_pre_control = read_raster('../model_simulations/whiteoak/whiteoak_pre_10m.asc', name='topographic__elevation')
 np.all(mg_pre_control.at_node['topographic__elevation'] == wo_z_pre_control)
 wo_z_pre_control[wo_z_pre_control < 1] = -9999
 
-mg_mod, wo_z_mod_control = read_esri_ascii('../model_simulations/whiteoak/control_unmined_elev_01.asc', name='topographic__elevation')
+mg_mod, wo_z_mod_control = read_raster('../model_simulations/whiteoak/control_unmined_elev_01.asc', name='topographic__elevation')
 np.all(mg_mod.at_node['topographic__elevation'] == wo_z_mod_control)
 wo_z_mod_control[wo_z_mod_control < 1] = -9999
 wo_diff_control = wo_z_mod_control - wo_z_pre_control
 wo_diff_control = wo_diff_control[wo_diff_control > -9999]
 
-mg_post, wo_z_post = read_esri_ascii('../model_simulations/whiteoak/whiteoak_post_10m.asc', name='topographic__elevation')
+mg_post, wo_z_post = read_raster('../model_simulations/whiteoak/whiteoak_post_10m.asc', name='topographic__elevation')
 np.all(mg_post.at_node['topographic__elevation'] == wo_z_post)
 wo_z_post[wo_z_post < 1] = -9999
 
-mg_mod, wo_z_mod_0 = read_esri_ascii('../model_simulations/whiteoak/scenario_0_elev_01.asc', name='topographic__elevation')
+mg_mod, wo_z_mod_0 = read_raster('../model_simulations/whiteoak/scenario_0_elev_01.asc', name='topographic__elevation')
 np.all(mg_mod.at_node['topographic__elevation'] == wo_z_mod_0)
 wo_z_mod_0[wo_z_mod_0 < 1] = -9999
 wo_diff_0 = wo_z_mod_0 - wo_z_post
 wo_diff_0 = wo_diff_0[wo_diff_0 > -9999]
 
-mg_mod, wo_z_mod_5 = read_esri_ascii('../model_simulations/whiteoak/scenario_5_elev_01.asc', name='topographic__elevation')
+mg_mod, wo_z_mod_5 = read_raster('../model_simulations/whiteoak/scenario_5_elev_01.asc', name='topographic__elevation')
 np.all(mg_mod.at_node['topographic__elevation'] == wo_z_mod_5)
 wo_z_mod_5[wo_z_mod_5 < 1] = -9999
 wo_diff_5 = wo_z_mod_5 - wo_z_post
 wo_diff_5 = wo_diff_5[wo_diff_5 > -9999]
 
-mg_mod, wo_z_mod_10 = read_esri_ascii('../model_simulations/whiteoak/scenario_10_elev_01.asc', name='topographic__elevation')
+mg_mod, wo_z_mod_10 = read_raster('../model_simulations/whiteoak/scenario_10_elev_01.asc', name='topographic__elevation')
 np.all(mg_mod.at_node['topographic__elevation'] == wo_z_mod_10)
 wo_z_mod_10[wo_z_mod_10 < 1] = -9999
 wo_diff_10 = wo_z_mod_10 - wo_z_post
 wo_diff_10 = wo_diff_10[wo_diff_10 > -9999]
 
-mg_mod, wo_z_mod_control_mined = read_esri_ascii('../model_simulations/whiteoak/control_mined_elev_01.asc', name='topographic__elevation')
+mg_mod, wo_z_mod_control_mined = read_raster('../model_simulations/whiteoak/control_mined_elev_01.asc', name='topographic__elevation')
 np.all(mg_mod.at_node['topographic__elevation'] == wo_z_mod_control_mined)
 wo_z_mod_control_mined[wo_z_mod_control_mined < 1] = -9999
 wo_diff_control_mined = wo_z_mod_control_mined - wo_z_post
@@ -22,6 +22,10 @@ import seaborn as sbn
 from landlab.plot import imshow_grid
 from landlab import RasterModelGrid
 from landlab.io.esri_ascii import read_esri_ascii
+import sys
+#the raster cache lives with the model code
+sys.path.append('../model_simulations')
+from raster_cache import read_raster
 from landlab.components import (PriorityFloodFlowRouter,
                                 DepressionFinderAndRouter,
                                 FlowAccumulator
@@ -33,7 +37,7 @@ input_path = '../model_simulations/'
 
 ###########calculate morphometrics for White Oak Creek
 #PRE
-wo_mg_pre, wo_z_pre = read_esri_ascii(input_path+'whiteoak/inputs/whiteoak_pre_10m.asc', name='topographic__elevation')
+wo_mg_pre, wo_z_pre = read_raster(input_path+'whiteoak/inputs/whiteoak_pre_10m.asc', name='topographic__elevation')
 np.all(wo_mg_pre.at_node['topographic__elevation'] == wo_z_pre)
 wo_z_pre[wo_z_pre < 1] = -9999
 wo_mg_pre.set_closed_boundaries_at_grid_edges(True,True,True,True)
@@ -44,7 +48,7 @@ wo_df_pre = DepressionFinderAndRouter(wo_mg_pre)
 wo_fa_pre = PriorityFloodFlowRouter(wo_mg_pre,'topographic__elevation',flow_metric = 'D8')
 
 #POST
-wo_mg_post, wo_z_post = read_esri_ascii(input_path+'whiteoak/inputs/whiteoak_post_10m.asc', name='topographic__elevation')
+wo_mg_post, wo_z_post = read_raster(input_path+'whiteoak/inputs/whiteoak_post_10m.asc', name='topographic__elevation')
 np.all(wo_mg_post.at_node['topographic__elevation'] == wo_z_post)
 wo_z_post[wo_z_post < 1] = -9999
 wo_mg_post.set_closed_boundaries_at_grid_edges(True,True,True,True)
@@ -73,7 +77,7 @@ wo_post_SA = wo_post_slope * wo_post_DA**0.5
 
 ###########calculate morphometrics for Laurel Creek
 #PRE
-lc_mg_pre, lc_z_pre = read_esri_ascii(input_path+'laurelcreek/inputs/laurelcreek_pre_10m.asc', name='topographic__elevation')
+lc_mg_pre, lc_z_pre = read_raster(input_path+'laurelcreek/inputs/laurelcreek_pre_10m.asc', name='topographic__elevation')
 np.all(lc_mg_pre.at_node['topographic__elevation'] == lc_z_pre)
 lc_z_pre[lc_z_pre < 1] = -9999
 lc_mg_pre.set_closed_boundaries_at_grid_edges(True,True,True,True)
@@ -84,7 +88,7 @@ lc_df_pre = DepressionFinderAndRouter(lc_mg_pre)
 lc_fa_pre = PriorityFloodFlowRouter(lc_mg_pre,'topographic__elevation',flow_metric = 'D8')
 
 #POST
-lc_mg_post, lc_z_post = read_esri_ascii(input_path+'laurelcreek/inputs/laurelcreek_post_10m.asc', name='topographic__elevation')
+lc_mg_post, lc_z_post = read_raster(input_path+'laurelcreek/inputs/laurelcreek_post_10m.asc', name='topographic__elevation')
 np.all(lc_mg_post.at_node['topographic__elevation'] == lc_z_post)
 lc_z_post[lc_z_post < 1] = -9999
 lc_mg_post.set_closed_boundaries_at_grid_edges(True,True,True,True)
@@ -113,7 +117,7 @@ lc_post_SA = lc_post_slope * lc_post_DA**0.5
 
 ###########calculate morphometrics for Mud River
 #PRE
-mr_mg_pre, mr_z_pre = read_esri_ascii(input_path+'mudriver/inputs/mudriver_pre_10m.asc', name='topographic__elevation')
+mr_mg_pre, mr_z_pre = read_raster(input_path+'mudriver/inputs/mudriver_pre_10m.asc', name='topographic__elevation')
 np.all(mr_mg_pre.at_node['topographic__elevation'] == mr_z_pre)
 mr_z_pre[mr_z_pre < 1] = -9999
 mr_mg_pre.set_closed_boundaries_at_grid_edges(True,True,True,True)
@@ -124,7 +128,7 @@ mr_df_pre = DepressionFinderAndRouter(mr_mg_pre)
 mr_fa_pre = PriorityFloodFlowRouter(mr_mg_pre,'topographic__elevation',flow_metric = 'D8')
 
 #POST
-mr_mg_post, mr_z_post = read_esri_ascii(input_path+'mudriver/inputs/mudriver_post_10m.asc', name='topographic__elevation')
+mr_mg_post, mr_z_post = read_raster(input_path+'mudriver/inputs/mudriver_post_10m.asc', name='topographic__elevation')
 np.all(mr_mg_post.at_node['topographic__elevation'] == mr_z_post)
 mr_z_post[mr_z_post < 1] = -9999
 mr_mg_post.set_closed_boundaries_at_grid_edges(True,True,True,True)
@@ -151,7 +155,7 @@ mr_post_SA = mr_post_slope * mr_post_DA**0.5
 
 ###########calculate morphometrics for Spruce Fork
 #PRE
-sf_mg_pre, sf_z_pre = read_esri_ascii(input_path+'sprucefork/inputs/sprucefork_pre_10m.asc', name='topographic__elevation')
+sf_mg_pre, sf_z_pre = read_raster(input_path+'sprucefork/inputs/sprucefork_pre_10m.asc', name='topographic__elevation')
 np.all(sf_mg_pre.at_node['topographic__elevation'] == sf_z_pre)
 sf_z_pre[sf_z_pre < 1] = -9999
 sf_mg_pre.set_closed_boundaries_at_grid_edges(True,True,True,True)
@@ -162,7 +166,7 @@ sf_df_pre = DepressionFinderAndRouter(sf_mg_pre)
 sf_fa_pre = PriorityFloodFlowRouter(sf_mg_pre,'topographic__elevation',flow_metric = 'D8')
 
 #POST
-sf_mg_post, sf_z_post = read_esri_ascii(input_path+'sprucefork/inputs/sprucefork_post_10m.asc', name='topographic__elevation')
+sf_mg_post, sf_z_post = read_raster(input_path+'sprucefork/inputs/sprucefork_post_10m.asc', name='topographic__elevation')
 np.all(sf_mg_post.at_node['topographic__elevation'] == sf_z_post)
 sf_z_post[sf_z_post < 1] = -9999
 sf_mg_post.set_closed_boundaries_at_grid_edges(True,True,True,True)
@@ -190,7 +194,7 @@ sf_post_SA = sf_post_slope * sf_post_DA**0.5
 
 ###########calculate morphometrics for Ben Creek
 #PRE
-bc_mg_pre, bc_z_pre = read_esri_ascii(input_path+'bencreek/inputs/bencreek_pre_10m.asc', name='topographic__elevation')
+bc_mg_pre, bc_z_pre = read_raster(input_path+'bencreek/inputs/bencreek_pre_10m.asc', name='topographic__elevation')
 np.all(bc_mg_pre.at_node['topographic__elevation'] == bc_z_pre)
 bc_z_pre[bc_z_pre < 1] = -9999
 bc_mg_pre.set_closed_boundaries_at_grid_edges(True,True,True,True)
@@ -201,7 +205,7 @@ bc_df_pre = DepressionFinderAndRouter(bc_mg_pre)
 bc_fa_pre = PriorityFloodFlowRouter(bc_mg_pre,'topographic__elevation',flow_metric = 'D8')
 
 #POST
-bc_mg_post, bc_z_post = read_esri_ascii(input_path+'bencreek/inputs/bencreek_post_10m.asc', name='topographic__elevation')
+bc_mg_post, bc_z_post = read_raster(input_path+'bencreek/inputs/bencreek_post_10m.asc', name='topographic__elevation')
 np.all(bc_mg_post.at_node['topographic__elevation'] == bc_z_post)
 bc_z_post[bc_z_post < 1] = -9999
 bc_mg_post.set_closed_boundaries_at_grid_edges(True,True,True,True)
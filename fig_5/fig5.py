@@ -80,6 +80,9 @@ for i in range(0,len(per_rec_scale)):
     
 np.savetxt("K_timeseries_scaled.txt", K_ts)
 
+#the model scripts evaluate the same trajectories in closed form
+#(see ../model_simulations/k_trajectory.py)
+
 #############create figure showing time series of K
 import matplotlib
 from matplotlib import cm
@@ -17,90 +17,55 @@ import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib
+import sys
+#the run summaries are written by the model code
+sys.path.append('../model_simulations')
+from run_summary import read_run_summary
 
 cm = matplotlib.colormaps['plasma']
 
-###############import pre and post data
+###############import total sediment export
+
+#each run keeps its total export (sum of sediment flux * dt * cell area, in
+#m^3) in <run>summary.json as it goes (see ../model_simulations/run_summary.py),
+#so the pre and post DEMs don't need to be read and differenced here
+def sediment_export(watershed, run):
+    return read_run_summary('../model_simulations/%s/outputs/%s_summary.json' % (watershed, run))['exported_volume_m3']
 
 #mud river
-mr_mined_pre = np.loadtxt('../model_simulations/mud_river/inputs/mudriver_post_10m.asc', skiprows=6)
-mr0_post = np.loadtxt('../model_simulations/mud_river/outputs/scenario_0_elev_01.asc', skiprows=6)
-mr5_post = np.loadtxt('../model_simulations/mud_river/outputs/scenario_5_elev_01.asc', skiprows=6)
-mr10_post = np.loadtxt('../model_simulations/mud_river/outputs/scenario_10_elev_01.asc', skiprows=6)
-mr_ctrl_mined_post = np.loadtxt('../model_simulations/mud_river/outputs/control_mined_elev_01.asc', skiprows=6)
-mr_unmined_pre = np.loadtxt('../model_simulations/mud_river/inputs/mudriver_pre_10m.asc', skiprows=6)
-mr_ctrl_unmined_post = np.loadtxt('../model_simulations/mud_river/outputs/control_unmined_elev_01.asc', skiprows=6)
+mr0_diff = sediment_export('mud_river', 'scenario_0')
+mr5_diff = sediment_export('mud_river', 'scenario_5')
+mr10_diff = sediment_export('mud_river', 'scenario_10')
+mr_ctrl_mined_diff = sediment_export('mud_river', 'control_mined')
+mr_ctrl_unmined_diff = sediment_export('mud_river', 'control_unmined')
 
 #white oak creek
-wo_mined_pre = np.loadtxt('../model_simulations/white_oak/inputs/whiteoak_post_10m.asc', skiprows=6)
-wo0_post = np.loadtxt('../model_simulations/white_oak/outputs/scenario_0_elev_01.asc', skiprows=6)
-wo5_post = np.loadtxt('../model_simulations/white_oak/outputs/scenario_5_elev_01.asc', skiprows=6)
-wo10_post = np.loadtxt('../model_simulations/white_oak/outputs/scenario_10_elev_01.asc', skiprows=6)
-wo_ctrl_mined_post = np.loadtxt('../model_simulations/white_oak/outputs/control_mined_elev_01.asc', skiprows=6)
-wo_unmined_pre = np.loadtxt('../model_simulations/white_oak/inputs/whiteoak_pre_10m.asc', skiprows=6)
-wo_ctrl_unmined_post = np.loadtxt('../model_simulations/white_oak/outputs/control_unmined_elev_01.asc', skiprows=6)
+wo0_diff = sediment_export('white_oak', 'scenario_0')
+wo5_diff = sediment_export('white_oak', 'scenario_5')
+wo10_diff = sediment_export('white_oak', 'scenario_10')
+wo_ctrl_mined_diff = sediment_export('white_oak', 'control_mined')
+wo_ctrl_unmined_diff = sediment_export('white_oak', 'control_unmined')
 
 #ben creek
-bc_mined_pre = np.loadtxt('../model_simulations/ben_creek/inputs/bencreek_post_10m.asc', skiprows=6)
-bc0_post = np.loadtxt('../model_simulations/ben_creek/outputs/scenario_0_elev_01.asc', skiprows=6)
-bc5_post = np.loadtxt('../model_simulations/ben_creek/outputs/scenario_5_elev_01.asc', skiprows=6)
-bc10_post = np.loadtxt('../model_simulations/ben_creek/outputs/scenario_10_elev_01.asc', skiprows=6)
-bc_ctrl_mined_post = np.loadtxt('../model_simulations/ben_creek/outputs/control_mined_elev_01.asc', skiprows=6)
-bc_unmined_pre = np.loadtxt('../model_simulations/ben_creek/inputs/bencreek_pre_10m.asc', skiprows=6)
-bc_ctrl_unmined_post = np.loadtxt('../model_simulations/ben_creek/outputs/control_unmined_elev_01.asc', skiprows=6)
+bc0_diff = sediment_export('ben_creek', 'scenario_0')
+bc5_diff = sediment_export('ben_creek', 'scenario_5')
+bc10_diff = sediment_export('ben_creek', 'scenario_10')
+bc_ctrl_mined_diff = sediment_export('ben_creek', 'control_mined')
+bc_ctrl_unmined_diff = sediment_export('ben_creek', 'control_unmined')
 
 #laurel creek
-lc_mined_pre = np.loadtxt('../model_simulations/laurel_creek/inputs/laurelcreek_post_10m.asc', skiprows=6)
-lc0_post = np.loadtxt('../model_simulations/laurel_creek/outputs/scenario_0_elev_01.asc', skiprows=6)
-lc5_post = np.loadtxt('../model_simulations/laurel_creek/outputs/scenario_5_elev_01.asc', skiprows=6)
-lc10_post = np.loadtxt('../model_simulations/laurel_creek/outputs/scenario_10_elev_01.asc', skiprows=6)
-lc_ctrl_mined_post = np.loadtxt('../model_simulations/laurel_creek/outputs/control_mined_elev_01.asc', skiprows=6)
-lc_unmined_pre = np.loadtxt('../model_simulations/laurel_creek/inputs/laurelcreek_pre_10m.asc', skiprows=6)
-lc_ctrl_unmined_post = np.loadtxt('../model_simulations/laurel_creek/outputs/control_unmined_elev_01.asc', skiprows=6)
+lc0_diff = sediment_export('laurel_creek', 'scenario_0')
+lc5_diff = sediment_export('laurel_creek', 'scenario_5')
+lc10_diff = sediment_export('laurel_creek', 'scenario_10')
+lc_ctrl_mined_diff = sediment_export('laurel_creek', 'control_mined')
+lc_ctrl_unmined_diff = sediment_export('laurel_creek', 'control_unmined')
 
 #spruce fork
-sf_mined_pre = np.loadtxt('../model_simulations/spruce_fork/inputs/sprucefork_fixed_post_10m.asc', skiprows=6)
-sf0_post = np.loadtxt('../model_simulations/spruce_fork/outputs/scenario_0_elev_01.asc', skiprows=6)
-sf5_post = np.loadtxt('../model_simulations/spruce_fork/outputs/scenario_5_elev_01.asc', skiprows=6)
-sf10_post = np.loadtxt('../model_simulations/spruce_fork/outputs/scenario_10_elev_01.asc', skiprows=6)
-sf_ctrl_mined_post = np.loadtxt('../model_simulations/spruce_fork/outputs/control_mined_elev_01.asc', skiprows=6)
-sf_unmined_pre = np.loadtxt('../model_simulations/spruce_fork/inputs/sprucefork_fixed_pre_10m.asc', skiprows=6)
-sf_ctrl_unmined_post = np.loadtxt('../model_simulations/spruce_fork/outputs/control_unmined_elev_01.asc', skiprows=6)
-
-
-#take the volumetric topographic difference between beginning and end of each run
-
-cellsize = 100 #m^2
-
-mr0_diff = np.sum(mr_mined_pre[1:] - mr0_post) * cellsize #pre for some reason has an extra line of NODATA
-mr5_diff = np.sum(mr_mined_pre[1:] - mr5_post) * cellsize
-mr10_diff = np.sum(mr_mined_pre[1:] - mr10_post) * cellsize
-mr_ctrl_mined_diff = np.sum(mr_mined_pre[1:] - mr_ctrl_mined_post) * cellsize
-mr_ctrl_unmined_diff = np.sum(mr_unmined_pre[1:] - mr_ctrl_unmined_post) * cellsize
-
-wo0_diff = np.sum(wo_mined_pre[1:] - wo0_post) * cellsize #pre for some reason has an extra line of NODATA
-wo5_diff = np.sum(wo_mined_pre[1:] - wo5_post) * cellsize
-wo10_diff = np.sum(wo_mined_pre[1:] - wo10_post) * cellsize
-wo_ctrl_mined_diff = np.sum(wo_mined_pre[1:] - wo_ctrl_mined_post) * cellsize
-wo_ctrl_unmined_diff = np.sum(wo_unmined_pre[1:] - wo_ctrl_unmined_post) * cellsize
-
-bc0_diff = np.sum(bc_mined_pre[1:] - bc0_post) * cellsize #pre for some reason has an extra line of NODATA
-bc5_diff = np.sum(bc_mined_pre[1:] - bc5_post) * cellsize
-bc10_diff = np.sum(bc_mined_pre[1:] - bc10_post) * cellsize
-bc_ctrl_mined_diff = np.sum(bc_mined_pre[1:] - bc_ctrl_mined_post) * cellsize
-bc_ctrl_unmined_diff = np.sum(bc_unmined_pre[1:] - bc_ctrl_unmined_post) * cellsize
-
-lc0_diff = np.sum(lc_mined_pre[1:] - lc0_post) * cellsize #pre for some reason has an extra line of NODATA
-lc5_diff = np.sum(lc_mined_pre[1:] - lc5_post) * cellsize
-lc10_diff = np.sum(lc_mined_pre[1:] - lc10_post) * cellsize
-lc_ctrl_mined_diff = np.sum(lc_mined_pre[1:] - lc_ctrl_mined_post) * cellsize
-lc_ctrl_unmined_diff = np.sum(lc_unmined_pre[1:] - lc_ctrl_unmined_post) * cellsize
-
-sf0_diff = np.sum(sf_mined_pre[1:] - sf0_post) * cellsize #pre for some reason has an extra line of NODATA
-sf5_diff = np.sum(sf_mined_pre[1:] - sf5_post) * cellsize
-sf10_diff = np.sum(sf_mined_pre[1:] - sf10_post) * cellsize
-sf_ctrl_mined_diff = np.sum(sf_mined_pre[1:] - sf_ctrl_mined_post) * cellsize
-sf_ctrl_unmined_diff = np.sum(sf_unmined_pre[1:] - sf_ctrl_unmined_post) * cellsize
+sf0_diff = sediment_export('spruce_fork', 'scenario_0')
+sf5_diff = sediment_export('spruce_fork', 'scenario_5')
+sf10_diff = sediment_export('spruce_fork', 'scenario_10')
+sf_ctrl_mined_diff = sediment_export('spruce_fork', 'control_mined')
+sf_ctrl_unmined_diff = sediment_export('spruce_fork', 'control_unmined')
 
 
 #prepare x labels
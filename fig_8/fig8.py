@@ -15,6 +15,9 @@
 import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib
+import sys
+sys.path.append('../model_simulations')
+from flux_log import read_flux_log
 
 cm = matplotlib.colormaps['plasma']
 
@@ -24,73 +27,51 @@ cm = matplotlib.colormaps['plasma']
 
 cellsize = 100 #m^3
 
+#each run's binary flux log (see ../model_simulations/flux_log.py) stores the
+#timestep of every entry, so Qs (vol/time) converts to the volume exported
+#in each step without assuming where the timestep changes
+def sediment_export(filename):
+    records = read_flux_log(filename)[1]
+    return records['flux'] * records['dt'] * cellsize
+
 #ben creek
-bc0 = np.genfromtxt('../model_simulations/ben_creek/outputs/scenario_0_sedflux.txt') * cellsize
-bc5 = np.genfromtxt('../model_simulations/ben_creek/outputs/scenario_5_sedflux.txt') * cellsize
-bc10 = np.genfromtxt('../model_simulations/ben_creek/outputs/scenario_10_sedflux.txt') * cellsize
-bc_control_mined = np.genfromtxt('../model_simulations/ben_creek/outputs/control_mined_sedflux.txt') * cellsize
-bc_control_unmined = np.genfromtxt('../model_simulations/ben_creek/outputs/control_unmined_sedflux.txt') * cellsize
+bc0 = sediment_export('../model_simulations/ben_creek/outputs/scenario_0_sedflux.bin')
+bc5 = sediment_export('../model_simulations/ben_creek/outputs/scenario_5_sedflux.bin')
+bc10 = sediment_export('../model_simulations/ben_creek/outputs/scenario_10_sedflux.bin')
+bc_control_mined = sediment_export('../model_simulations/ben_creek/outputs/control_mined_sedflux.bin')
+bc_control_unmined = sediment_export('../model_simulations/ben_creek/outputs/control_unmined_sedflux.bin')
 
 #mud river
-mr0 = np.genfromtxt('../model_simulations/mud_river/outputs/scenario_0_sedflux.txt') * cellsize
-mr5 = np.genfromtxt('../model_simulations/mud_river/outputs/scenario_5_sedflux.txt') * cellsize
-mr10 = np.genfromtxt('../model_simulations/mud_river/outputs/scenario_10_sedflux.txt') * cellsize
-mr_control_mined = np.genfromtxt('../model_simulations/mud_river/outputs/control_mined_sedflux.txt') * cellsize
-mr_control_unmined = np.genfromtxt('../model_simulations/mud_river/outputs/control_unmined_sedflux.txt') * cellsize
+mr0 = sediment_export('../model_simulations/mud_river/outputs/scenario_0_sedflux.bin')
+mr5 = sediment_export('../model_simulations/mud_river/outputs/scenario_5_sedflux.bin')
+mr10 = sediment_export('../model_simulations/mud_river/outputs/scenario_10_sedflux.bin')
+mr_control_mined = sediment_export('../model_simulations/mud_river/outputs/control_mined_sedflux.bin')
+mr_control_unmined = sediment_export('../model_simulations/mud_river/outputs/control_unmined_sedflux.bin')
 
 #laurel creek
-lc0 = np.genfromtxt('../model_simulations/laurel_creek/outputs/scenario_0_sedflux.txt') * cellsize
-lc5 = np.genfromtxt('../model_simulations/laurel_creek/outputs/scenario_5_sedflux.txt') * cellsize
-lc10 = np.genfromtxt('../model_simulations/laurel_creek/outputs/scenario_10_sedflux.txt') * cellsize
-lc_control_mined = np.genfromtxt('../model_simulations/laurel_creek/outputs/control_mined_sedflux.txt') * cellsize
-lc_control_unmined = np.genfromtxt('../model_simulations/laurel_creek/outputs/control_unmined_sedflux.txt') * cellsize
+lc0 = sediment_export('../model_simulations/laurel_creek/outputs/scenario_0_sedflux.bin')
+lc5 = sediment_export('../model_simulations/laurel_creek/outputs/scenario_5_sedflux.bin')
+lc10 = sediment_export('../model_simulations/laurel_creek/outputs/scenario_10_sedflux.bin')
+lc_control_mined = sediment_export('../model_simulations/laurel_creek/outputs/control_mined_sedflux.bin')
+lc_control_unmined = sediment_export('../model_simulations/laurel_creek/outputs/control_unmined_sedflux.bin')
 
 #spruce fork
-sf0 = np.genfromtxt('../model_simulations/spruce_fork/outputs/scenario_0_sedflux.txt') * cellsize
-sf5 = np.genfromtxt('../model_simulations/spruce_fork/outputs/scenario_5_sedflux.txt') * cellsize
-sf10 = np.genfromtxt('../model_simulations/spruce_fork/outputs/scenario_10_sedflux.txt') * cellsize
-sf_control_mined = np.genfromtxt('../model_simulations/spruce_fork/outputs/control_mined_sedflux.txt') * cellsize
-sf_control_unmined = np.genfromtxt('../model_simulations/spruce_fork/outputs/control_unmined_sedflux.txt') * cellsize
+sf0 = sediment_export('../model_simulations/spruce_fork/outputs/scenario_0_sedflux.bin')
+sf5 = sediment_export('../model_simulations/spruce_fork/outputs/scenario_5_sedflux.bin')
+sf10 = sediment_export('../model_simulations/spruce_fork/outputs/scenario_10_sedflux.bin')
+sf_control_mined = sediment_export('../model_simulations/spruce_fork/outputs/control_mined_sedflux.bin')
+sf_control_unmined = sediment_export('../model_simulations/spruce_fork/outputs/control_unmined_sedflux.bin')
 
 #white oak creek
-wo0 = np.genfromtxt('../model_simulations/white_oak/outputs/scenario_0_sedflux.txt') * cellsize
-wo5 = np.genfromtxt('../model_simulations/white_oak/outputs/scenario_5_sedflux.txt') * cellsize
-wo10 = np.genfromtxt('../model_simulations/white_oak/outputs/scenario_10_sedflux.txt') * cellsize
-wo_control_mined = np.genfromtxt('../model_simulations/white_oak/outputs/control_mined_sedflux.txt') * cellsize
-wo_control_unmined = np.genfromtxt('../model_simulations/white_oak/outputs/control_unmined_sedflux.txt') * cellsize
-
-#convert from Qs (vol/time) to total sed export (volume) by multiplying each entry by dt:
-#0-200 get multiplied by 0.5, 200 onward get multiplied by 1
-
-bc0[:400] *= 0.5
-bc5[:400] *= 0.5
-bc10[:400] *= 0.5
-bc_control_mined[:400] *= 0.5
-bc_control_unmined[:400] *= 0.5
-
-lc0[:400] *= 0.5
-lc5[:400] *= 0.5
-lc10[:400] *= 0.5
-lc_control_mined[:400] *= 0.5
-lc_control_unmined[:400] *= 0.5
-
-mr0[:400] *= 0.5
-mr5[:400] *= 0.5
-mr10[:400] *= 0.5
-mr_control_mined[:400] *= 0.5
-mr_control_unmined[:400] *= 0.5
-
-sf0[:400] *= 0.5
-sf5[:400] *= 0.5
-sf10[:400] *= 0.5
-sf_control_mined[:400] *= 0.5
-sf_control_unmined[:400] *= 0.5
-
-wo0[:400] *= 0.5
-wo5[:400] *= 0.5
-wo10[:400] *= 0.5
-wo_control_mined[:400] *= 0.5
-wo_control_unmined[:400] *= 0.5
+wo0 = sediment_export('../model_simulations/white_oak/outputs/scenario_0_sedflux.bin')
+wo5 = sediment_export('../model_simulations/white_oak/outputs/scenario_5_sedflux.bin')
+wo10 = sediment_export('../model_simulations/white_oak/outputs/scenario_10_sedflux.bin')
+wo_control_mined = sediment_export('../model_simulations/white_oak/outputs/control_mined_sedflux.bin')
+wo_control_unmined = sediment_export('../model_simulations/white_oak/outputs/control_unmined_sedflux.bin')
+
+#model time at the end of each step, the x axis of every plot (all of these
+#runs take the same steps)
+x_vals = read_flux_log('../model_simulations/mud_river/outputs/scenario_0_sedflux.bin')[1]['time']
 
 ###################make figure
 from matplotlib import gridspec
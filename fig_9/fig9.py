@@ -18,91 +18,95 @@
 import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib
+import sys
+sys.path.append('../model_simulations')
+from run_summary import read_run_summary
 
 cm = matplotlib.colormaps['plasma']
 
-#############import sediment flux record
-#NOTE: sediment flux record comes out of the model in units of L/T, so need
-#to multiply by grid cell size to get to L3/T
+#############import percent change in sediment flux
 
-cellsize = 100 #m^3
+#each run's <run>summary.json (see ../model_simulations/run_summary.py) has
+#the percent change of the flux from the step starting at year 200 to the
+#last step, kept as the run goes, so the flux records aren't read here
+def flux_change(watershed, run):
+    return read_run_summary('../model_simulations/%s/outputs/%s_summary.json' % (watershed, run))['flux_change_percent']['200-10000']
 
 #ben creek
-bc0 = np.genfromtxt('../model_simulations/ben_creek/outputs/scenario_0_sedflux.txt') * cellsize
-bc5 = np.genfromtxt('../model_simulations/ben_creek/outputs/scenario_5_sedflux.txt') * cellsize
-bc10 = np.genfromtxt('../model_simulations/ben_creek/outputs/scenario_10_sedflux.txt') * cellsize
-bc_control_mined = np.genfromtxt('../model_simulations/ben_creek/outputs/control_mined_sedflux.txt') * cellsize
-bc_control_unmined = np.genfromtxt('../model_simulations/ben_creek/outputs/control_unmined_sedflux.txt') * cellsize
+bc0 = flux_change('ben_creek', 'scenario_0')
+bc5 = flux_change('ben_creek', 'scenario_5')
+bc10 = flux_change('ben_creek', 'scenario_10')
+bc_control_mined = flux_change('ben_creek', 'control_mined')
+bc_control_unmined = flux_change('ben_creek', 'control_unmined')
 
 #mud river
-mr0 = np.genfromtxt('../model_simulations/mud_river/outputs/scenario_0_sedflux.txt') * cellsize
-mr5 = np.genfromtxt('../model_simulations/mud_river/outputs/scenario_5_sedflux.txt') * cellsize
-mr10 = np.genfromtxt('../model_simulations/mud_river/outputs/scenario_10_sedflux.txt') * cellsize
-mr_control_mined = np.genfromtxt('../model_simulations/mud_river/outputs/control_mined_sedflux.txt') * cellsize
-mr_control_unmined = np.genfromtxt('../model_simulations/mud_river/outputs/control_unmined_sedflux.txt') * cellsize
+mr0 = flux_change('mud_river', 'scenario_0')
+mr5 = flux_change('mud_river', 'scenario_5')
+mr10 = flux_change('mud_river', 'scenario_10')
+mr_control_mined = flux_change('mud_river', 'control_mined')
+mr_control_unmined = flux_change('mud_river', 'control_unmined')
 
 #laurel creek
-lc0 = np.genfromtxt('../model_simulations/laurel_creek/outputs/scenario_0_sedflux.txt') * cellsize
-lc5 = np.genfromtxt('../model_simulations/laurel_creek/outputs/scenario_5_sedflux.txt') * cellsize
-lc10 = np.genfromtxt('../model_simulations/laurel_creek/outputs/scenario_10_sedflux.txt') * cellsize
-lc_control_mined = np.genfromtxt('../model_simulations/laurel_creek/outputs/control_mined_sedflux.txt') * cellsize
-lc_control_unmined = np.genfromtxt('../model_simulations/laurel_creek/outputs/control_unmined_sedflux.txt') * cellsize
+lc0 = flux_change('laurel_creek', 'scenario_0')
+lc5 = flux_change('laurel_creek', 'scenario_5')
+lc10 = flux_change('laurel_creek', 'scenario_10')
+lc_control_mined = flux_change('laurel_creek', 'control_mined')
+lc_control_unmined = flux_change('laurel_creek', 'control_unmined')
 
 #spruce fork
-sf0 = np.genfromtxt('../model_simulations/spruce_fork/outputs/scenario_0_sedflux.txt') * cellsize
-sf5 = np.genfromtxt('../model_simulations/spruce_fork/outputs/scenario_5_sedflux.txt') * cellsize
-sf10 = np.genfromtxt('../model_simulations/spruce_fork/outputs/scenario_10_sedflux.txt') * cellsize
-sf_control_mined = np.genfromtxt('../model_simulations/spruce_fork/outputs/control_mined_sedflux.txt') * cellsize
-sf_control_unmined = np.genfromtxt('../model_simulations/spruce_fork/outputs/control_unmined_sedflux.txt') * cellsize
+sf0 = flux_change('spruce_fork', 'scenario_0')
+sf5 = flux_change('spruce_fork', 'scenario_5')
+sf10 = flux_change('spruce_fork', 'scenario_10')
+sf_control_mined = flux_change('spruce_fork', 'control_mined')
+sf_control_unmined = flux_change('spruce_fork', 'control_unmined')
 
 #white oak creek
-wo0 = np.genfromtxt('../model_simulations/white_oak/outputs/scenario_0_sedflux.txt') * cellsize
-wo5 = np.genfromtxt('../model_simulations/white_oak/outputs/scenario_5_sedflux.txt') * cellsize
-wo10 = np.genfromtxt('../model_simulations/white_oak/outputs/scenario_10_sedflux.txt') * cellsize
-wo_control_mined = np.genfromtxt('../model_simulations/white_oak/outputs/control_mined_sedflux.txt') * cellsize
-wo_control_unmined = np.genfromtxt('../model_simulations/white_oak/outputs/control_unmined_sedflux.txt') * cellsize
+wo0 = flux_change('white_oak', 'scenario_0')
+wo5 = flux_change('white_oak', 'scenario_5')
+wo10 = flux_change('white_oak', 'scenario_10')
+wo_control_mined = flux_change('white_oak', 'control_mined')
+wo_control_unmined = flux_change('white_oak', 'control_unmined')
 
 ####################make figure
 
 xvals = np.arange(5)
 
-#calculate percent change between year 200 (timestep 400 because we used dt = 0.5 for 
-#the first 200 years) and year 10,000 (timestep -1 in Python indexing)
+#percent change between year 200 and year 10,000 (the last step)
 #order: unmined, mined_ctrl, 0, 5, 10
-mr_arr_flux = np.array([(mr_control_unmined[-1] - mr_control_unmined[400]) / mr_control_unmined[400],
-                        (mr_control_mined[-1] - mr_control_mined[400]) / mr_control_mined[400],
-                        (mr10[-1] - mr10[400]) / mr10[400],
-                        (mr5[-1] - mr5[400]) / mr5[400],
-                        (mr0[-1] - mr0[400]) / mr0[400]
-                       ])*100
-
-wo_arr_flux = np.array([(wo_control_unmined[-1] - wo_control_unmined[400]) / wo_control_unmined[400],
-                        (wo_control_mined[-1] - wo_control_mined[400]) / wo_control_mined[400],
-                        (wo10[-1] - wo10[400]) / wo10[400],
-                        (wo5[-1] - wo5[400]) / wo5[400],
-                        (wo0[-1] - wo0[400]) / wo0[400]
-                       ])*100
-
-bc_arr_flux = np.array([(bc_control_unmined[-1] - bc_control_unmined[400]) / bc_control_unmined[400],
-                        (bc_control_mined[-1] - bc_control_mined[400]) / bc_control_mined[400],
-                        (bc10[-1] - bc10[400]) / bc10[400],
-                        (bc5[-1] - bc5[400]) / bc5[400],
-                        (bc0[-1] - bc0[400]) / bc0[400]
-                       ])*100
-
-lc_arr_flux = np.array([(lc_control_unmined[-1] - lc_control_unmined[400]) / lc_control_unmined[400],
-                        (lc_control_mined[-1] - lc_control_mined[400]) / lc_control_mined[400],
-                        (lc10[-1] - lc10[400]) / lc10[400],
-                        (lc5[-1] - lc5[400]) / lc5[400],
-                        (lc0[-1] - lc0[400]) / lc0[400]
-                       ])*100
-
-sf_arr_flux = np.array([(sf_control_unmined[-1] - sf_control_unmined[400]) / sf_control_unmined[400],
-                        (sf_control_mined[-1] - sf_control_mined[400]) / sf_control_mined[400],
-                        (sf10[-1] - sf10[400]) / sf10[400],
-                        (sf5[-1] - sf5[400]) / sf5[400],
-                        (sf0[-1] - sf0[400]) / sf0[400]
-                       ])*100
+mr_arr_flux = np.array([mr_control_unmined,
+                        mr_control_mined,
+                        mr10,
+                        mr5,
+                        mr0
+                       ])
+
+wo_arr_flux = np.array([wo_control_unmined,
+                        wo_control_mined,
+                        wo10,
+                        wo5,
+                        wo0
+                       ])
+
+bc_arr_flux = np.array([bc_control_unmined,
+                        bc_control_mined,
+                        bc10,
+                        bc5,
+                        bc0
+                       ])
+
+lc_arr_flux = np.array([lc_control_unmined,
+                        lc_control_mined,
+                        lc10,
+                        lc5,
+                        lc0
+                       ])
+
+sf_arr_flux = np.array([sf_control_unmined,
+                        sf_control_mined,
+                        sf10,
+                        sf5,
+                        sf0
+                       ])
 
 
 fig3,ax = plt.subplots(figsize=(4, 4))
@@ -10,8 +10,9 @@
 ######################################
 
 
-def landscape_evolution(scenario_id):
+def landscape_evolution(scenario_id, inputs = None):
     
+    import os
     import sys
     import time
     import copy
@@ -27,21 +28,51 @@ def landscape_evolution(scenario_id):
         LinearDiffuser,
         SpaceLargeScaleEroder,
         ChannelProfiler)
-    from scipy.signal import convolve2d
+    sys.path.append('..')
+    from erodibility import (
+        convolve_K_field,
+        precompute_K_convolution_weights,
+        outside_K,
+        convolved_erodibility,
+        yearly_K_grids)
+    from model_inputs import grid_from_inputs
+    from checkpoint import checkpoint_due, save_checkpoint, restore_checkpoint
+    from timestepping import diffusion_stability_limit, next_timestep
+    from hillslope import implicit_diffuser
+    from steady_state import flux_has_settled, extrapolate_flux
+    from flow_routing import routing_stage
+    from regions import region_index
+    from domain import watershed_crop, crop_grid, cropped_node_ids, save_field
+    from raster_cache import read_raster
+    from k_trajectory import k_trajectory, recovery_fraction, trajectory_series, trajectory_minimum
+    from flux_log import open_flux_log, write_flux_log, close_flux_log
+    from run_summary import open_run_summary, add_to_summary, write_run_summary
+    from snapshots import open_snapshot_cube, snapshot_due, add_snapshot
+    from result_cache import array_checksum, model_code_files, result_key, fetch_cached_run, store_run
+    from profiling import new_profile, start_step, lap, write_profile
+    from telemetry import open_progress, progress_due, report_progress, close_progress
 
     path = 'inputs/'
     output_path = '/scratch/cs00048/MTR/wsheds/ben_creek/outputs/'
     scenario_str = 'scenario_'+str(scenario_id)+'_'
     #load DEM
-    mg, z = read_esri_ascii(path+'bencreek_post_10m.asc', name='topographic__elevation')
+    #inputs can be passed in preloaded (see ../ensemble.py); otherwise read them from disk
+    if inputs is None:
+        mg, z = read_raster(path+'bencreek_post_10m.asc', name='topographic__elevation')
+    else:
+        mg, z = grid_from_inputs(inputs, 'post_dem', name='topographic__elevation')
     np.all(mg.at_node['topographic__elevation'] == z)
     mg.set_closed_boundaries_at_grid_edges(True,True,True,True)
     mg.set_nodata_nodes_to_closed(z, -99999)
     outlet_node = mg.set_watershed_boundary_condition(z,nodata_value = -99999,return_outlet_id=True)
     print('outlet: ' + str(outlet_node))
     #Load rasterized Skytruth data
-    k_array, ksp = read_esri_ascii(path+'BC_K_mask_edited.asc', name='k')
+    if inputs is None:
+        k_array, ksp = read_raster(path+'BC_K_mask_edited.asc', name='k')
+    else:
+        k_array, ksp = grid_from_inputs(inputs, 'K_mask', name='k')
     k_array.set_nodata_nodes_to_closed(ksp, -9999)
+    input_checksum = array_checksum(z, ksp) #identifies the inputs in the result cache
 
 
     _ = mg.add_zeros("soil__depth", at="node")
@@ -67,56 +98,113 @@ def landscape_evolution(scenario_id):
     sp_crit_br = 0
     BL_lowering_rate = 2.7e-5
     window_size = 9 #this is the total size of the moving window for K convolution
+    K_convolution_method = 'direct' #'direct' convolves the full K grid every timestep, 'precomputed' convolves the mined/unmined/outside masks once at startup
+    K_kernel = 'box' #shape of the K smoothing window: 'box', 'disk' or 'gaussian'
+    K_kernel_method = 'direct' #'direct' (dense convolve2d), 'separable', 'sat' (summed-area table), 'fft', or 'auto' to pick the cheapest for the kernel and window size
+    checkpoint_interval_years = None #write a restart checkpoint every this many model years (None to turn off)
+    checkpoint_interval_seconds = None #...and/or every this many seconds of wall-clock time
+    resume = True #continue from this run's checkpoint in output_path if there is one
+    adaptive_dt = False #after recovery, grow the timestep while erosion rates are steady (see ../timestepping.py)
+    adaptive_max_dz = 0.01 #largest elevation change (m) allowed at any core node in one adaptive step
+    adaptive_max_dt = 50 #longest adaptive timestep (yr)
+    steady_state_stop = False #stop once the post-recovery flux settles and extrapolate the rest (see ../steady_state.py)
+    steady_state_window = 500 #years in each of the two windows compared when checking whether the flux has settled
+    steady_state_tolerance = 0.01 #relative change in mean flux between the windows below which the flux has settled
+    hillslope_solver = 'explicit' #'explicit' (LinearDiffuser, which substeps past its stability limit), or one implicit step at any dt: 'direct' (sparse LU) or 'cg' (conjugate gradients) (see ../hillslope.py)
+    incremental_routing = True #redo D8 directions only around changes in the filled surface (same results, see ../flow_routing.py)
+    crop_to_watershed = True #run on the watershed's bounding box instead of the whole raster; outputs keep the full extent (see ../domain.py)
+    flux_log_chunk = 100 #steps of sediment flux held between writes to the binary flux log (see ../flux_log.py)
+    summary_milestones = [200, 1000, 10000] #model years at which <run>summary.json records the export and flux (see ../run_summary.py)
+    snapshot_interval = None #save topography, soil depth and erosion every this many model years to <run>snapshots.cube (None to turn off, see ../snapshots.py)
+    result_cache_dir = output_path+'../../result_cache/' #finished runs are kept here, and a rerun with identical inputs, parameters and code is copied from it (None to turn off, see ../result_cache.py)
+    result_cache_max_gb = 20 #least recently used runs are removed from the result cache beyond this size
+    profile_steps = True #time each stage of every step and write per-phase totals and histograms to <run>profile.json (see ../profiling.py)
+    progress_interval_seconds = 60 #wall-clock seconds between JSON-lines progress records (0 for every step, None for none, see ../telemetry.py)
+    progress_file = None #append the progress records to this file instead of printing them
+
+    #everything that changes the result of a run; a checkpoint is only
+    #resumed if these match the ones it was written with
+    run_params = dict(
+        run = scenario_str, total_time = total_time, recovery_period = recovery_period,
+        recovery_dt = recovery_dt, fast_dt = fast_dt, D = D, K_br = K_br, m_sp = m_sp,
+        n_sp = n_sp, F_f = F_f, phi = phi, H_star = H_star, v_s = v_s,
+        sp_crit_sed = sp_crit_sed, sp_crit_br = sp_crit_br,
+        BL_lowering_rate = BL_lowering_rate, window_size = window_size,
+        adaptive_dt = adaptive_dt, adaptive_max_dz = adaptive_max_dz, adaptive_max_dt = adaptive_max_dt,
+        steady_state_stop = steady_state_stop, steady_state_window = steady_state_window,
+        steady_state_tolerance = steady_state_tolerance, crop_to_watershed = crop_to_watershed,
+        hillslope_solver = hillslope_solver,
+        K_convolution_method = K_convolution_method, K_kernel = K_kernel, K_kernel_method = K_kernel_method)
+    checkpoint_file = output_path+scenario_str+'checkpoint.npz'
+
+    #most of the raster is nodata around the watershed, so run on the
+    #watershed's bounding box, padded by the K window's half width so the
+    #smoothing near the divide sees the same closed nodes as on the full grid
+    crop = None
+    if crop_to_watershed:
+        crop = watershed_crop(mg, z, -99999, halo = max(1, window_size // 2))
+        mg = crop_grid(mg, crop)
+        z = mg.at_node['topographic__elevation']
+        outlet_node = cropped_node_ids(crop, outlet_node)
+        ksp = ksp[crop['nodes']]
 
 
     scenario = scenario_id #minimum vegetation recovery
-    K_measured = np.loadtxt(path+'K_timeseries_scaled_CMS.txt')
+    #K of mined land through time, in closed form from the fig5 parameters
+    #(see ../k_trajectory.py); the recovery fraction is scenario / 10 (as in
+    #the old table for whole scenarios), so scenarios like 2.5 work too
+    K_trajectory = k_trajectory()
 
     #CLIMATE TIMESERIES same length as K TIMESERIES
-    climate_data = pd.read_csv(path+'yearly_data.csv').to_numpy()
+    if inputs is None:
+        climate_data = pd.read_csv(path+'yearly_data.csv').to_numpy()
+    else:
+        climate_data = inputs['yearly_data']
     climate_data = np.round((climate_data[3,2:].astype('float')/1000),2)
     
     #charlie modified for changing recovery dt:
-    precip_forcing = np.zeros(len(K_measured)+ 1)
+    precip_forcing = np.zeros(K_trajectory['n_years']+ 1)
     
     precip_forcing[0:len(climate_data)], precip_forcing[len(climate_data):] = climate_data, climate_data[-1]
-    K_modeled = K_measured[:,scenario]* (v_s/np.min(precip_forcing) + 1)
-    K_unmined = np.min(K_measured)* (v_s/np.min(precip_forcing) + 1)
+    K_modeled = trajectory_series(K_trajectory, recovery_fraction(scenario))* (v_s/np.min(precip_forcing) + 1)
+    K_unmined = trajectory_minimum(K_trajectory)* (v_s/np.min(precip_forcing) + 1)
     
     #charlie modified for changing recovery dt:
     K_max = K_modeled[int(recovery_period/1)]
     shape = ksp
-    scape = np.zeros(len(shape),dtype = float)
-    
-    #charlie modified for changing recovery dt:
-    K_grids = np.zeros((len(scape),int(recovery_period/1)),dtype = float)
-    K_grid_recovered = np.zeros(len(scape),dtype = 'float')
 
-    scape[shape.all() < 1 and shape.all() > -9999] = K_unmined
-    scape[shape == 1] = K_max
-    K_grid_recovered = scape
-        
-    count = 0
-    #charlie modified for changing recovery dt:
-    for i in np.arange(0,int(recovery_period/1),1):
-        scape[shape.all() < 1 and shape.all() > -9999] = K_unmined #set K in unmined areas
-        scape[shape == 1] = K_modeled[count] #set K in mined areas
-        K_grids[:,i] = scape
-        count += 1
-        
-        #Instantiate components for post-mining model with K recovery curve
+    #node ids of the mined, unmined, closed, core and outlet nodes, found
+    #once here instead of with masks in the step loops (see ../regions.py)
+    regions = region_index(mg, shape, outlet_node)
+
+    #K grids for each recovery year are built only when the loop asks for
+    #them, so memory no longer scales with the recovery period
+    K_grid = yearly_K_grids(shape, K_modeled, K_unmined, regions['mined'])
+
     print(
         "K IC no-recovery:\nmined = %s,\nunmined = %s,\nFC no-recovery:\nmined = %s,\nunmined = %s"%(
-            np.max(K_grids[:,0]),
-            np.min(K_grids[:,0]),
-            np.max(K_grids[:,-1]),
-            np.min(K_grids[:,-1])
+            np.max(K_grid(0)),
+            np.min(K_grid(0)),
+            np.max(K_grid(int(recovery_period/1) - 1)),
+            np.min(K_grid(int(recovery_period/1) - 1))
         )
     )
 
+    #skip the run if an identical one has finished before
+    if result_cache_dir:
+        run_key = result_key(input_checksum, dict(run_params, climate = climate_data, K_trajectory = K_trajectory,
+            scenario = scenario, snapshot_interval = snapshot_interval,
+            summary_milestones = summary_milestones), model_code_files(__file__))
+        if fetch_cached_run(result_cache_dir, run_key, output_path, scenario_str):
+            print('outputs of an identical earlier run copied from the result cache')
+            return
+
     FA = PriorityFloodFlowRouter(mg, flow_metric="D8", suppress_out=True)
     FA.run_one_step()
+    profile = new_profile() if profile_steps else None
+    route_flow = routing_stage(FA, mg, incremental_routing, profile)
     LD = LinearDiffuser(mg, linear_diffusivity = D) 
+    diffuse = LD.run_one_step if hillslope_solver == 'explicit' else implicit_diffuser(mg, D, hillslope_solver)
     mg.at_node["soil__depth"] = mg.at_node['topographic__elevation']-mg.at_node["bedrock__elevation"]
     mg.at_node["surface_water__discharge"] = mg.at_node["drainage_area"] * precip_forcing[0]
 
@@ -127,94 +215,156 @@ def landscape_evolution(scenario_id):
 
     #instantiate array to hold sediment flux outlet node
     sed_flux_via_diff = np.zeros(int(((recovery_period / recovery_dt)+((total_time - recovery_period)/fast_dt))))
+    #timestep of each flux entry, so the record keeps a time axis when steps are adaptive
+    sed_flux_dt = np.zeros(len(sed_flux_via_diff))
+
+    #the mined mask, closed nodes and kernel never change, so for the
+    #'precomputed' method the convolved masks only need to be computed once
+    if K_convolution_method == 'precomputed':
+        K_weights = precompute_K_convolution_weights(mg, shape, window_size, K_kernel, K_kernel_method)
+        K_smoothed = np.empty(mg.number_of_nodes)
+        K_work = np.empty(mg.number_of_nodes)
+
+    #instantiate SPACE once for the whole recovery period; each step pushes
+    #the new K field into it through the K_sed setter instead of building
+    #a new component
+    mg.add_zeros('erodibility', at = 'node')
+    SPACE = SpaceLargeScaleEroder(
+        mg,
+        K_sed = mg.at_node['erodibility'],
+        K_br = 0,
+        F_f = F_f,
+        phi = phi,
+        H_star = H_star,
+        v_s = v_s,
+        m_sp = m_sp,
+        n_sp = n_sp,
+        sp_crit_sed = sp_crit_sed,
+        sp_crit_br = sp_crit_sed,
+        erode_flooded_nodes = False
+    )
+    #SPACE keeps a reference to this discharge array, so it is saved with checkpoints
+    space_discharge = mg.at_node['surface_water__discharge']
+    #as when SPACE was rebuilt every recovery step, it erodes with the
+    #discharge routed on the step before, so routing writes to its own array
+    mg.at_node['surface_water__discharge'] = space_discharge.copy()
 
     timer = 0
     counter = 0
+    dt = fast_dt #post-recovery timestep, only changes if adaptive_dt is on
+    if resume and os.path.exists(checkpoint_file):
+        timer, counter, loop_state = restore_checkpoint(checkpoint_file, mg, sed_flux_via_diff, run_params, space_discharge)
+        sed_flux_dt[:counter] = loop_state['sed_flux_dt']
+        dt = loop_state['dt']
+    last_checkpoint_year, last_checkpoint_wall = timer, time.time()
+
+    #binary (time, dt, flux) record, written as the run goes so a partial
+    #run can be read too; a resumed run rewrites it up to the checkpoint
+    flux_log = open_flux_log(output_path+scenario_str+'sedflux.bin', dict(
+        watershed = os.path.basename(os.path.dirname(os.path.abspath(__file__))),
+        run = scenario_str, scenario = scenario, params = run_params), flux_log_chunk)
+    write_flux_log(flux_log, sed_flux_via_diff, sed_flux_dt, counter, flush = True)
+    #export, milestone and peak flux summary, kept up as the record grows
+    summary = open_run_summary(summary_milestones, mg.dx * mg.dy)
+    add_to_summary(summary, sed_flux_via_diff, sed_flux_dt, counter)
+
+    #optional history of the landscape through the run
+    snapshots = None
+    if snapshot_interval:
+        snapshots = open_snapshot_cube(output_path+scenario_str+'snapshots', mg, snapshot_interval, timer, crop)
+
+    #a progress record every so often instead of a line every step
+    progress = open_progress(progress_interval_seconds, total_time, timer, counter, progress_file,
+        watershed = 'Ben Creek', run = scenario_str)
+
+    #work arrays for the step loops, allocated once and updated in place
+    core_nodes = regions['core']
+    core_dz = np.empty(len(core_nodes)) #core-node topography before a step, then its change
+    core_topo = np.empty(len(core_nodes))
     print('starting SPACE on full recovery')
 
         
     while timer < recovery_period:
     
-        pre_dt_topo = copy.deepcopy(mg.at_node['topographic__elevation'])
+        np.take(mg.at_node['topographic__elevation'], core_nodes, out = core_dz, mode = 'clip')
+        start_step(profile, 'recovery')
             
         #to allow timesteps smaller than one, I need to access the same
         #element of the K grid 1/dt times (i.e. twice if dt = 0.5yr)
-        mg.at_node['erodibility'] = K_grids[:, int(np.floor(timer))]
-        print('no recovery K is: ', np.max(K_grids[:, int(np.floor(timer))]))
+        mg.at_node['erodibility'] = K_grid(int(np.floor(timer)))
             
         ########K CONVOLUTION
-            
-        #first, assign a K value to the closed nodes
-        #this is any node outside the basin
-        #that K value will be 10^ (the average of the log10 of Kmin and Kmax)
-        outside_K_value = 10 ** (np.mean(np.array([np.log10(np.min(K_grids[:, int(np.floor(timer))])), np.log10(np.max(K_grids[:, int(np.floor(timer))]))])))
 
-        #set closed nodes to have outside K val
-        mg.at_node['erodibility'][mg.closed_boundary_nodes] = outside_K_value
-            
-        #define the grid to be worked on
-        A = mg.at_node['erodibility'].reshape((mg.number_of_node_rows, mg.number_of_node_columns))
-
-        #define the convolution kernel (simple moving-window average in this case
-        B = np.ones((window_size, window_size)) / np.power(window_size, 2)
+        if K_convolution_method == 'precomputed':
+            #the window average of log10(K) is a weighted sum of the mined,
+            #unmined and outside log10(K) values
+            K_mined = K_modeled[int(np.floor(timer))]
+            mg.at_node['erodibility'] = convolved_erodibility(K_weights, K_mined, K_unmined, outside_K(K_mined, K_unmined),
+                out = K_smoothed, work = K_work)
+        else:
+            convolve_K_field(mg, mg.at_node['erodibility'], window_size, K_kernel, K_kernel_method, regions['closed'])
 
-        #do the convolution
-        logged_window_average = 10 ** convolve2d(np.log10(A), B, mode = 'same', boundary = 'fill', fillvalue = np.log10(outside_K_value))
-        mg.at_node['erodibility'][:] = logged_window_average.flatten()
-            
         ########END K CONVOLUTION
 
-        #instantiate SPACE
-        SPACE = SpaceLargeScaleEroder(
-            mg,
-            K_sed = mg.at_node['erodibility'],
-            K_br = 0,
-            F_f = F_f,
-            phi = phi,
-            H_star = H_star,
-            v_s = v_s,
-            m_sp = m_sp,
-            n_sp = n_sp,
-            sp_crit_sed = sp_crit_sed,
-            sp_crit_br = sp_crit_sed,
-            erode_flooded_nodes = False
-        )
+        SPACE.K_sed = mg.at_node['erodibility']
+        lap(profile, 'K convolution')
 
-        FA.run_one_step()
-        FA.remove_depressions()
-        mg.at_node["flood_status_code"] = np.where(mg.at_node["depression_free_elevation"] == mg.at_node["topographic__elevation"],0,3)
-        mg.at_node["surface_water__discharge"] = mg.at_node["drainage_area"] * precip_forcing[int(np.floor(timer))]
+        #fill, route, flood status and discharge in one stage
+        route_flow(precip_forcing[int(np.floor(timer))], mg.at_node["surface_water__discharge"])
         SPACE.run_one_step(dt = recovery_dt)
-        LD.run_one_step(dt = recovery_dt)
+        #the next step erodes with this step's discharge
+        space_discharge[:] = mg.at_node["surface_water__discharge"]
+        lap(profile, 'SPACE')
+        diffuse(dt = recovery_dt)
+        lap(profile, 'LinearDiffuser')
             
         #we need to account for the fact that LD only modifies topographic__elevation
         #by recalculating soil depth as f(topo and br), which means it's
         #easiest to lower TOPO at baselevel which should have the same
         #effect as what Sam originally did, which was to lower SOIL
-        mg.at_node['topographic__elevation'][outlet_node] -= BL_lowering_rate * recovery_dt
-        mg.at_node["soil__depth"] = mg.at_node["topographic__elevation"] - mg.at_node["bedrock__elevation"] #CMS change
+        mg.at_node['topographic__elevation'][regions['outlet']] -= BL_lowering_rate * recovery_dt
+        np.subtract(mg.at_node["topographic__elevation"], mg.at_node["bedrock__elevation"], out = mg.at_node["soil__depth"]) #CMS change
             
             
         #save sediment flux to array
-        sed_flux_via_diff[counter] = np.sum(pre_dt_topo[mg.core_nodes] - mg.at_node['topographic__elevation'][mg.core_nodes]) / recovery_dt
+        np.take(mg.at_node['topographic__elevation'], core_nodes, out = core_topo, mode = 'clip')
+        np.subtract(core_dz, core_topo, out = core_dz)
+        sed_flux_via_diff[counter] = np.sum(core_dz) / recovery_dt
+        sed_flux_dt[counter] = recovery_dt
 
         timer += recovery_dt
             
         #cleaning up machine precision decimal errors in timekeeping
         timer = np.round(timer, decimals = 2)
         counter += 1
-        print('Ben Creek ',scenario, 'recovery: ', timer)
+        lap(profile, 'flux accounting')
+        write_flux_log(flux_log, sed_flux_via_diff, sed_flux_dt, counter)
+        add_to_summary(summary, sed_flux_via_diff, sed_flux_dt, counter)
+        if snapshot_due(snapshots, timer):
+            add_snapshot(snapshots, mg, timer)
+        if progress_due(progress):
+            #the reductions are only done for records that get written
+            report_progress(progress, timer, counter, 'recovery', sed_flux_via_diff[counter - 1],
+                max_erosion_rate = np.max(core_dz) / recovery_dt, K_max = np.max(mg.at_node['erodibility']))
+        lap(profile, 'output')
+
+        if checkpoint_due(timer, last_checkpoint_year, last_checkpoint_wall, checkpoint_interval_years, checkpoint_interval_seconds):
+            save_checkpoint(checkpoint_file, mg, timer, counter, sed_flux_via_diff, run_params, space_discharge,
+                loop_state = dict(sed_flux_dt = sed_flux_dt[:counter], dt = dt))
+            last_checkpoint_year, last_checkpoint_wall = timer, time.time()
 
     #K grid deletion, K convolution, and SPACE instantiation
     #moved out of the post-recovery loop for speed
         
     try:
-        del(K_grids)
-        print("k_grids deleted")
+        del(K_grid)
+        print("k_grid deleted")
     except NameError:
         pass
         
-    #instantiate SPACE
+    #instantiate SPACE on the last recovery step's discharge (space_discharge,
+    #which is what a checkpoint saves)
+    mg.at_node["surface_water__discharge"] = space_discharge
     SPACE = SpaceLargeScaleEroder(
         mg,
         K_sed = mg.at_node['erodibility'],
@@ -230,45 +380,127 @@ def landscape_evolution(scenario_id):
         erode_flooded_nodes = False
     )
         
+    #longest step the explicit diffuser takes without substepping (the
+    #implicit one has no limit)
+    dt_max = adaptive_max_dt
+    if hillslope_solver == 'explicit':
+        dt_max = min(dt_max, diffusion_stability_limit(mg, D))
+
+    #this SPACE keeps using the discharge it was built with (the last
+    #recovery step's), so the discharge field gets its own array from here on
+    mg.at_node["surface_water__discharge"] = np.zeros(mg.number_of_nodes)
+
     while timer < total_time:#else:
     
-        pre_dt_topo = copy.deepcopy(mg.at_node['topographic__elevation'])
-
-        FA.run_one_step()
-        FA.remove_depressions()
-        mg.at_node["flood_status_code"] = np.where(mg.at_node["depression_free_elevation"] == mg.at_node["topographic__elevation"],0,3)
-        mg.at_node["surface_water__discharge"] = mg.at_node["drainage_area"] * precip_forcing[int(timer)]
-        SPACE.run_one_step(dt = fast_dt)
-        LD.run_one_step(dt = fast_dt)
+        np.take(mg.at_node['topographic__elevation'], core_nodes, out = core_dz, mode = 'clip')
+        start_step(profile, 'fast')
+
+        #fill, route, flood status and discharge in one stage
+        route_flow(precip_forcing[int(timer)], mg.at_node["surface_water__discharge"])
+        SPACE.run_one_step(dt = dt)
+        lap(profile, 'SPACE')
+        diffuse(dt = dt)
+        lap(profile, 'LinearDiffuser')
             
         #we need to account for the fact that LD only modifies topographic__elevation
         #by recalculating soil depth as f(topo and br), which means it's
         #easiest to lower TOPO at baselevel which should have the same
         #effect as what Sam originally did, which was to lower SOIL
-        mg.at_node['topographic__elevation'][outlet_node] -= BL_lowering_rate * fast_dt
-        mg.at_node["soil__depth"] = mg.at_node["topographic__elevation"] - mg.at_node["bedrock__elevation"] #CMS change
+        mg.at_node['topographic__elevation'][regions['outlet']] -= BL_lowering_rate * dt
+        np.subtract(mg.at_node["topographic__elevation"], mg.at_node["bedrock__elevation"], out = mg.at_node["soil__depth"]) #CMS change
 
             
-        sed_flux_via_diff[counter] = np.sum(pre_dt_topo[mg.core_nodes] - mg.at_node['topographic__elevation'][mg.core_nodes]) / fast_dt
-        timer += fast_dt
+        np.take(mg.at_node['topographic__elevation'], core_nodes, out = core_topo, mode = 'clip')
+        np.subtract(core_dz, core_topo, out = core_dz)
+        sed_flux_via_diff[counter] = np.sum(core_dz) / dt
+        sed_flux_dt[counter] = dt
+        timer += dt
         counter += 1
-        print('Ben Creek ',scenario, 'fast dt: ', timer)
+        lap(profile, 'flux accounting')
+        write_flux_log(flux_log, sed_flux_via_diff, sed_flux_dt, counter)
+        add_to_summary(summary, sed_flux_via_diff, sed_flux_dt, counter)
+        if snapshot_due(snapshots, timer):
+            add_snapshot(snapshots, mg, timer)
+        if progress_due(progress):
+            report_progress(progress, timer, counter, 'fast', sed_flux_via_diff[counter - 1],
+                max_erosion_rate = np.max(core_dz) / dt, dt = dt)
+        lap(profile, 'output')
+
+        if adaptive_dt:
+            #size the next step from how fast the topography is changing now
+            max_dz = np.max(np.abs(core_dz, out = core_topo))
+            dt = next_timestep(dt, max_dz, adaptive_max_dz, fast_dt, dt_max, total_time - timer)
+
+        if checkpoint_due(timer, last_checkpoint_year, last_checkpoint_wall, checkpoint_interval_years, checkpoint_interval_seconds):
+            save_checkpoint(checkpoint_file, mg, timer, counter, sed_flux_via_diff, run_params, space_discharge,
+                loop_state = dict(sed_flux_dt = sed_flux_dt[:counter], dt = dt))
+            last_checkpoint_year, last_checkpoint_wall = timer, time.time()
+
+        #only compare windows that are both after recovery
+        if (steady_state_stop and timer - recovery_period >= 2 * steady_state_window
+                and flux_has_settled(sed_flux_via_diff, sed_flux_dt, counter, steady_state_window, steady_state_tolerance)):
+            print('sediment flux settled at year', timer, '- extrapolating to year', total_time)
+            break
+
+    #if the run stopped early, extrapolate the rest of the flux record
+    modeled_steps, stop_time = counter, timer
+    if stop_time < total_time:
+        counter = extrapolate_flux(sed_flux_via_diff, sed_flux_dt, counter, steady_state_window, fast_dt, total_time - timer)
+        flux_header = ('rows 0-%d modeled to year %g, rows %d-%d extrapolated from the last %g yr; topography outputs are from year %g'
+            % (modeled_steps - 1, stop_time, modeled_steps, counter - 1, steady_state_window, stop_time))
+    else:
+        flux_header = ''
 
 	#save modeled topography
-    mg.save(output_path+scenario_str+'elev_01.asc',names = 'topographic__elevation')
-    mg.save(output_path+scenario_str+'DA_01.asc',names = 'drainage_area')
-    mg.save(output_path+scenario_str+'slope_01.asc',names = 'topographic__steepest_slope')
+    save_field(output_path+scenario_str+'elev_01.asc', mg, 'topographic__elevation', crop)
+    save_field(output_path+scenario_str+'DA_01.asc', mg, 'drainage_area', crop)
+    save_field(output_path+scenario_str+'slope_01.asc', mg, 'topographic__steepest_slope', crop)
 
     #save sediment flux
-    np.savetxt(output_path+scenario_str+'sedflux.txt', sed_flux_via_diff)
+    if adaptive_dt:
+        #adaptive runs take fewer steps, so save the timestep of each entry too
+        np.savetxt(output_path+scenario_str+'sedflux.txt', sed_flux_via_diff[:counter], header = flux_header)
+        np.savetxt(output_path+scenario_str+'sedflux_dt.txt', sed_flux_dt[:counter], header = flux_header)
+    else:
+        np.savetxt(output_path+scenario_str+'sedflux.txt', sed_flux_via_diff, header = flux_header)
+
+    #the rest of the binary log, including any extrapolated steps (those
+    #after modeled_records)
+    write_flux_log(flux_log, sed_flux_via_diff, sed_flux_dt, counter, flush = True)
+    close_flux_log(flux_log, modeled_records = int(modeled_steps), stop_time = float(stop_time))
+    add_to_summary(summary, sed_flux_via_diff, sed_flux_dt, counter)
+    write_run_summary(summary, output_path+scenario_str+'summary.json',
+        watershed = os.path.basename(os.path.dirname(os.path.abspath(__file__))), run = scenario_str,
+        scenario = scenario, modeled_records = int(modeled_steps), stop_time = float(stop_time))
+    close_progress(progress, stop_time, modeled_steps, sed_flux_via_diff[modeled_steps - 1])
+
+    #where the wall-clock time of this run's steps went (a resumed run
+    #only times the steps after its checkpoint)
+    write_profile(profile, output_path+scenario_str+'profile.json',
+        watershed = os.path.basename(os.path.dirname(os.path.abspath(__file__))), run = scenario_str,
+        nodes = mg.number_of_nodes, core_nodes = len(core_nodes), params = run_params)
+
+    #the run is finished, so its checkpoint is no longer needed
+    if os.path.exists(checkpoint_file):
+        os.remove(checkpoint_file)
+
+    if result_cache_dir:
+        outputs = ['elev_01.asc', 'DA_01.asc', 'slope_01.asc', 'sedflux.txt', 'sedflux.bin', 'summary.json']
+        if adaptive_dt:
+            outputs.append('sedflux_dt.txt')
+        if snapshots is not None:
+            outputs += ['snapshots.cube', 'snapshots.json']
+        store_run(result_cache_dir, run_key, output_path, scenario_str, outputs, result_cache_max_gb)
 
 #now run it
-import numpy as np
+#(../ensemble.py runs all scenarios and both controls in parallel)
+if __name__ == '__main__':
+    import numpy as np
 
-#you can run it with a list of scenario numbers, or with a single scenario.
-#For the former uncomment the loop below and pass in the list_of_scenarios.
-list_of_scenarios = np.arange(0,11,1)
+    #you can run it with a list of scenario numbers, or with a single scenario.
+    #For the former uncomment the loop below and pass in the list_of_scenarios.
+    list_of_scenarios = np.arange(0,11,1)
 
-#for id in list_of_scenarios:
-landscape_evolution(10)
-    #print("FINISHED BEN CREEK SCENARIO ID ",id)
\ No newline at end of file
+    #for id in list_of_scenarios:
+    landscape_evolution(10)
+        #print("FINISHED BEN CREEK SCENARIO ID ",id)
\ No newline at end of file
@@ -0,0 +1,363 @@
+######################################
+
+#Benchmark of the landscape evolution step loop. Runs a fixed number of
+#recovery and fast steps, set up and stepped the way the scenario scripts
+#do it, on each watershed's input DEM and on synthetic fractal DEMs of
+#0.25M to 16M nodes with a synthetic mined mask. Reports steps per second,
+#the time of each stage of a step (see profiling.py) and peak memory, and
+#appends every result to a JSON-lines file along with the commit it was
+#run on, so results can be compared across commits.
+
+#Every case runs in a fresh process, so its peak memory is its own. The
+#16M node grid needs several tens of GB.
+
+#Usage (from the model_simulations folder):
+#   python benchmark.py
+#   python benchmark.py --watersheds ben_creek --synthetic 0.25 1 --recovery-steps 10 --fast-steps 10
+#   python benchmark.py --synthetic 1 --fast-dt 50 --hillslope-solver direct
+#   python benchmark.py --compare <commit> <commit>
+
+#Please cite Bower et al., in review
+
+######################################
+
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import subprocess
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+import landlab
+from landlab import RasterModelGrid
+from landlab.components import PriorityFloodFlowRouter, SpaceLargeScaleEroder, LinearDiffuser
+
+from model_inputs import WATERSHEDS
+from raster_cache import read_raster, raster_values
+from domain import watershed_crop, crop_grid, cropped_node_ids
+from erodibility import convolve_K_field, yearly_K_grids
+from k_trajectory import k_trajectory, recovery_fraction, trajectory_series, trajectory_minimum
+from flow_routing import routing_stage
+from regions import region_index
+from hillslope import implicit_diffuser
+from profiling import new_profile, start_step, lap, summarize
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SYNTHETIC_SIZES = (0.25, 1, 4, 16) #millions of nodes
+
+#the scenario scripts' parameters
+MODEL_PARAMS = dict(
+    recovery_dt = 0.5, fast_dt = 1, D = 3e-3, K_br = 0, m_sp = 0.5, n_sp = 1, F_f = 0, phi = 0.3,
+    H_star = 1., v_s = 0.01, sp_crit_sed = 0, sp_crit_br = 0, BL_lowering_rate = 2.7e-5,
+    window_size = 9, K_kernel = 'box', K_kernel_method = 'direct', hillslope_solver = 'explicit', scenario = 5)
+PRECIP = 1.2 #m/yr, about the mean of the climate records
+
+
+def fractal_dem(rows, cols, seed = 0, beta = 3., relief = 300.):
+    """Fractal surface (power spectrum ~ f^-beta) on a slope down to row 0, in landlab node order."""
+    rng = np.random.default_rng(seed)
+    f = np.hypot(np.fft.fftfreq(rows)[:, np.newaxis], np.fft.rfftfreq(cols)[np.newaxis, :])
+    f[0, 0] = 1
+    spectrum = (rng.normal(size = f.shape) + 1j * rng.normal(size = f.shape)) * f ** (-beta / 2)
+    spectrum[0, 0] = 0
+    z = np.fft.irfft2(spectrum, s = (rows, cols))
+    z = (z - z.min()) / np.ptp(z) * relief
+    z += relief * np.linspace(0, 1, rows)[:, np.newaxis]
+    return z.ravel() + 300
+
+
+def synthetic_watershed(million_nodes, seed = 0, mined_fraction = 0.3):
+    """Grid, DEM and K mask of a synthetic watershed with about this many million nodes.
+
+    The basin is the ellipse filling the raster, with nodata (-99999 in the
+    DEM, -9999 in the mask) outside it, like the clipped input rasters, and
+    drains out through a node in the middle of the bottom edge. The
+    highest mined_fraction of the basin is mined (mask 1, else 0) and
+    flattened, as mountaintop removal leaves it.
+    """
+    side = int(round(np.sqrt(million_nodes * 1e6)))
+    mg = RasterModelGrid((side, side), xy_spacing = 10.)
+    z = fractal_dem(side, side, seed)
+    y, x = np.mgrid[0:side, 0:side]
+    basin = ((((x - (side - 1) / 2) / (side / 2 - 1)) ** 2 + ((y - (side - 1) / 2) / (side / 2 - 1)) ** 2) < 1).ravel()
+    #the router only drains to the raster edge (closed nodes are walls), so
+    #like the clipped input DEMs the basin reaches the edge at its outlet
+    outlet = side // 2
+    basin[outlet] = True
+    z[outlet] = z[basin].min() - 1
+    ksp = np.full(len(z), -9999.)
+    ksp[basin] = 0
+    mine_level = np.percentile(z[basin], 100 * (1 - mined_fraction))
+    mined = basin & (z > mine_level)
+    ksp[mined] = 1
+    z[mined] = mine_level + np.random.default_rng(seed + 1).random(np.count_nonzero(mined))
+    z[~basin] = -99999
+    return mg, mg.add_field('topographic__elevation', z, at = 'node'), ksp
+
+
+def real_watershed(watershed, root = HERE):
+    """Grid, DEM and K mask of a study watershed, or None if its inputs are not there."""
+    files = WATERSHEDS[watershed]
+    path = os.path.join(root, watershed, 'inputs', '')
+    if not (os.path.exists(path + files['post_dem']) and os.path.exists(path + files['K_mask'])):
+        return None
+    mg, z = read_raster(path + files['post_dem'], name = 'topographic__elevation')
+    return mg, z, np.array(raster_values(path + files['K_mask'])[0], dtype = float)
+
+
+def set_up_run(mg, z, ksp, params, profile):
+    """Boundary conditions, crop, K and components for a scenario run, as in the scripts."""
+    p = params
+    mg.set_closed_boundaries_at_grid_edges(True,True,True,True)
+    mg.set_nodata_nodes_to_closed(z, -99999)
+    outlet_node = mg.set_watershed_boundary_condition(z, nodata_value = -99999, return_outlet_id = True)
+    mg.add_zeros('soil__depth', at = 'node')
+    mg.at_node['soil__depth'] += 500
+    mg.add_field('bedrock__elevation', mg.at_node['topographic__elevation'] - mg.at_node['soil__depth'], at = 'node')
+    crop = watershed_crop(mg, z, -99999, halo = max(1, p['window_size'] // 2))
+    mg = crop_grid(mg, crop)
+    outlet_node = cropped_node_ids(crop, outlet_node)
+    ksp = ksp[crop['nodes']]
+
+    K_trajectory = k_trajectory()
+    K_modeled = trajectory_series(K_trajectory, recovery_fraction(p['scenario'])) * (p['v_s'] / PRECIP + 1)
+    K_unmined = trajectory_minimum(K_trajectory) * (p['v_s'] / PRECIP + 1)
+
+    FA = PriorityFloodFlowRouter(mg, flow_metric = "D8", suppress_out = True)
+    FA.run_one_step()
+    route_flow = routing_stage(FA, mg, True, profile)
+    LD = LinearDiffuser(mg, linear_diffusivity = p['D'])
+    diffuse = LD.run_one_step if p['hillslope_solver'] == 'explicit' else implicit_diffuser(mg, p['D'], p['hillslope_solver'])
+    mg.at_node['surface_water__discharge'] = mg.at_node['drainage_area'] * PRECIP
+    mg.add_zeros('erodibility', at = 'node')
+    SPACE = SpaceLargeScaleEroder(mg, K_sed = mg.at_node['erodibility'], K_br = 0, F_f = p['F_f'],
+        phi = p['phi'], H_star = p['H_star'], v_s = p['v_s'], m_sp = p['m_sp'], n_sp = p['n_sp'],
+        sp_crit_sed = p['sp_crit_sed'], sp_crit_br = p['sp_crit_sed'], erode_flooded_nodes = False)
+    #SPACE erodes with the discharge routed on the step before, as in the scripts
+    space_discharge = mg.at_node['surface_water__discharge']
+    mg.at_node['surface_water__discharge'] = space_discharge.copy()
+    regions = region_index(mg, ksp, outlet_node)
+    core_nodes = regions['core']
+    return dict(
+        grid = mg, FA = FA, diffuse = diffuse, SPACE = SPACE, route_flow = route_flow, regions = regions,
+        K_grid = yearly_K_grids(ksp, K_modeled, K_unmined, regions['mined']), space_discharge = space_discharge,
+        core_nodes = core_nodes, core_dz = np.empty(len(core_nodes)), core_topo = np.empty(len(core_nodes)),
+        timer = 0., params = p, profile = profile)
+
+
+def recovery_step(run):
+    """One step of the scripts' recovery loop; returns the sediment flux."""
+    mg, p, profile = run['grid'], run['params'], run['profile']
+    dt = p['recovery_dt']
+    np.take(mg.at_node['topographic__elevation'], run['core_nodes'], out = run['core_dz'], mode = 'clip')
+    start_step(profile, 'recovery')
+    mg.at_node['erodibility'] = run['K_grid'](int(np.floor(run['timer'])))
+    convolve_K_field(mg, mg.at_node['erodibility'], p['window_size'], p['K_kernel'], p['K_kernel_method'], run['regions']['closed'])
+    run['SPACE'].K_sed = mg.at_node['erodibility']
+    lap(profile, 'K convolution')
+    run['route_flow'](PRECIP, mg.at_node['surface_water__discharge'])
+    run['SPACE'].run_one_step(dt = dt)
+    run['space_discharge'][:] = mg.at_node['surface_water__discharge']
+    lap(profile, 'SPACE')
+    run['diffuse'](dt = dt)
+    lap(profile, 'LinearDiffuser')
+    return _flux_accounting(run, dt)
+
+
+def start_fast_phase(run):
+    """New SPACE and discharge array for the fast loop, as in the scripts."""
+    mg, p = run['grid'], run['params']
+    mg.at_node['surface_water__discharge'] = run['space_discharge']
+    run['SPACE'] = SpaceLargeScaleEroder(mg, K_sed = mg.at_node['erodibility'], K_br = p['K_br'],
+        F_f = p['F_f'], phi = p['phi'], H_star = p['H_star'], v_s = p['v_s'], m_sp = p['m_sp'],
+        n_sp = p['n_sp'], sp_crit_sed = p['sp_crit_sed'], sp_crit_br = p['sp_crit_sed'], erode_flooded_nodes = False)
+    mg.at_node['surface_water__discharge'] = np.zeros(mg.number_of_nodes)
+
+
+def fast_step(run):
+    """One step of the scripts' post-recovery loop; returns the sediment flux."""
+    mg, p, profile = run['grid'], run['params'], run['profile']
+    dt = p['fast_dt']
+    np.take(mg.at_node['topographic__elevation'], run['core_nodes'], out = run['core_dz'], mode = 'clip')
+    start_step(profile, 'fast')
+    run['route_flow'](PRECIP, mg.at_node['surface_water__discharge'])
+    run['SPACE'].run_one_step(dt = dt)
+    lap(profile, 'SPACE')
+    run['diffuse'](dt = dt)
+    lap(profile, 'LinearDiffuser')
+    return _flux_accounting(run, dt)
+
+
+def _flux_accounting(run, dt):
+    mg = run['grid']
+    mg.at_node['topographic__elevation'][run['regions']['outlet']] -= run['params']['BL_lowering_rate'] * dt
+    np.subtract(mg.at_node['topographic__elevation'], mg.at_node['bedrock__elevation'], out = mg.at_node['soil__depth'])
+    np.take(mg.at_node['topographic__elevation'], run['core_nodes'], out = run['core_topo'], mode = 'clip')
+    np.subtract(run['core_dz'], run['core_topo'], out = run['core_dz'])
+    flux = np.sum(run['core_dz']) / dt
+    run['timer'] += dt
+    lap(run['profile'], 'flux accounting')
+    return flux
+
+
+def peak_memory_mb(reset = False):
+    """Peak resident memory of this process in MB.
+
+    With reset, the peak is restarted from the current use where the OS
+    allows it (Linux), so a later call gives the peak since then.
+    """
+    try:
+        if reset:
+            with open('/proc/self/clear_refs', 'w') as f:
+                f.write('5')
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1e3
+    except OSError:
+        pass
+    import resource
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1e6 if sys.platform == 'darwin' else rss / 1e3
+
+
+def benchmark_case(case, recovery_steps, fast_steps, warmup = 1, params = MODEL_PARAMS):
+    """Set up and time one case, ('watershed', name) or ('synthetic', million nodes).
+
+    warmup recovery steps are run before timing starts, so the first
+    routing (every receiver new) is not counted. Returns the result dict,
+    or None if a watershed's inputs are missing.
+    """
+    kind, which = case
+    start = time.perf_counter()
+    inputs = real_watershed(which) if kind == 'watershed' else synthetic_watershed(which)
+    if inputs is None:
+        return None
+    profile = new_profile()
+    run = set_up_run(*inputs, params, profile)
+    setup_s = time.perf_counter() - start
+    setup_peak = peak_memory_mb()
+
+    for i in range(warmup):
+        recovery_step(run)
+    profile['phases'].clear()
+    peak_memory_mb(reset = True)
+
+    wall = {}
+    start = time.perf_counter()
+    for i in range(recovery_steps):
+        recovery_step(run)
+    wall['recovery'] = time.perf_counter() - start
+    start_fast_phase(run)
+    start = time.perf_counter()
+    for i in range(fast_steps):
+        fast_step(run)
+    wall['fast'] = time.perf_counter() - start
+
+    mg = run['grid']
+    steps = dict(recovery = recovery_steps, fast = fast_steps)
+    #cases run with other than the scripts' parameters are named by the ones that differ
+    changed = ['%s %s' % (name, value) for name, value in params.items() if MODEL_PARAMS.get(name) != value]
+    return dict(
+        case = (WATERSHEDS[which]['name'] if kind == 'watershed' else 'synthetic %gM' % which) +
+            (' (%s)' % ', '.join(changed) if changed else ''),
+        kind = kind, shape = list(mg.shape), nodes = mg.number_of_nodes, core_nodes = len(run['core_nodes']),
+        steps = steps, warmup = warmup, setup_s = setup_s,
+        steps_per_s = {phase: steps[phase] / wall[phase] for phase in wall if steps[phase]},
+        stages = {phase: {stage: {k: v for k, v in summarize(laps).items() if k != 'histogram'}
+            for stage, laps in stages.items()} for phase, stages in profile['phases'].items()},
+        setup_peak_memory_mb = setup_peak, step_peak_memory_mb = peak_memory_mb())
+
+
+def commit_info(root = HERE):
+    """Current commit id and whether tracked files have uncommitted changes (None if not a git checkout)."""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd = root, capture_output = True,
+            text = True, check = True).stdout.strip()
+        status = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd = root,
+            capture_output = True, text = True, check = True).stdout
+        return dict(commit = commit, dirty = bool(status.strip()))
+    except (OSError, subprocess.CalledProcessError):
+        return dict(commit = None, dirty = None)
+
+
+def print_result(result):
+    print('%s: %d nodes (%d core), set up in %.1f s' % (result['case'], result['nodes'], result['core_nodes'], result['setup_s']))
+    print('   %s, peak memory %.0f MB (%.0f MB after setup)' % (', '.join('%s %.2f steps/s' % item
+        for item in result['steps_per_s'].items()), result['step_peak_memory_mb'], result['setup_peak_memory_mb']))
+    for phase, stages in result['stages'].items():
+        print('   %-9s' % phase + ', '.join('%s %.1f ms' % (stage, 1e3 * s['mean_s']) for stage, s in stages.items()))
+
+
+def run_benchmarks(cases, recovery_steps, fast_steps, results_file, warmup = 1, params = MODEL_PARAMS):
+    """Benchmark each case in its own process and append the results to results_file."""
+    info = dict(commit_info(), date = time.strftime('%Y-%m-%dT%H:%M:%S'), host = socket.gethostname(),
+        cpus = os.cpu_count(), python = sys.version.split()[0], numpy = np.__version__, landlab = landlab.__version__)
+    results = []
+    for case in cases:
+        try:
+            with ProcessPoolExecutor(max_workers = 1, mp_context = multiprocessing.get_context('spawn')) as pool:
+                result = pool.submit(benchmark_case, case, recovery_steps, fast_steps, warmup, params).result()
+        except BrokenProcessPool:
+            #most likely killed for running out of memory
+            print('%s %s: the benchmark process died' % case)
+            continue
+        if result is None:
+            print('%s: no input DEM, skipped' % WATERSHEDS[case[1]]['name'])
+            continue
+        result.update(info)
+        print_result(result)
+        with open(results_file, 'a') as f:
+            f.write(json.dumps(result) + '\n')
+        results.append(result)
+    return results
+
+
+def compare(results_file, commit_a, commit_b):
+    """Print steps/s and peak memory of each case at two commits (the latest result of each)."""
+    latest = {}
+    with open(results_file) as f:
+        for line in f:
+            result = json.loads(line)
+            for commit in (commit_a, commit_b):
+                if result['commit'] and result['commit'].startswith(commit):
+                    latest[commit, result['case']] = result
+    cases = sorted(set(case for _, case in latest), key = lambda case: min(r['nodes'] for (c, n), r in latest.items() if n == case))
+    print('%-16s %-9s %12s %12s %7s %10s %10s' % ('case', 'phase', commit_a[:10], commit_b[:10], 'ratio', 'MB ' + commit_a[:6], 'MB ' + commit_b[:6]))
+    for case in cases:
+        a, b = latest.get((commit_a, case)), latest.get((commit_b, case))
+        if a is None or b is None:
+            continue
+        for phase in a['steps_per_s']:
+            if phase in b['steps_per_s']:
+                print('%-16s %-9s %12.3f %12.3f %7.2f %10.0f %10.0f' % (case, phase, a['steps_per_s'][phase],
+                    b['steps_per_s'][phase], b['steps_per_s'][phase] / a['steps_per_s'][phase],
+                    a['step_peak_memory_mb'], b['step_peak_memory_mb']))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'Steps/s, stage times and peak memory of the model step loop.')
+    parser.add_argument('--watersheds', nargs = '*', choices = sorted(WATERSHEDS), default = sorted(WATERSHEDS))
+    parser.add_argument('--synthetic', type = float, nargs = '*', default = list(SYNTHETIC_SIZES),
+        help = 'sizes of the synthetic DEMs in millions of nodes')
+    parser.add_argument('--recovery-steps', type = int, default = 10)
+    parser.add_argument('--fast-steps', type = int, default = 10)
+    parser.add_argument('--warmup', type = int, default = 1)
+    parser.add_argument('--fast-dt', type = float, default = MODEL_PARAMS['fast_dt'])
+    parser.add_argument('--D', type = float, default = MODEL_PARAMS['D'], help = 'hillslope diffusivity')
+    parser.add_argument('--hillslope-solver', choices = ('explicit', 'direct', 'cg'), default = MODEL_PARAMS['hillslope_solver'])
+    parser.add_argument('--results', default = os.path.join(HERE, 'benchmark_results.jsonl'))
+    parser.add_argument('--compare', nargs = 2, metavar = 'COMMIT', help = 'compare the stored results of two commits instead')
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(args.results, *args.compare)
+    else:
+        cases = [('watershed', w) for w in args.watersheds] + [('synthetic', size) for size in args.synthetic]
+        params = dict(MODEL_PARAMS, fast_dt = args.fast_dt, D = args.D, hillslope_solver = args.hillslope_solver)
+        run_benchmarks(cases, args.recovery_steps, args.fast_steps, args.results, args.warmup, params)
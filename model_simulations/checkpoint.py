@@ -0,0 +1,87 @@
+######################################
+
+#Checkpoint/restart for the landscape evolution scripts in each watershed
+#folder, so long runs can be split across short queue slots
+
+#Please cite Bower et al., in review
+
+######################################
+
+import os
+import json
+import time
+import numpy as np
+
+
+def checkpoint_due(timer, last_checkpoint_year, last_checkpoint_wall, interval_years = None, interval_seconds = None):
+    """Whether a checkpoint should be written at the end of this step.
+
+    Checkpoints only fall on whole model years: within a recovery year the
+    direct K convolution works on the same K array for both half-year steps,
+    and that array is not part of the saved state.
+    """
+    if timer != np.floor(timer):
+        return False
+    if interval_years is not None and timer - last_checkpoint_year >= interval_years:
+        return True
+    if interval_seconds is not None and time.time() - last_checkpoint_wall >= interval_seconds:
+        return True
+    return False
+
+
+def save_checkpoint(filename, grid, timer, counter, sed_flux, run_params, space_discharge, loop_state = None):
+    """Write the full model state to a binary .npz file.
+
+    Saves every node field, the model time and step counter, the sediment
+    flux record so far, whether the run is in the recovery or fast phase,
+    and the discharge array SPACE was built with (SPACE keeps a reference to
+    that array, which is not always the current discharge field). Any other
+    loop variables (e.g. the adaptive timestep) go in loop_state. The file
+    is written under a temporary name and then renamed, so an interrupted
+    write never replaces a good checkpoint.
+    """
+    state = {'field:' + name: grid.at_node[name] for name in grid.at_node.keys()}
+    state['timer'] = np.array(timer)
+    state['counter'] = np.array(counter)
+    state['phase'] = np.array('recovery' if timer < run_params['recovery_period'] else 'fast')
+    state['sed_flux_via_diff'] = sed_flux[:counter]
+    state['space_discharge'] = space_discharge
+    state['run_params'] = np.array(json.dumps(run_params, sort_keys = True))
+    for key, value in (loop_state or {}).items():
+        state['loop:' + key] = value
+
+    tmp = filename + '.tmp.npz'
+    np.savez(tmp, **state)
+    os.replace(tmp, filename)
+    print('checkpoint written at year', timer)
+
+
+def restore_checkpoint(filename, grid, sed_flux, run_params, space_discharge):
+    """Load a checkpoint written by save_checkpoint into an already set-up model.
+
+    Field values are copied into the existing arrays in place, because the
+    flow router, diffuser and eroder keep references to them. Returns the
+    model time and step counter to continue from, and the loop_state dict.
+    """
+    with np.load(filename) as state:
+        saved_params = json.loads(str(state['run_params']))
+        if saved_params != json.loads(json.dumps(run_params, sort_keys = True)):
+            raise ValueError(
+                'checkpoint %s was written with different run parameters:\n%s\nvs\n%s'
+                % (filename, saved_params, run_params)
+            )
+        for key in state.files:
+            if not key.startswith('field:'):
+                continue
+            name = key[len('field:'):]
+            if name in grid.at_node:
+                grid.at_node[name][:] = state[key]
+            else:
+                grid.add_field(name, state[key].copy(), at = 'node')
+        space_discharge[:] = state['space_discharge']
+        counter = int(state['counter'])
+        sed_flux[:counter] = state['sed_flux_via_diff']
+        timer = state['timer'][()]
+        loop_state = {key[len('loop:'):]: state[key][()] for key in state.files if key.startswith('loop:')}
+        print('resuming from checkpoint at year', timer, '(' + str(state['phase']) + ' phase)')
+    return timer, counter, loop_state
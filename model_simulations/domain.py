@@ -0,0 +1,83 @@
+######################################
+
+#Crops a watershed's grid to the basin for the landscape evolution scripts
+#in each watershed folder. Most of each DEM raster is nodata around the
+#basin; on the cropped grid, routing, K convolution, diffusion and the flux
+#sums only work on the basin's bounding box. Outputs are written back on
+#the full raster extent.
+
+#Please cite Bower et al., in review
+
+######################################
+
+import numpy as np
+from landlab import RasterModelGrid
+
+
+def watershed_crop(grid, values, nodata_value, halo):
+    """The block of the grid holding every data node, plus halo nodes on each side.
+
+    The halo is clipped at the raster edge. Keep it at least one node wide,
+    so every basin node keeps all of its neighbors and nodes on the raster
+    edge stay on the grid edge. Returns a dict describing the crop, with
+    'nodes' the full-grid ids of the cropped grid's nodes, in order.
+    """
+    data = (np.asarray(values) != nodata_value).reshape(grid.shape)
+    rows = np.flatnonzero(data.any(axis = 1))
+    cols = np.flatnonzero(data.any(axis = 0))
+    r0, r1 = max(rows[0] - halo, 0), min(rows[-1] + halo + 1, grid.shape[0])
+    c0, c1 = max(cols[0] - halo, 0), min(cols[-1] + halo + 1, grid.shape[1])
+    nodes = np.arange(grid.number_of_nodes).reshape(grid.shape)[r0:r1, c0:c1]
+    return {
+        'nodes': nodes.ravel(),
+        'shape': nodes.shape,
+        'first_row_col': (r0, c0),
+        'full_shape': grid.shape,
+        'xy_spacing': grid.dx,
+        'xy_of_lower_left': tuple(grid.xy_of_lower_left),
+    }
+
+
+def crop_grid(grid, crop):
+    """Copy of a set-up grid restricted to the crop.
+
+    Copies every node field and the node boundary statuses, and places the
+    new grid at the right map coordinates. The full-grid field values are
+    kept in crop['full_values'] so that save_field can fill in the nodes
+    outside the crop.
+    """
+    r0, c0 = crop['first_row_col']
+    x0, y0 = crop['xy_of_lower_left']
+    cropped = RasterModelGrid(crop['shape'], xy_spacing = grid.dx,
+        xy_of_lower_left = (x0 + c0 * grid.dx, y0 + r0 * grid.dy))
+    for name in grid.at_node.keys():
+        cropped.add_field(name, grid.at_node[name][crop['nodes']], at = 'node')
+    cropped.status_at_node = grid.status_at_node[crop['nodes']]
+    crop['full_values'] = {name: np.array(grid.at_node[name]) for name in grid.at_node.keys()}
+    return cropped
+
+
+def cropped_node_ids(crop, full_ids):
+    """Ids on the cropped grid of nodes given by their full-grid ids."""
+    return np.searchsorted(crop['nodes'], full_ids)
+
+
+def save_field(filename, grid, name, crop = None):
+    """grid.save for one field, written on the full raster extent if the grid was cropped.
+
+    Nodes outside the crop get the value the field had there when the grid
+    was cropped (nodata for the DEM), or zero for fields added afterwards,
+    which is what those closed nodes hold in an uncropped run.
+    """
+    if crop is None:
+        grid.save(filename, names = name)
+        return
+    full = RasterModelGrid(crop['full_shape'], xy_spacing = crop['xy_spacing'],
+        xy_of_lower_left = crop['xy_of_lower_left'])
+    if name in crop['full_values']:
+        values = crop['full_values'][name].copy()
+    else:
+        values = np.zeros(full.number_of_nodes, dtype = grid.at_node[name].dtype)
+    values[crop['nodes']] = grid.at_node[name]
+    full.add_field(name, values, at = 'node')
+    full.save(filename, names = name)
@@ -0,0 +1,139 @@
+######################################
+
+#Runs a set of recovery scenarios plus the two control runs for one
+#watershed in parallel. The DEMs, K mask and climate data are
+#read once and placed in shared memory, and every worker process runs the
+#watershed's own landscape_evolution on those shared inputs.
+
+#With --pack N, the scenarios run N at a time packed into one grid (see
+#packed_scenarios.py) instead of one script run each. Packed runs smooth K
+#with the 'precomputed' method, not the scripts' default 'direct', so their
+#outputs differ slightly from the scripts' and replace them under the same
+#names.
+
+#Usage (from the model_simulations folder):
+#   python ensemble.py ben_creek --scenarios 0 5 10 --workers 4
+#   python ensemble.py ben_creek --pack 4
+
+#Please cite Bower et al., in review
+
+######################################
+
+import os
+import time
+import argparse
+import importlib.util
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from model_inputs import WATERSHEDS, load_watershed_inputs, share_inputs, attach_inputs
+from packed_scenarios import run_packed, OUTPUT_PATH
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+#rough peak memory of one run per grid node (landlab fields, flow routing
+#and SPACE work arrays), used to cap the number of concurrent runs
+BYTES_PER_NODE = 600
+
+#set in each worker by _init_worker
+_worker_inputs = None
+_worker_blocks = None
+
+
+def ensemble_jobs(watershed, scenarios, controls = True, pack = None):
+    """(script, scenario_id) pairs for the requested runs of one watershed.
+
+    With pack, the scenarios are grouped pack at a time into
+    ('packed', scenario_ids) jobs instead.
+    """
+    prefix = WATERSHEDS[watershed]['prefix']
+    #the numbered scenario scripts only differ in the id they run, so one of
+    #them serves every scenario; whole ids stay ints so output names don't change
+    scenarios = [int(scenario) if scenario == int(scenario) else float(scenario) for scenario in scenarios]
+    if pack:
+        jobs = [('packed', tuple(scenarios[i:i + pack])) for i in range(0, len(scenarios), pack)]
+    else:
+        jobs = [(prefix + '0.py', scenario) for scenario in scenarios]
+    if controls:
+        jobs.append((prefix + '_control_mined.py', 0))
+        jobs.append((prefix + '_control_unmined.py', 0))
+    return jobs
+
+
+def available_memory():
+    """Bytes of physical memory currently free (None if unknown)."""
+    try:
+        return os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def pool_size(n_jobs, n_nodes, max_workers = None):
+    """Number of worker processes: limited by cores, free memory and jobs."""
+    workers = os.cpu_count() or 1
+    memory = available_memory()
+    if memory is not None:
+        workers = min(workers, max(1, int(memory // (n_nodes * BYTES_PER_NODE))))
+    if max_workers is not None:
+        workers = min(workers, max_workers)
+    return max(1, min(workers, n_jobs))
+
+
+def _init_worker(watershed_dir, spec):
+    global _worker_inputs, _worker_blocks
+    #the scripts read inputs relative to their own folder
+    os.chdir(watershed_dir)
+    _worker_inputs, _worker_blocks = attach_inputs(spec)
+
+
+def _run_job(script, scenario_id):
+    if script == 'packed':
+        watershed_dir = os.getcwd()
+        watershed = os.path.basename(watershed_dir)
+        start = time.time()
+        run_packed(watershed_dir, watershed, scenario_id, OUTPUT_PATH % watershed, _worker_inputs)
+        return script, scenario_id, time.time() - start
+    module_spec = importlib.util.spec_from_file_location(os.path.splitext(script)[0], script)
+    module = importlib.util.module_from_spec(module_spec)
+    module_spec.loader.exec_module(module)
+    start = time.time()
+    module.landscape_evolution(scenario_id, _worker_inputs)
+    return script, scenario_id, time.time() - start
+
+
+def run_ensemble(watershed, scenarios = np.arange(0, 11, 1), controls = True, max_workers = None, pack = None):
+    """Run scenarios (and the two controls) for one watershed in a process pool."""
+    watershed_dir = os.path.join(HERE, watershed)
+    jobs = ensemble_jobs(watershed, scenarios, controls, pack)
+
+    inputs = load_watershed_inputs(watershed_dir, watershed)
+    blocks, spec = share_inputs(inputs)
+    #a packed job holds pack copies of the grid
+    workers = pool_size(len(jobs), len(inputs['post_dem']) * (pack or 1), max_workers)
+    print('%s: %d runs on %d workers' % (WATERSHEDS[watershed]['name'], len(jobs), workers))
+
+    try:
+        with ProcessPoolExecutor(max_workers = workers, initializer = _init_worker, initargs = (watershed_dir, spec)) as pool:
+            futures = [pool.submit(_run_job, script, scenario_id) for script, scenario_id in jobs]
+            for future in as_completed(futures):
+                script, scenario_id, elapsed = future.result()
+                print('FINISHED %s %s scenario %s in %.0f s' % (WATERSHEDS[watershed]['name'], script, scenario_id, elapsed))
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'Run recovery scenarios and controls for one watershed in parallel.')
+    parser.add_argument('watershed', choices = sorted(WATERSHEDS))
+    parser.add_argument('--scenarios', type = float, nargs = '*', default = list(range(11)))
+    parser.add_argument('--no-controls', action = 'store_true')
+    parser.add_argument('--workers', type = int, default = None)
+    parser.add_argument('--pack', type = int, default = None,
+        help = "run the scenarios this many at a time in one packed grid; packed runs smooth K with the "
+        "'precomputed' method, so their outputs differ slightly from the scripts' default 'direct' ones "
+        "and overwrite them")
+    args = parser.parse_args()
+    run_ensemble(args.watershed, args.scenarios, not args.no_controls, args.workers, args.pack)
@@ -0,0 +1,217 @@
+######################################
+
+#Helper functions for building the erodibility (K) field used by the
+#landscape evolution scripts in each watershed folder
+
+#Please cite Bower et al., in review
+
+######################################
+
+import numpy as np
+from scipy.ndimage import correlate1d
+from scipy.signal import convolve2d, fftconvolve
+
+#methods each smoothing kernel can be run with ('separable' needs a kernel
+#that is an outer product of two 1D kernels, 'sat' needs a flat kernel).
+#An even window has no centre node; convolve2d's mode='same' then reaches one
+#node further back than forward. 'direct' and 'fft' do the same, but the
+#other methods assume a centred window, so they need odd window sizes.
+KERNEL_METHODS = {
+    'box': ('direct', 'separable', 'sat', 'fft'),
+    'disk': ('direct', 'fft'),
+    'gaussian': ('direct', 'separable', 'fft'),
+}
+EVEN_WINDOW_METHODS = ('direct', 'fft')
+
+
+def _kernel_1d(kernel, window_size, sigma=None):
+    #1D weights for the separable kernels, normalized to sum to one
+    if kernel == 'box':
+        w = np.ones(window_size)
+    else:
+        if sigma is None:
+            sigma = window_size / 6. #window spans +/- 3 sigma
+        x = np.arange(window_size) - window_size // 2
+        w = np.exp(-0.5 * (x / sigma) ** 2)
+    return w / np.sum(w)
+
+
+def smoothing_kernel(kernel, window_size, sigma=None):
+    """2D moving-window kernel ('box', 'disk' or 'gaussian'), normalized to sum to one."""
+    if kernel not in KERNEL_METHODS:
+        raise ValueError('unknown kernel %r, use one of %s' % (kernel, list(KERNEL_METHODS)))
+    if window_size < 1:
+        raise ValueError('window_size must be positive, got %s' % window_size)
+
+    if kernel == 'disk':
+        r = window_size // 2
+        x = np.arange(window_size) - r
+        B = (x[:, None] ** 2 + x[None, :] ** 2 <= r ** 2).astype(float)
+        return B / np.sum(B)
+    if kernel == 'box':
+        return np.ones((window_size, window_size)) / np.power(window_size, 2)
+    w = _kernel_1d(kernel, window_size, sigma)
+    return np.outer(w, w)
+
+
+def choose_kernel_method(kernel, window_size):
+    """Cheapest way to apply a kernel of this shape and size."""
+    if window_size % 2 == 0:
+        return 'direct' if window_size <= 5 else 'fft'
+    if kernel == 'box':
+        #summed-area tables cost the same for any window; the two 1D passes
+        #win for small windows
+        return 'separable' if window_size < 15 else 'sat'
+    if kernel == 'gaussian':
+        return 'separable' if window_size < 61 else 'fft'
+    #disks are not separable, so go to FFT once the dense kernel gets big
+    return 'direct' if window_size <= 5 else 'fft'
+
+
+def smooth_field(A, window_size, kernel = 'box', method = 'auto', fillvalue = 0., sigma = None):
+    """Moving-window average of a 2D array.
+
+    Same result as convolve2d(A, B, mode='same', boundary='fill',
+    fillvalue=fillvalue) with B = smoothing_kernel(kernel, window_size), but
+    the work can be done with separable 1D passes, a summed-area table or an
+    FFT instead of the dense convolution. method='auto' picks the cheapest.
+    Even window sizes only work with 'direct' and 'fft'.
+    """
+    if method == 'auto':
+        method = choose_kernel_method(kernel, window_size)
+    if method not in KERNEL_METHODS.get(kernel, ()):
+        raise ValueError('method %r is not available for a %r kernel' % (method, kernel))
+    if window_size % 2 == 0 and method not in EVEN_WINDOW_METHODS:
+        raise ValueError('method %r needs an odd window_size, got %s (use one of %s)'
+            % (method, window_size, list(EVEN_WINDOW_METHODS)))
+
+    if method == 'direct':
+        B = smoothing_kernel(kernel, window_size, sigma)
+        return convolve2d(A, B, mode = 'same', boundary = 'fill', fillvalue = fillvalue)
+
+    #the kernel sums to one, so filling the edges with fillvalue is the same
+    #as smoothing (A - fillvalue) with zero fill and adding fillvalue back
+    A0 = A - fillvalue
+    r = window_size // 2
+    if method == 'separable':
+        w = _kernel_1d(kernel, window_size, sigma)
+        out = correlate1d(A0, w, axis = 0, mode = 'constant', cval = 0.)
+        out = correlate1d(out, w, axis = 1, mode = 'constant', cval = 0.)
+    elif method == 'sat':
+        #summed-area table with a leading row and column of zeros
+        P = np.pad(A0, r)
+        S = np.zeros((P.shape[0] + 1, P.shape[1] + 1))
+        np.cumsum(np.cumsum(P, axis = 0), axis = 1, out = S[1:, 1:])
+        nr, nc = A.shape
+        out = (S[window_size:window_size + nr, window_size:window_size + nc]
+               - S[:nr, window_size:window_size + nc]
+               - S[window_size:window_size + nr, :nc]
+               + S[:nr, :nc]) / np.power(window_size, 2)
+    else:
+        B = smoothing_kernel(kernel, window_size, sigma)
+        out = fftconvolve(A0, B, mode = 'same')
+    out += fillvalue
+    return out
+
+
+def precompute_K_convolution_weights(grid, shape, window_size, kernel = 'box', method = 'auto'):
+    """Convolve the mined, unmined and outside-basin indicator masks once.
+
+    Inside the recovery loop K only ever takes three values (mined, unmined
+    and the value assigned to closed nodes), so the moving-window average of
+    log10(K) at every node is just a weighted sum of those three log values.
+    The weights are the window averages of the indicator masks, which never
+    change during a run. Returns a dict of flattened weight arrays.
+    """
+    closed = np.zeros(grid.number_of_nodes, dtype=bool)
+    closed[grid.closed_boundary_nodes] = True
+
+    #closed nodes get the outside K value even if they are mapped as mined
+    mined = (shape == 1) & ~closed
+    unmined = ~mined & ~closed
+
+    grid_shape = (grid.number_of_node_rows, grid.number_of_node_columns)
+
+    #nodes beyond the grid edge are filled with the outside K value, so the
+    #outside indicator is filled with ones
+    weights = {
+        'mined': smooth_field(mined.reshape(grid_shape).astype(float), window_size, kernel, method, fillvalue = 0).flatten(),
+        'unmined': smooth_field(unmined.reshape(grid_shape).astype(float), window_size, kernel, method, fillvalue = 0).flatten(),
+        'outside': smooth_field(closed.reshape(grid_shape).astype(float), window_size, kernel, method, fillvalue = 1).flatten(),
+    }
+    return weights
+
+
+def outside_K(K_mined, K_unmined):
+    """K value assigned to closed nodes: 10^(mean of log10 Kmin and log10 Kmax)."""
+    return 10 ** (np.mean(np.log10([min(K_mined, K_unmined), max(K_mined, K_unmined)])))
+
+
+def convolved_erodibility(weights, K_mined, K_unmined, outside_K_value, out=None, work=None):
+    """Smoothed K field for one timestep from the precomputed mask weights.
+
+    Equivalent to setting mined/unmined/closed K values on the grid and
+    running the log10 moving-window convolution, without the convolution.
+    Pass out and work arrays to avoid allocating anything per call.
+    """
+    if out is None:
+        out = np.empty_like(weights['mined'])
+    if work is None:
+        work = np.empty_like(weights['mined'])
+    np.multiply(weights['mined'], np.log10(K_mined), out = out)
+    out += np.multiply(weights['unmined'], np.log10(K_unmined), out = work)
+    out += np.multiply(weights['outside'], np.log10(outside_K_value), out = work)
+    np.power(10, out, out = out)
+    return out
+
+
+def convolve_K_field(grid, K, window_size, kernel = 'box', method = 'direct', closed = None):
+    """Moving-window average of log10(K), done in place on the full grid.
+
+    Closed nodes (anything outside the basin) are first assigned the outside
+    K value, which is also used to pad the grid edges. closed is their node
+    ids (see regions.py), looked up on the grid if not given.
+    """
+    #first, assign a K value to the closed nodes
+    #this is any node outside the basin
+    #that K value will be 10^ (the average of the log10 of Kmin and Kmax)
+    outside_K_value = 10 ** (np.mean(np.array([np.log10(np.min(K)), np.log10(np.max(K))])))
+
+    #set closed nodes to have outside K val
+    K[grid.closed_boundary_nodes if closed is None else closed] = outside_K_value
+
+    #define the grid to be worked on
+    A = K.reshape((grid.number_of_node_rows, grid.number_of_node_columns))
+
+    #do the convolution (simple moving-window average for the box kernel)
+    logged_window_average = 10 ** smooth_field(np.log10(A), window_size, kernel, method, fillvalue = np.log10(outside_K_value))
+    K[:] = logged_window_average.flatten()
+    return K
+
+
+def yearly_K_grids(shape, K_modeled, K_unmined, mined = None):
+    """Callable giving the unsmoothed K grid for one model year, built on request.
+
+    Replaces the dense (n_nodes x recovery years) matrix of K grids. Only the
+    most recently requested year is kept, in one array that is refilled for
+    each new year, and repeated calls for the same year return it unchanged,
+    just like indexing the same column of the old matrix did. mined is the
+    node ids of the mined nodes (see regions.py), found from shape if not
+    given.
+    """
+    if mined is None:
+        mined = np.flatnonzero(shape == 1)
+    #same assignment as the old K_grids loop: a mask with any unmined
+    #node sets every node to unmined K before the mined nodes are set
+    unmined_K = np.zeros(len(shape), dtype = float)
+    unmined_K[shape.all() < 1 and shape.all() > -9999] = K_unmined
+    current = {'year': None, 'K': np.empty(len(shape), dtype = float)}
+
+    def K_grid(year):
+        if year != current['year']:
+            np.copyto(current['K'], unmined_K)
+            current['K'][mined] = K_modeled[year]
+            current['year'] = year
+        return current['K']
+
+    return K_grid
@@ -0,0 +1,253 @@
+######################################
+
+#Flow routing stage for the landscape evolution scripts in each watershed
+#folder. The incremental D8 router gives the same receivers, slopes and
+#drainage areas as PriorityFloodFlowRouter.run_one_step (flow_metric="D8"),
+#but only redoes flow directions of nodes whose filled elevation, or a
+#neighbor's, changed and only re-accumulates drainage area when a receiver
+#changed. It works on the router's private arrays, so it is only used with
+#the landlab versions it was checked against (see incremental_routing_supported);
+#otherwise the scripts route with run_one_step.
+
+#Please cite Bower et al., in review
+
+######################################
+
+import warnings
+import numpy as np
+import landlab
+from landlab import NodeStatus
+from profiling import lap
+try:
+    from landlab.components.priority_flood_flow_router.cfuncs import _D8_FlowAcc
+except ImportError:
+    _D8_FlowAcc = None
+
+#landlab versions (major, minor) whose PriorityFloodFlowRouter internals the
+#incremental router was checked against, and the internals it uses
+CHECKED_LANDLAB_VERSIONS = [(2, 7)]
+_ROUTER_ATTRIBUTES = ['_depression_free_dem', '_node_cell_area', '_sort', '_drainage_area', '_discharges',
+    '_prps', '_rcvs', '_slope', '_recvr_link', '_flow_metric', '_separate_hill_flow']
+
+
+def incremental_routing_supported(FA):
+    """Whether incremental_flow_router can stand in for FA.run_one_step.
+
+    It needs a landlab version in CHECKED_LANDLAB_VERSIONS, the router's
+    private arrays and D8 accumulation, and D8 routing without separate hill
+    flow.
+    """
+    version = tuple(int(v) for v in landlab.__version__.split('.')[:2] if v.isdigit())
+    if version not in CHECKED_LANDLAB_VERSIONS or _D8_FlowAcc is None:
+        return False
+    if not all(hasattr(FA, name) for name in _ROUTER_ATTRIBUTES):
+        return False
+    return FA._flow_metric == 'D8' and not FA._separate_hill_flow
+
+
+def _d8_neighbors(grid):
+    """Neighbors of every core node in the order the D8 router checks them.
+
+    Returns the neighbor ids (E, N, W, S, NE, NW, SW, SE), whether each
+    neighbor is open, and the D8 link to each neighbor.
+    """
+    c = grid.number_of_node_columns
+    core = np.array(grid.core_nodes)
+    offsets = np.array([1, c, -1, -c, c + 1, c - 1, -c - 1, -c + 1])
+    neighbors = core[:, np.newaxis] + offsets
+    active = (grid.status_at_node != NodeStatus.CLOSED).astype(float)[neighbors]
+    links = np.array(grid.d8s_at_node, dtype = int)[core]
+    return neighbors, active, links
+
+
+def incremental_flow_router(FA, grid, profile = None):
+    """Returns a function that updates flow routing for the current topography.
+
+    The returned route() fills depressions with FA (richdem priority flood),
+    then recomputes D8 receivers for the core nodes whose filled elevation,
+    or one of their 8 neighbors', changed. Drainage area is only re-accumulated when at least one
+    receiver changed. It depends on nothing but the receivers, and summing
+    equal cell areas is exact in any order. Slopes use the unfilled
+    topography, which changes every step, so they are always recomputed.
+    All of this works in arrays allocated here, once. The results are
+    bit-for-bit the same as FA.run_one_step() with D8 routing. With a
+    profile (see profiling.py), the fill is timed as 'depression filling'.
+    """
+    #a writeable copy, because np.take copies read-only index arrays
+    core = np.array(grid.core_nodes)
+    neighbors, active, links = _d8_neighbors(grid)
+    n = grid.number_of_nodes
+    n_core = len(core)
+    dist = np.multiply([1, 1, 1, 1, np.sqrt(2), np.sqrt(2), np.sqrt(2), np.sqrt(2)], grid.dx)
+    #the router divides diagonal drops by sqrt(2); dividing by 1 leaves the others exact
+    divisor = np.array([1, 1, 1, 1, np.sqrt(2), np.sqrt(2), np.sqrt(2), np.sqrt(2)])
+    #flat index of each core node's first neighbor, to pick the chosen one
+    first_neighbor = np.arange(n_core) * 8
+    neighbors_flat = neighbors.ravel()
+    links_flat = links.ravel()
+    is_core = grid.status_at_node == NodeStatus.CORE
+    not_core = np.flatnonzero(~is_core)
+    #the router checks this once per step; the scripts never change it
+    unit_flux = grid.at_node['water__unit_flux_in']
+    if np.any(unit_flux != 1):
+        cell_discharge = unit_flux * grid.dx * grid.dx
+        cell_discharge[~is_core] = 0
+    else:
+        cell_discharge = np.array(FA._node_cell_area)
+
+    #work arrays
+    changed = np.empty(n, dtype = bool)
+    el_d = np.empty((n_core, 8))
+    core_filled = np.empty(n_core)
+    el_d_max = np.empty(n_core)
+    choice = np.empty(n_core, dtype = int)
+    core_choice = np.full(n_core, -1, dtype = int) #-1 = drains to itself
+    all_rows = np.arange(n_core)
+    core_changed = np.empty(n_core, dtype = bool)
+    neighbor_changed = np.empty((n_core, 8), dtype = bool)
+    rows_core = np.empty(n_core, dtype = int)
+    rows_neighbors = np.empty((n_core, 8), dtype = int)
+    rows_active = np.empty((n_core, 8))
+    old_choice = np.empty(n_core, dtype = int)
+    pit = np.empty(n_core, dtype = bool)
+    choice_changed = np.empty(n_core, dtype = bool)
+    pick = np.empty(n_core, dtype = int)
+    core_receivers = np.empty(n_core, dtype = int)
+    core_links = np.empty(n_core, dtype = int)
+    core_slope = np.empty(n_core)
+    core_topo = np.empty(n_core)
+    core_dist = np.empty(n_core)
+    receivers = np.arange(n)
+    receiver_links = np.full(n, -1, dtype = int)
+    slope = np.zeros(n)
+    #accumulation runs over every node, with the nodes that are not core
+    #draining into an extra dummy node n, so no donor list has to be built
+    accumulation_receivers = np.empty(n + 1, dtype = int)
+    donors = np.empty(n, dtype = int)
+    da = np.zeros(n + 1)
+    dis = np.zeros(n + 1)
+    state = {'filled': None, 'routed': False}
+
+    def route():
+        FA.remove_depressions()
+        lap(profile, 'depression filling')
+        #remove_depressions makes a new array each time, so keeping the last
+        #one around needs no copy
+        filled = np.asarray(FA._depression_free_dem).reshape(n)
+        topo = FA.surface_values
+
+        if state['filled'] is None:
+            rows = all_rows
+        else:
+            #a node's direction depends on its own filled elevation and its
+            #8 neighbors', so only nodes with a change there are redone
+            np.not_equal(filled, state['filled'], out = changed)
+            np.take(changed, core, out = core_changed, mode = 'clip')
+            np.take(changed, neighbors, out = neighbor_changed, mode = 'clip')
+            np.logical_or(core_changed, neighbor_changed.any(axis = 1), out = core_changed)
+            rows = np.flatnonzero(core_changed)
+        state['filled'] = filled
+
+        receivers_changed = False
+        k = len(rows)
+        if k:
+            #same operations in the same order as the router, so ties and
+            #closed neighbors (el_d = -1) come out identically
+            if k == n_core:
+                sel_core, sel_neighbors, sel_active = core, neighbors, active
+            else:
+                sel_core, sel_neighbors, sel_active = rows_core[:k], rows_neighbors[:k], rows_active[:k]
+                np.take(core, rows, out = sel_core)
+                np.take(neighbors, rows, axis = 0, out = sel_neighbors)
+                np.take(active, rows, axis = 0, out = sel_active)
+            np.take(filled, sel_core, out = core_filled[:k], mode = 'clip')
+            np.take(filled, sel_neighbors, out = el_d[:k], mode = 'clip')
+            np.subtract(core_filled[:k, np.newaxis], el_d[:k], out = el_d[:k])
+            np.multiply(el_d[:k], 1e3, out = el_d[:k])
+            np.divide(el_d[:k], divisor, out = el_d[:k])
+            np.multiply(el_d[:k], sel_active, out = el_d[:k])
+            np.subtract(el_d[:k], 1, out = el_d[:k])
+            np.add(el_d[:k], sel_active, out = el_d[:k])
+            np.max(el_d[:k], axis = 1, out = el_d_max[:k])
+            np.argmax(el_d[:k], axis = 1, out = choice[:k])
+            np.greater_equal(el_d_max[:k], 0, out = pit[:k])
+            np.logical_not(pit[:k], out = pit[:k])
+            np.copyto(choice[:k], -1, where = pit[:k])
+            if k == n_core:
+                np.not_equal(choice, core_choice, out = choice_changed)
+                core_choice[:] = choice
+            else:
+                np.take(core_choice, rows, out = old_choice[:k])
+                np.not_equal(choice[:k], old_choice[:k], out = choice_changed[:k])
+                np.put(core_choice, rows, choice[:k])
+            receivers_changed = choice_changed[:k].any() or not state['routed']
+
+        np.less(core_choice, 0, out = pit)
+        #pits point at a neighbor here and are reset just below
+        np.add(first_neighbor, core_choice, out = pick)
+        np.copyto(pick, first_neighbor, where = pit)
+        np.take(neighbors_flat, pick, out = core_receivers, mode = 'clip')
+        np.copyto(core_receivers, core, where = pit)
+        np.take(links_flat, pick, out = core_links, mode = 'clip')
+        np.copyto(core_links, -1, where = pit)
+        np.put(receivers, core, core_receivers)
+        np.put(receiver_links, core, core_links)
+
+        np.take(topo, core, out = core_slope, mode = 'clip')
+        np.take(topo, core_receivers, out = core_topo, mode = 'clip')
+        np.subtract(core_slope, core_topo, out = core_slope)
+        np.take(dist, core_choice, out = core_dist, mode = 'clip')
+        np.divide(core_slope, core_dist, out = core_slope)
+        np.maximum(0, core_slope, out = core_slope)
+        np.copyto(core_slope, 0, where = pit)
+        np.put(slope, core, core_slope)
+
+        if receivers_changed:
+            #the router leaves nodes that are not core out of the donor
+            #order; here they donate to the dummy node instead, so every
+            #real node gets the same additions in the same order
+            np.copyto(accumulation_receivers[:n], receivers)
+            np.put(accumulation_receivers, not_core, n)
+            np.copyto(donors, FA._sort[::-1])
+            np.copyto(da[:n], FA._node_cell_area)
+            np.copyto(dis[:n], cell_discharge)
+            da[n] = dis[n] = 0
+            _D8_FlowAcc(da, dis, donors, accumulation_receivers)
+            FA._drainage_area[:] = da[:n]
+            FA._discharges[:] = dis[:n]
+            state['routed'] = True
+
+        FA._prps[:] = 1
+        FA._rcvs[:] = receivers
+        FA._slope[:] = slope
+        FA._recvr_link[:] = receiver_links
+
+    return route
+
+
+def routing_stage(FA, grid, incremental = True, profile = None):
+    """Returns route(precip, discharge), the whole flow routing stage of a step.
+
+    Fills depressions once, routes and accumulates drainage area (with
+    incremental_flow_router, or FA.run_one_step if incremental is False or
+    not supported by this landlab, see incremental_routing_supported), and
+    writes drainage area times precip into discharge in place. The fill
+    already writes depression_free_elevation and flood_status_code, so
+    neither is rebuilt afterwards. With a profile, the rest of the stage
+    is timed as 'flow routing' (all of it, fill included, if incremental
+    is False).
+    """
+    if incremental and not incremental_routing_supported(FA):
+        warnings.warn('incremental routing is not supported with landlab %s; routing with run_one_step'
+            % landlab.__version__)
+        incremental = False
+    route_d8 = incremental_flow_router(FA, grid, profile) if incremental else FA.run_one_step
+    drainage_area = grid.at_node['drainage_area']
+
+    def route(precip, discharge):
+        route_d8()
+        np.multiply(drainage_area, precip, out = discharge)
+        lap(profile, 'flow routing')
+        return discharge
+
+    return route
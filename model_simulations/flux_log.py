@@ -0,0 +1,89 @@
+######################################
+
+#Binary sediment flux log for the landscape evolution scripts in each
+#watershed folder. A run appends (time, dt, flux) records in chunks as it
+#goes, so a partial run can be read, and the figure scripts read each
+#entry's timestep instead of inferring it from its position in the record.
+
+#Layout: 8 bytes b'FLUXLOG1', the header length as a little-endian uint64,
+#a JSON header (watershed, run, scenario, run parameters) padded with spaces
+#to that length, then one little-endian float64 (time, dt, flux) record per
+#step. time is the model year at the end of the step.
+
+#Please cite Bower et al., in review
+
+######################################
+
+import os
+import json
+import numpy as np
+
+MAGIC = b'FLUXLOG1'
+FLUX_RECORD = np.dtype([('time', '<f8'), ('dt', '<f8'), ('flux', '<f8')])
+
+
+def _header_bytes(header, size = None):
+    text = json.dumps(header, default = str).encode()
+    if size is None:
+        #room for close_flux_log to fill in the header, with records
+        #starting at a multiple of 4 kB
+        size = -(-(len(text) + 16 + 1024) // 4096) * 4096 - 16
+    return text.ljust(size), size
+
+
+def open_flux_log(filename, header, chunk = 100):
+    """Start a new flux log, replacing any old one, and return its state.
+
+    Records are written chunk at a time by write_flux_log. The header gets
+    complete = False until close_flux_log marks the run finished.
+    """
+    header = dict(header, complete = False, modeled_records = None, stop_time = None)
+    text, size = _header_bytes(header)
+    f = open(filename, 'wb')
+    f.write(MAGIC + np.array(size, dtype = '<u8').tobytes() + text)
+    f.flush()
+    return dict(file = f, header = header, header_size = size, written = 0, time = 0., chunk = chunk)
+
+
+def write_flux_log(log, sed_flux, sed_flux_dt, counter, flush = False):
+    """Append the flux record's entries from the last write up to counter.
+
+    Nothing is written until a full chunk is waiting, unless flush is True.
+    """
+    n = counter - log['written']
+    if n <= 0 or (n < log['chunk'] and not flush):
+        return
+    records = np.empty(n, dtype = FLUX_RECORD)
+    records['dt'] = sed_flux_dt[log['written']:counter]
+    records['flux'] = sed_flux[log['written']:counter]
+    records['time'] = log['time'] + np.cumsum(records['dt'])
+    log['file'].write(records.tobytes())
+    log['file'].flush()
+    log['time'] = records['time'][-1]
+    log['written'] = counter
+
+
+def close_flux_log(log, **header_updates):
+    """Mark the run complete in the header (plus any updates) and close the log."""
+    log['header'].update(header_updates, complete = True)
+    text, _ = _header_bytes(log['header'], log['header_size'])
+    if len(text) == log['header_size']:
+        log['file'].seek(len(MAGIC) + 8)
+        log['file'].write(text)
+    log['file'].close()
+
+
+def read_flux_log(filename):
+    """Header dict and records (fields time, dt, flux) of a flux log.
+
+    A log that is still being written, or that was cut off, gives every
+    record written so far.
+    """
+    with open(filename, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(filename + ' is not a flux log')
+        size = int(np.frombuffer(f.read(8), dtype = '<u8')[0])
+        header = json.loads(f.read(size))
+        count = (os.fstat(f.fileno()).st_size - len(MAGIC) - 8 - size) // FLUX_RECORD.itemsize
+        records = np.fromfile(f, dtype = FLUX_RECORD, count = count)
+    return header, records
@@ -0,0 +1,119 @@
+######################################
+
+#Implicit hillslope diffusion for the landscape evolution scripts in each
+#watershed folder. LinearDiffuser is explicit, and splits any step longer
+#than its stability limit (see timestepping.py) into substeps. Here each
+#step is one backward Euler step of the same linear diffusion, which is
+#stable at any dt. It solves for the new elevation of every core node at
+#once, with no flux across links to closed nodes and the open boundary
+#nodes (the outlet) held at their current elevation, as LinearDiffuser
+#does. The grid's topology never changes, so the matrix is built once and
+#only scaled by dt.
+
+#'direct' factors the matrix with a sparse LU and keeps the factorization
+#of the last few timestep lengths, so a run with fixed steps factors it
+#once per phase. 'cg' solves it with Jacobi-preconditioned conjugate
+#gradients started from the current surface, which needs no factorization
+#and far less memory on big grids, and only a few iterations while
+#D*dt/dx^2 is small.
+
+#Please cite Bower et al., in review
+
+######################################
+
+import numpy as np
+import scipy.sparse as sparse
+from scipy.sparse.linalg import splu
+from landlab import NodeStatus
+
+
+def diffusion_matrix(grid, D):
+    """Matrices of linear diffusion with diffusivity D on the grid's active links.
+
+    Returns (W, boundary, area): dz/dt at the core nodes is
+    -(W_cc @ z[core] + W_cb @ z[boundary]) / area, where W is the core
+    rows of the link conductance matrix, split into W_cc (core columns)
+    and W_cb (open boundary columns).
+    """
+    links = grid.active_links
+    tail, head = grid.node_at_link_tail[links], grid.node_at_link_head[links]
+    #flux per unit elevation difference across each link's face
+    conductance = D * grid.length_of_face[grid.face_at_link[links]] / grid.length_of_link[links]
+    n = grid.number_of_nodes
+    W = sparse.coo_matrix(
+        (np.concatenate([conductance, conductance, -conductance, -conductance]),
+         (np.concatenate([tail, head, tail, head]), np.concatenate([tail, head, head, tail]))),
+        shape = (n, n)).tocsr()
+    core = np.array(grid.core_nodes)
+    boundary = np.flatnonzero((grid.status_at_node != NodeStatus.CORE) & (grid.status_at_node != NodeStatus.CLOSED))
+    W = W[core]
+    return (W[:, core].tocsc(), W[:, boundary].tocsr()), boundary, grid.area_of_cell[grid.cell_at_node[core]]
+
+
+def implicit_diffuser(grid, D, method = 'direct', values = 'topographic__elevation', tolerance = 1e-9,
+        max_iterations = 1000, cached_factorizations = 4):
+    """Returns diffuse(dt), one implicit linear diffusion step of a node field.
+
+    Takes the place of LinearDiffuser(grid, linear_diffusivity = D).run_one_step.
+    method is 'direct' (sparse LU) or 'cg' (conjugate gradients, iterated
+    until no core node's elevation is off by more than tolerance). The
+    grid's boundary conditions must be set before this is called.
+    """
+    if method not in ('direct', 'cg'):
+        raise ValueError("method must be 'direct' or 'cg', not %r" % method)
+    (W_cc, W_cb), boundary, area = diffusion_matrix(grid, D)
+    core = np.array(grid.core_nodes)
+    area_matrix = sparse.diags(area, format = 'csc')
+    W_diagonal = W_cc.diagonal()
+    z_core = np.empty(len(core))
+    rhs = np.empty(len(core))
+    systems = {}
+
+    def system(dt):
+        #multiplying by cell area keeps the matrix symmetric on any grid
+        if dt not in systems:
+            if len(systems) >= cached_factorizations:
+                systems.pop(next(iter(systems)))
+            A = area_matrix + dt * W_cc
+            systems[dt] = splu(A, permc_spec = 'MMD_AT_PLUS_A') if method == 'direct' else (A.tocsr(), area + dt * W_diagonal)
+        return systems[dt]
+
+    def diffuse(dt):
+        z = grid.at_node[values]
+        np.take(z, core, out = z_core)
+        np.multiply(area, z_core, out = rhs)
+        rhs[:] -= dt * (W_cb @ z[boundary])
+        if method == 'direct':
+            z[core] = system(dt).solve(rhs)
+        else:
+            A, diagonal = system(dt)
+            z[core] = conjugate_gradients(A, rhs, z_core, diagonal, tolerance, max_iterations)
+
+    return diffuse
+
+
+def conjugate_gradients(A, b, x, diagonal, tolerance, max_iterations):
+    """Solve A x = b (A symmetric positive definite) by Jacobi-preconditioned CG, from x (updated in place).
+
+    Stops once the change each residual would need at its node, r/diagonal,
+    is at most tolerance everywhere.
+    """
+    r = b - A @ x
+    z = r / diagonal
+    p = z.copy()
+    rz = r @ z
+    for i in range(max_iterations):
+        if np.max(np.abs(z)) <= tolerance:
+            return x
+        Ap = A @ p
+        alpha = rz / (p @ Ap)
+        x += alpha * p
+        r -= alpha * Ap
+        np.divide(r, diagonal, out = z)
+        rz_new = r @ z
+        p *= rz_new / rz
+        p += z
+        rz = rz_new
+    if np.max(np.abs(z)) <= tolerance:
+        return x
+    raise RuntimeError('hillslope diffusion did not converge in %d iterations' % max_iterations)
@@ -0,0 +1,102 @@
+######################################
+
+#Closed-form erodibility (K) trajectories for the landscape evolution scripts
+#in each watershed folder. This replaces K_timeseries_scaled_CMS.txt, the
+#10000 x 11 table that fig5.py writes. The table's columns are recovery
+#fractions 0, 0.1, ..., 1. K of mined land falls from K_max as
+#K_max - m*t**0.25 over the recovery period and then stays at its last
+#value. A trajectory is evaluated for any recovery fraction and any
+#(fractional) time. The table's fractions are steps of np.arange (e.g.
+#0.30000000000000004, not 0.3), so whole scenarios use those same values
+#(recovery_fraction). The values then agree with the table to about 1e-14
+#(relative), not to the bit: t**0.25 differs in the last bits between numpy
+#builds, and fig5.py itself does not give the table's exact values here.
+#A trajectory's parameters can be saved to and loaded from a small .npz.
+
+#Please cite Bower et al., in review
+
+######################################
+
+import os
+
+import numpy as np
+import pandas as pd
+
+#parameters of K_timeseries_scaled_CMS.txt: K_min is the regional value
+#from Gallen (2018); K_max keeps the ratio of median to minimum gully K
+#measured in fig5.py. FIG5_K_MAX is FIG5_K_MIN * gully_K_ratio(GULLY_DATA),
+#kept as a number so runs do not need the gully data: if fig5.py's K_min
+#or gully data change, it has to be updated with them.
+FIG5_K_MIN = 1.3e-6
+FIG5_K_MAX = 3.4011257789413316e-05
+GULLY_DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'fig_4', 'final_gully_data.csv')
+#recovery fractions of the table's columns, as fig5.py computes them
+TABLE_FRACTIONS = np.arange(0, 1.1, 0.1)
+
+
+def gully_K_ratio(filename = GULLY_DATA, DA_threshold = 100, m = 0.5, n = 1):
+    """Ratio of median to minimum K of the mapped gullies, as fig5.py computes it."""
+    gullies = pd.read_csv(filename, delimiter = ",")
+    gullies = gullies.loc[gullies['DA'] > DA_threshold]
+    E = gullies['avg_depth'] / (2021 - gullies['min_year']) #measurements were made in 2021
+    K = (E / ((gullies['DA'] ** m) * (gullies['slope'] ** n))).to_numpy(dtype = float)
+    K = K[~np.isnan(K)]
+    return float(np.percentile(K, 50) / np.min(K))
+
+
+def recovery_fraction(scenario):
+    """Recovery fraction of a scenario (0-10, in tenths of full recovery).
+
+    Whole scenarios take the fraction of their column of the old K table;
+    others (e.g. 2.5) are scenario / 10.
+    """
+    if scenario == int(scenario) and 0 <= scenario < len(TABLE_FRACTIONS):
+        return float(TABLE_FRACTIONS[int(scenario)])
+    return scenario / 10
+
+
+def k_trajectory(K_min = FIG5_K_MIN, K_max = FIG5_K_MAX, recovery_period = 200, exponent = 0.25, n_years = 10000):
+    """Parameters of a K trajectory, as a dict.
+
+    A full recovery (fraction 1) brings K from K_max down to K_min by the
+    end of recovery_period; fraction 0 keeps K at K_max. n_years is the
+    length of the yearly series that trajectory_series returns by default.
+    """
+    return dict(K_min = float(K_min), K_max = float(K_max), recovery_period = int(recovery_period),
+        exponent = float(exponent), n_years = int(n_years))
+
+
+def trajectory_K(trajectory, fraction, t):
+    """K of mined land at time(s) t (years since mining) for a recovery fraction.
+
+    Same arithmetic as fig5.py, so with a fraction from recovery_fraction
+    the table's values are reproduced to rounding (see above). Like the
+    table, K stops changing after the last year of the recovery period, at
+    its value in that year.
+    """
+    K_max = trajectory['K_max']
+    K_min_star = K_max - ((K_max - trajectory['K_min']) * fraction)
+    m = (K_max - K_min_star) / (trajectory['recovery_period'] ** trajectory['exponent'])
+    t = np.minimum(np.asarray(t, dtype = float), trajectory['recovery_period'] - 1)
+    return K_max - (m * t ** trajectory['exponent'])
+
+
+def trajectory_series(trajectory, fraction, n_years = None):
+    """Yearly K for a recovery fraction: one column of the old K table."""
+    return trajectory_K(trajectory, fraction, np.arange(n_years or trajectory['n_years']))
+
+
+def trajectory_minimum(trajectory):
+    """Smallest K of any recovery fraction: the end of a full recovery."""
+    return float(trajectory_K(trajectory, 1., trajectory['recovery_period'] - 1))
+
+
+def save_k_trajectory(filename, trajectory):
+    """Write a trajectory's parameters to a small .npz."""
+    np.savez(filename, **trajectory)
+
+
+def load_k_trajectory(filename):
+    """Read a trajectory written by save_k_trajectory."""
+    with np.load(filename) as f:
+        return k_trajectory(**{key: f[key].item() for key in f.files})
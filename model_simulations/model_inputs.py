@@ -0,0 +1,142 @@
+######################################
+
+#Loading and sharing the read-only inputs of the landscape evolution
+#scripts in each watershed folder (DEMs, K mask, climate)
+
+#Please cite Bower et al., in review
+
+######################################
+
+import os
+import numpy as np
+import pandas as pd
+from multiprocessing import shared_memory
+from landlab import RasterModelGrid
+from raster_cache import raster_values
+
+#input files for each study watershed, relative to its folder
+WATERSHEDS = {
+    'ben_creek': {
+        'name': 'Ben Creek',
+        'climate_row': 3, #this watershed's row of yearly_data.csv
+        'prefix': 'bc',
+        'post_dem': 'bencreek_post_10m.asc',
+        'pre_dem': 'bencreek_pre_10m.asc',
+        'K_mask': 'BC_K_mask_edited.asc',
+    },
+    'laurel_creek': {
+        'name': 'Laurel Creek',
+        'climate_row': 2, #this watershed's row of yearly_data.csv
+        'prefix': 'lc',
+        'post_dem': 'laurelcreek_post_10m.asc',
+        'pre_dem': 'laurelcreek_pre_10m.asc',
+        'K_mask': 'LC_K_mask_edited.asc',
+    },
+    'mud_river': {
+        'name': 'Mud River',
+        'climate_row': 4, #this watershed's row of yearly_data.csv
+        'prefix': 'mr',
+        'post_dem': 'mudriver_post_10m.asc',
+        'pre_dem': 'mudriver_pre_10m.asc',
+        'K_mask': 'MR_K_mask_edited.asc',
+    },
+    'spruce_fork': {
+        'name': 'Spruce Fork',
+        'climate_row': 0, #this watershed's row of yearly_data.csv
+        'prefix': 'sf',
+        'post_dem': 'sprucefork_fixed_post_10m.asc',
+        'pre_dem': 'sprucefork_fixed_pre_10m.asc',
+        'K_mask': 'SF_K_mask_edited.asc',
+    },
+    'white_oak': {
+        'name': 'White Oak',
+        'climate_row': 1, #this watershed's row of yearly_data.csv
+        'prefix': 'wo',
+        'post_dem': 'whiteoak_post_10m.asc',
+        'pre_dem': 'whiteoak_pre_10m.asc',
+        'K_mask': 'WO_K_mask_edited.asc',
+    },
+}
+
+#rasters are stored as node arrays plus the grid metadata to rebuild them
+RASTERS = ('post_dem', 'pre_dem', 'K_mask')
+
+
+def load_watershed_inputs(watershed_dir, watershed):
+    """Read every input a watershed's simulations need, once.
+
+    Returns a dict of numpy arrays: the node values of each raster (in
+    landlab node order) and 'yearly_data' (the climate table as floats; the
+    two label columns are NaN). Grid metadata for each raster is stored
+    under '<raster>_grid'. The K timeseries is computed by the scripts
+    themselves (see k_trajectory.py).
+    """
+    files = WATERSHEDS[watershed]
+    path = os.path.join(watershed_dir, 'inputs', '')
+    inputs = {}
+    for raster in RASTERS:
+        if not os.path.exists(path + files[raster]):
+            continue
+        #the cache holds the grid metadata, so no grid has to be built here
+        values, metadata = raster_values(path + files[raster])
+        inputs[raster] = np.array(values, dtype = float)
+        inputs[raster + '_grid'] = {
+            'shape': tuple(metadata['shape']),
+            'xy_spacing': metadata['xy_spacing'],
+            'xy_of_lower_left': tuple(metadata['xy_of_lower_left']),
+        }
+    yearly_data = pd.read_csv(path + 'yearly_data.csv').to_numpy()
+    inputs['yearly_data'] = np.full(yearly_data.shape, np.nan)
+    inputs['yearly_data'][:, 2:] = yearly_data[:, 2:].astype('float')
+    return inputs
+
+
+def grid_from_inputs(inputs, raster, name):
+    """Build a RasterModelGrid from a preloaded raster, like read_esri_ascii.
+
+    The node values are copied into a new field, so the shared input array
+    is never modified by the model.
+    """
+    grid = RasterModelGrid(**inputs[raster + '_grid'])
+    values = grid.add_field(name, np.array(inputs[raster], dtype = float), at = 'node')
+    return grid, values
+
+
+def share_inputs(inputs):
+    """Copy the input arrays into shared memory blocks.
+
+    Returns the list of blocks (the caller must keep them alive and unlink
+    them when done) and a picklable spec that attach_inputs uses to map the
+    same memory in another process.
+    """
+    blocks = []
+    spec = {}
+    for key, value in inputs.items():
+        if not isinstance(value, np.ndarray):
+            spec[key] = value
+            continue
+        block = shared_memory.SharedMemory(create = True, size = max(value.nbytes, 1))
+        np.ndarray(value.shape, dtype = value.dtype, buffer = block.buf)[...] = value
+        blocks.append(block)
+        spec[key] = ('shared', block.name, value.shape, value.dtype.str)
+    return blocks, spec
+
+
+def attach_inputs(spec):
+    """Read-only numpy views of inputs placed in shared memory by share_inputs.
+
+    Returns the inputs dict and the list of attached blocks, which must stay
+    referenced for as long as the arrays are used.
+    """
+    blocks = []
+    inputs = {}
+    for key, value in spec.items():
+        if isinstance(value, tuple) and len(value) == 4 and value[0] == 'shared':
+            block = shared_memory.SharedMemory(name = value[1])
+            array = np.ndarray(value[2], dtype = np.dtype(value[3]), buffer = block.buf)
+            array.flags.writeable = False
+            blocks.append(block)
+            inputs[key] = array
+        else:
+            inputs[key] = value
+    return inputs, blocks
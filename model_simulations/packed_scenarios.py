@@ -0,0 +1,371 @@
+######################################
+
+#Packed multi-scenario runs for one watershed. The recovery scenarios of a
+#watershed only differ in the K of mined land, so several of them can run
+#as copies of the watershed laid side by side in one RasterModelGrid,
+#separated by gutters of closed nodes. Flow routing, SPACE and diffusion
+#then advance every scenario in one call per step, and the per-step Python
+#and component overhead is paid once for the whole pack instead of once
+#per scenario. Each copy keeps its own erodibility and outlet, and the
+#sediment flux is split back per scenario with precomputed node blocks.
+
+#Copies are placed along the edge the outlet is on, so every outlet stays
+#on the raster edge, which is where the depression filling drains to. The
+#gutters are half a K window wide, so the K smoothing of one copy never
+#sees another. K is smoothed with the precomputed mask weights (the
+#'precomputed' K_convolution_method of the scripts). The scripts default to
+#'direct', which smooths K a second time on the second half-year step, so
+#packed outputs differ slightly from the default scripts' while keeping
+#their file names; the method is recorded in each flux log and summary.
+
+#Usage (from the model_simulations folder):
+#   python packed_scenarios.py ben_creek --scenarios 0 5 10
+#or through ../ensemble.py with --pack.
+
+#Please cite Bower et al., in review
+
+######################################
+
+import os
+import argparse
+
+import numpy as np
+import pandas as pd
+from landlab import RasterModelGrid, NodeStatus
+from landlab.components import PriorityFloodFlowRouter, LinearDiffuser, SpaceLargeScaleEroder
+
+from model_inputs import WATERSHEDS, grid_from_inputs
+from raster_cache import read_raster
+from domain import watershed_crop, crop_grid, cropped_node_ids, save_field
+from erodibility import precompute_K_convolution_weights, outside_K, convolved_erodibility
+from k_trajectory import k_trajectory, recovery_fraction, trajectory_series, trajectory_minimum
+from flow_routing import routing_stage
+from hillslope import implicit_diffuser
+from flux_log import open_flux_log, write_flux_log, close_flux_log
+from run_summary import open_run_summary, add_to_summary, write_run_summary
+from profiling import new_profile, start_step, lap, write_profile
+from telemetry import open_progress, progress_due, report_progress, close_progress
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+OUTPUT_PATH = '/scratch/cs00048/MTR/wsheds/%s/outputs/' #as in the scripts, for each watershed
+
+#the scenario scripts' parameters
+SCENARIO_PARAMS = dict(
+    total_time = 10000, recovery_period = 200, recovery_dt = 0.5, fast_dt = 1, D = 3e-3, K_br = 0,
+    m_sp = 0.5, n_sp = 1, F_f = 0, phi = 0.3, H_star = 1., v_s = 0.01, sp_crit_sed = 0, sp_crit_br = 0,
+    BL_lowering_rate = 2.7e-5, window_size = 9, K_kernel = 'box', K_kernel_method = 'direct',
+    hillslope_solver = 'explicit', crop_to_watershed = True, incremental_routing = True, flux_log_chunk = 100,
+    summary_milestones = [200, 1000, 10000], profile_steps = True, progress_interval_seconds = 60,
+    K_convolution_method = 'precomputed') #the only method packed runs have
+
+
+def pack_grid(grid, n_copies, outlet_node, gutter):
+    """A grid holding n_copies of a set-up watershed grid, and where each copy is.
+
+    Copies go side by side if the outlet is on the bottom or top edge, and
+    one above the other otherwise, gutter closed nodes apart. Every node
+    field and the boundary statuses are copied; gutter nodes are closed and
+    set up like the nodata nodes around a watershed: -99999 topography, the
+    soil depth of the copy's closed nodes, and bedrock that far below (a
+    negative soil depth would make SPACE's exp(-H) overflow). Returns the
+    packed grid and the blocks: 'nodes' (n_copies x nodes, the packed id of
+    each node of each copy in the copy's node order), 'axis' (1 for side by
+    side, 0 for stacked) and 'number_of_nodes' of the packed grid.
+    """
+    rows, cols = grid.shape
+    outlet_row = outlet_node // cols
+    axis = 1 if outlet_row in (0, rows - 1) else 0
+    if axis == 1:
+        shape = (rows, n_copies * cols + (n_copies - 1) * gutter)
+        offsets = [(0, i * (cols + gutter)) for i in range(n_copies)]
+    else:
+        shape = (n_copies * rows + (n_copies - 1) * gutter, cols)
+        offsets = [(i * (rows + gutter), 0) for i in range(n_copies)]
+    packed = RasterModelGrid(shape, xy_spacing = grid.dx, xy_of_lower_left = tuple(grid.xy_of_lower_left))
+    ids = np.arange(packed.number_of_nodes).reshape(shape)
+    blocks = dict(nodes = np.array([ids[r:r + rows, c:c + cols].ravel() for r, c in offsets]), axis = axis,
+        number_of_nodes = packed.number_of_nodes)
+
+    closed = np.flatnonzero(grid.status_at_node == NodeStatus.CLOSED)
+    soil = float(grid.at_node['soil__depth'][closed[0]]) if 'soil__depth' in grid.at_node and len(closed) else 0.
+    fill = {'topographic__elevation': -99999., 'soil__depth': soil, 'bedrock__elevation': -99999. - soil}
+    for name in grid.at_node.keys():
+        packed.add_field(name, packed_values(blocks, grid.at_node[name], fill.get(name, 0)), at = 'node')
+    packed.status_at_node = packed_values(blocks, grid.status_at_node, NodeStatus.CLOSED)
+    return packed, blocks
+
+
+def packed_values(blocks, values, fill):
+    """Node values of one copy repeated in every copy, and fill in the gutters."""
+    out = np.full(blocks['number_of_nodes'], fill, dtype = np.asarray(values).dtype)
+    for block in blocks['nodes']:
+        out[block] = values
+    return out
+
+
+def block_field(packed, blocks, name, i):
+    """Values of a field on copy i, in the copy's node order."""
+    return packed.at_node[name][blocks['nodes'][i]]
+
+
+def watershed_grid(watershed_dir, watershed, inputs = None, crop_to_watershed = True, window_size = 9):
+    """The watershed's grid, K mask, outlet and crop, set up as in the scenario scripts."""
+    files = WATERSHEDS[watershed]
+    path = os.path.join(watershed_dir, 'inputs', '')
+    if inputs is None:
+        mg, z = read_raster(path + files['post_dem'], name = 'topographic__elevation')
+        k_array, ksp = read_raster(path + files['K_mask'], name = 'k')
+    else:
+        mg, z = grid_from_inputs(inputs, 'post_dem', name = 'topographic__elevation')
+        k_array, ksp = grid_from_inputs(inputs, 'K_mask', name = 'k')
+    mg.set_closed_boundaries_at_grid_edges(True,True,True,True)
+    mg.set_nodata_nodes_to_closed(z, -99999)
+    outlet_node = mg.set_watershed_boundary_condition(z, nodata_value = -99999, return_outlet_id = True)
+    mg.add_zeros('soil__depth', at = 'node')
+    mg.at_node['soil__depth'] += 500
+    mg.add_zeros('bedrock__elevation', at = 'node')
+    mg.at_node['bedrock__elevation'] = mg.at_node['topographic__elevation'] - mg.at_node['soil__depth']
+    crop = None
+    if crop_to_watershed:
+        crop = watershed_crop(mg, z, -99999, halo = max(1, window_size // 2))
+        mg = crop_grid(mg, crop)
+        outlet_node = cropped_node_ids(crop, outlet_node)
+        ksp = ksp[crop['nodes']]
+    return mg, ksp, outlet_node, crop
+
+
+def set_up_packed(watershed_dir, watershed, scenario_ids, inputs = None, **params):
+    """Set up a packed run of several recovery scenarios of one watershed.
+
+    params override SCENARIO_PARAMS. Returns the run's state, which
+    advance steps forward and write_outputs saves.
+    """
+    p = dict(SCENARIO_PARAMS, **params)
+    if p['K_convolution_method'] != 'precomputed':
+        raise ValueError("packed runs smooth K with the 'precomputed' K_convolution_method only")
+    n = len(scenario_ids)
+    mg, ksp, outlet_node, crop = watershed_grid(watershed_dir, watershed, inputs, p['crop_to_watershed'], p['window_size'])
+    packed, blocks = pack_grid(mg, n, outlet_node[0], gutter = max(1, p['window_size'] // 2))
+    print('%s: %d scenarios packed into a %d x %d grid' % (WATERSHEDS[watershed]['name'], n, *packed.shape))
+
+    #K of mined land through time for each scenario, as in the scripts
+    if inputs is None:
+        climate_data = pd.read_csv(os.path.join(watershed_dir, 'inputs', 'yearly_data.csv')).to_numpy()
+    else:
+        climate_data = inputs['yearly_data']
+    climate_data = np.round((climate_data[WATERSHEDS[watershed]['climate_row'],2:].astype('float')/1000),2)
+    K_trajectory = k_trajectory()
+    precip_forcing = np.zeros(K_trajectory['n_years'] + 1)
+    precip_forcing[0:len(climate_data)], precip_forcing[len(climate_data):] = climate_data, climate_data[-1]
+    K_factor = p['v_s']/np.min(precip_forcing) + 1
+
+    FA = PriorityFloodFlowRouter(packed, flow_metric = "D8", suppress_out = True)
+    FA.run_one_step()
+    profile = new_profile() if p['profile_steps'] else None
+    route_flow = routing_stage(FA, packed, p['incremental_routing'], profile)
+    LD = LinearDiffuser(packed, linear_diffusivity = p['D'])
+    diffuse = LD.run_one_step if p['hillslope_solver'] == 'explicit' else implicit_diffuser(packed, p['D'], p['hillslope_solver'])
+    packed.at_node['soil__depth'] = packed.at_node['topographic__elevation'] - packed.at_node['bedrock__elevation']
+    packed.at_node['surface_water__discharge'] = packed.at_node['drainage_area'] * precip_forcing[0]
+
+    #the mask weights are the same in every copy; each node takes the mined
+    #and outside K of its own copy's scenario
+    K_weights = precompute_K_convolution_weights(packed, packed_values(blocks, ksp, -9999), p['window_size'],
+        p['K_kernel'], p['K_kernel_method'])
+    node_copy = np.zeros(packed.number_of_nodes, dtype = int)
+    for i, block in enumerate(blocks['nodes']):
+        node_copy[block] = i
+
+    packed.add_zeros('erodibility', at = 'node')
+    SPACE = SpaceLargeScaleEroder(packed, K_sed = packed.at_node['erodibility'], K_br = 0, F_f = p['F_f'],
+        phi = p['phi'], H_star = p['H_star'], v_s = p['v_s'], m_sp = p['m_sp'], n_sp = p['n_sp'],
+        sp_crit_sed = p['sp_crit_sed'], sp_crit_br = p['sp_crit_sed'], erode_flooded_nodes = False)
+    #SPACE erodes with the discharge routed on the step before, as in the
+    #scripts, so routing writes to its own array
+    space_discharge = packed.at_node['surface_water__discharge']
+    packed.at_node['surface_water__discharge'] = space_discharge.copy()
+
+    #core nodes of every copy one after the other, so each scenario's flux
+    #is a sum over its own slice, in the same order as in a single run
+    core_blocks = blocks['nodes'][:, np.array(mg.core_nodes)]
+    core_nodes = core_blocks.ravel()
+    n_steps = int(((p['recovery_period'] / p['recovery_dt'])+((p['total_time'] - p['recovery_period'])/p['fast_dt'])))
+    return dict(
+        watershed = watershed, params = p, scenario_ids = list(scenario_ids), grid = packed, blocks = blocks,
+        watershed_grid = mg, crop = crop, outlets = blocks['nodes'][:, outlet_node].ravel(),
+        precip_forcing = precip_forcing, K_trajectory = K_trajectory, K_factor = K_factor,
+        K_modeled = np.array([trajectory_series(K_trajectory, recovery_fraction(s)) for s in scenario_ids]) * K_factor,
+        K_unmined = trajectory_minimum(K_trajectory) * K_factor,
+        K_weights = K_weights, node_copy = node_copy, K_mined_at_node = np.empty(packed.number_of_nodes),
+        outside_K_at_node = np.empty(packed.number_of_nodes), K_smoothed = np.empty(packed.number_of_nodes),
+        K_work = np.empty(packed.number_of_nodes),
+        FA = FA, route_flow = route_flow, diffuse = diffuse, SPACE = SPACE, phase = 'recovery',
+        #SPACE keeps using this discharge array, in the fast phase too
+        space_discharge = space_discharge,
+        core_nodes = core_nodes, core_dz = np.empty(len(core_nodes)), core_topo = np.empty(len(core_nodes)),
+        core_slices = [slice(i * core_blocks.shape[1], (i + 1) * core_blocks.shape[1]) for i in range(n)],
+        sed_flux_via_diff = np.zeros((n, n_steps)), sed_flux_dt = np.zeros(n_steps), timer = 0, counter = 0,
+        profile = profile, progress = None, flux_logs = None)
+
+
+def set_scenario(run, i, scenario):
+    """Switch copy i to another recovery scenario from the current model time on."""
+    run['scenario_ids'][i] = scenario
+    run['K_modeled'][i] = trajectory_series(run['K_trajectory'], recovery_fraction(scenario)) * run['K_factor']
+
+
+def start_fast_phase(run):
+    """New SPACE and discharge array for the fast loop, as in the scripts."""
+    packed, p = run['grid'], run['params']
+    packed.at_node['surface_water__discharge'] = run['space_discharge']
+    run['SPACE'] = SpaceLargeScaleEroder(packed, K_sed = packed.at_node['erodibility'], K_br = p['K_br'], F_f = p['F_f'],
+        phi = p['phi'], H_star = p['H_star'], v_s = p['v_s'], m_sp = p['m_sp'], n_sp = p['n_sp'],
+        sp_crit_sed = p['sp_crit_sed'], sp_crit_br = p['sp_crit_sed'], erode_flooded_nodes = False)
+    packed.at_node['surface_water__discharge'] = np.zeros(packed.number_of_nodes)
+    run['phase'] = 'fast'
+
+
+def _account_flux(run, dt):
+    packed = run['grid']
+    packed.at_node['topographic__elevation'][run['outlets']] -= run['params']['BL_lowering_rate'] * dt
+    np.subtract(packed.at_node['topographic__elevation'], packed.at_node['bedrock__elevation'], out = packed.at_node['soil__depth'])
+    np.take(packed.at_node['topographic__elevation'], run['core_nodes'], out = run['core_topo'], mode = 'clip')
+    np.subtract(run['core_dz'], run['core_topo'], out = run['core_dz'])
+    for i, block in enumerate(run['core_slices']):
+        run['sed_flux_via_diff'][i, run['counter']] = np.sum(run['core_dz'][block]) / dt
+    run['sed_flux_dt'][run['counter']] = dt
+
+
+def advance(run, until):
+    """Step a packed run forward to model year until (at most total_time)."""
+    packed, p, profile = run['grid'], run['params'], run['profile']
+    until = min(until, p['total_time'])
+    while run['timer'] < min(until, p['recovery_period']):
+        np.take(packed.at_node['topographic__elevation'], run['core_nodes'], out = run['core_dz'], mode = 'clip')
+        start_step(profile, 'recovery')
+        year = int(np.floor(run['timer']))
+        K_mined = run['K_modeled'][:, year]
+        np.take(K_mined, run['node_copy'], out = run['K_mined_at_node'])
+        np.take([outside_K(K, run['K_unmined']) for K in K_mined], run['node_copy'], out = run['outside_K_at_node'])
+        packed.at_node['erodibility'] = convolved_erodibility(run['K_weights'], run['K_mined_at_node'], run['K_unmined'],
+            run['outside_K_at_node'], out = run['K_smoothed'], work = run['K_work'])
+        run['SPACE'].K_sed = packed.at_node['erodibility']
+        lap(profile, 'K convolution')
+        run['route_flow'](run['precip_forcing'][year], packed.at_node['surface_water__discharge'])
+        run['SPACE'].run_one_step(dt = p['recovery_dt'])
+        run['space_discharge'][:] = packed.at_node['surface_water__discharge']
+        lap(profile, 'SPACE')
+        run['diffuse'](dt = p['recovery_dt'])
+        lap(profile, 'LinearDiffuser')
+        _account_flux(run, p['recovery_dt'])
+        run['timer'] = np.round(run['timer'] + p['recovery_dt'], decimals = 2)
+        run['counter'] += 1
+        lap(profile, 'flux accounting')
+        _step_output(run, 'recovery', p['recovery_dt'])
+
+    if run['phase'] == 'recovery' and run['timer'] >= p['recovery_period']:
+        start_fast_phase(run)
+
+    while run['timer'] < until:
+        np.take(packed.at_node['topographic__elevation'], run['core_nodes'], out = run['core_dz'], mode = 'clip')
+        start_step(profile, 'fast')
+        run['route_flow'](run['precip_forcing'][int(run['timer'])], packed.at_node['surface_water__discharge'])
+        run['SPACE'].run_one_step(dt = p['fast_dt'])
+        lap(profile, 'SPACE')
+        run['diffuse'](dt = p['fast_dt'])
+        lap(profile, 'LinearDiffuser')
+        _account_flux(run, p['fast_dt'])
+        run['timer'] += p['fast_dt']
+        run['counter'] += 1
+        lap(profile, 'flux accounting')
+        _step_output(run, 'fast', p['fast_dt'])
+
+
+def _step_output(run, phase, dt):
+    if run['flux_logs'] is not None:
+        for i, log in enumerate(run['flux_logs']):
+            write_flux_log(log, run['sed_flux_via_diff'][i], run['sed_flux_dt'], run['counter'])
+    if progress_due(run['progress']):
+        report_progress(run['progress'], run['timer'], run['counter'], phase, max_erosion_rate = np.max(run['core_dz']) / dt)
+    lap(run['profile'], 'output')
+
+
+def _flux_log(run, output_path, prefix, scenario, info):
+    return open_flux_log(output_path + prefix + 'sedflux.bin', dict(watershed = run['watershed'], run = prefix,
+        scenario = scenario, params = dict(run['params'], **info)), run['params']['flux_log_chunk'])
+
+
+def open_flux_logs(run, output_path, prefixes, **info):
+    """Start the binary flux log of each copy, written as the run goes.
+
+    info is added to the run parameters in each log's header.
+    """
+    run['flux_logs'] = [_flux_log(run, output_path, prefix, scenario, info)
+        for scenario, prefix in zip(run['scenario_ids'], prefixes)]
+
+
+def write_outputs(run, output_path, prefixes, copies = None, **info):
+    """Write each copy's topography, drainage area, slope, flux record and summary, named as in the scripts.
+
+    prefixes name each copy's files (e.g. 'scenario_5_'); copies picks
+    which copies to write (all by default). Copies without a flux log from
+    open_flux_logs get theirs written here in one go, with info added to
+    the run parameters in its header.
+    """
+    packed, mg, counter = run['grid'], run['watershed_grid'], run['counter']
+    for name in ('drainage_area', 'topographic__steepest_slope'):
+        if name not in mg.at_node:
+            mg.add_zeros(name, at = 'node')
+    for i in (range(len(prefixes)) if copies is None else copies):
+        prefix = prefixes[i]
+        for name, suffix in (('topographic__elevation', 'elev_01.asc'), ('drainage_area', 'DA_01.asc'),
+                ('topographic__steepest_slope', 'slope_01.asc')):
+            mg.at_node[name][:] = block_field(packed, run['blocks'], name, i)
+            save_field(output_path + prefix + suffix, mg, name, run['crop'])
+        np.savetxt(output_path + prefix + 'sedflux.txt', run['sed_flux_via_diff'][i])
+        if run['flux_logs'] is None:
+            log = _flux_log(run, output_path, prefix, run['scenario_ids'][i], info)
+        else:
+            log = run['flux_logs'][i]
+        write_flux_log(log, run['sed_flux_via_diff'][i], run['sed_flux_dt'], counter, flush = True)
+        close_flux_log(log, modeled_records = int(counter), stop_time = float(run['timer']))
+        summary = open_run_summary(run['params']['summary_milestones'], mg.dx * mg.dy)
+        add_to_summary(summary, run['sed_flux_via_diff'][i], run['sed_flux_dt'], counter)
+        write_run_summary(summary, output_path + prefix + 'summary.json', watershed = run['watershed'], run = prefix,
+            scenario = run['scenario_ids'][i], modeled_records = int(counter), stop_time = float(run['timer']),
+            K_convolution_method = run['params']['K_convolution_method'], **info)
+
+
+def run_packed(watershed_dir, watershed, scenario_ids, output_path, inputs = None, **params):
+    """Run several recovery scenarios of one watershed packed into one grid.
+
+    params override SCENARIO_PARAMS. Writes the same outputs as the
+    scenario scripts (scenario_<id>_elev_01.asc, DA, slope, sedflux.txt,
+    sedflux.bin and summary.json) for every scenario, plus packed_<ids>_profile.json.
+    Packed runs have fixed timesteps and run to total_time; checkpoints,
+    snapshots, adaptive steps and the steady-state stop are only in the
+    scripts.
+    """
+    run = set_up_packed(watershed_dir, watershed, scenario_ids, inputs, **params)
+    p = run['params']
+    prefixes = ['scenario_' + str(s) + '_' for s in scenario_ids]
+    open_flux_logs(run, output_path, prefixes, packed_scenarios = list(scenario_ids))
+    run['progress'] = open_progress(p['progress_interval_seconds'], p['total_time'],
+        watershed = WATERSHEDS[watershed]['name'], run = 'packed ' + ' '.join(prefixes))
+    advance(run, p['total_time'])
+    write_outputs(run, output_path, prefixes)
+    close_progress(run['progress'], run['timer'], run['counter'])
+    write_profile(run['profile'], output_path + 'packed_' + '_'.join(str(s) for s in scenario_ids) + '_profile.json',
+        watershed = watershed, scenarios = list(scenario_ids), nodes = run['grid'].number_of_nodes,
+        core_nodes = len(run['core_nodes']), params = p)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'Run recovery scenarios of one watershed packed into one grid.')
+    parser.add_argument('watershed', choices = sorted(WATERSHEDS))
+    parser.add_argument('--scenarios', type = float, nargs = '*', default = list(range(11)))
+    parser.add_argument('--output-path', default = None, help = "defaults to the scripts' output path")
+    args = parser.parse_args()
+    output_path = args.output_path or OUTPUT_PATH % args.watershed
+    scenarios = [int(s) if s == int(s) else s for s in args.scenarios]
+    run_packed(os.path.join(HERE, args.watershed), args.watershed, scenarios, output_path)
@@ -0,0 +1,68 @@
+######################################
+
+#Timing of each stage of every model step for the landscape evolution
+#scripts in each watershed folder. The loops call start_step at the top of
+#a step and lap after each stage; the time since the previous lap is
+#recorded for that stage, per phase (recovery or fast). write_profile sums
+#the laps into a JSON profile next to the outputs. Every call is a no-op
+#when the profile is None.
+
+#Please cite Bower et al., in review
+
+######################################
+
+import json
+import time
+import numpy as np
+
+#histogram bins: 10 per decade from a microsecond to 1000 s
+_BIN_EDGES = np.logspace(-6, 3, 91)
+
+
+def new_profile():
+    """An empty profile."""
+    return dict(phases = {}, phase = None, last = None, start = time.perf_counter())
+
+
+def start_step(profile, phase):
+    """Start timing a step of the given phase."""
+    if profile is None:
+        return
+    profile['phase'] = profile['phases'].setdefault(phase, {})
+    profile['last'] = time.perf_counter()
+
+
+def lap(profile, stage):
+    """Record the time since the last lap (or the step's start) for stage."""
+    if profile is None:
+        return
+    now = time.perf_counter()
+    profile['phase'].setdefault(stage, []).append(now - profile['last'])
+    profile['last'] = now
+
+
+def summarize(laps):
+    """Count, total, mean, percentiles and log-binned histogram of some lap times (s)."""
+    laps = np.asarray(laps)
+    counts, _ = np.histogram(laps, bins = _BIN_EDGES)
+    used = np.flatnonzero(counts)
+    first, last = (used[0], used[-1] + 1) if len(used) else (0, 0)
+    return dict(
+        count = len(laps), total_s = float(laps.sum()), mean_s = float(laps.mean()),
+        median_s = float(np.median(laps)), p90_s = float(np.percentile(laps, 90)),
+        p99_s = float(np.percentile(laps, 99)), max_s = float(laps.max()),
+        histogram = dict(edges_s = _BIN_EDGES[first:last + 1].tolist(), counts = counts[first:last].tolist()))
+
+
+def write_profile(profile, filename, **info):
+    """Write the profile's per-phase, per-stage summaries (and info) as JSON."""
+    if profile is None:
+        return
+    phases = {}
+    for phase, stages in profile['phases'].items():
+        phases[phase] = {stage: summarize(laps) for stage, laps in stages.items()}
+        step_totals = np.sum([laps for laps in stages.values()], axis = 0)
+        phases[phase]['whole step'] = summarize(step_totals)
+    with open(filename, 'w') as f:
+        json.dump(dict(info, wall_time_s = time.perf_counter() - profile['start'], phases = phases),
+            f, indent = 1, default = str)
@@ -0,0 +1,155 @@
+######################################
+
+#Binary cache for the ESRI ASCII rasters (DEMs, K masks, model outputs) read
+#by the landscape evolution scripts and the figure scripts. The first read of
+#a .asc file parses the text once. It stores the node values as a .npy next
+#to it, plus a .json with the header and the size, modification time and
+#checksum of the .asc. Later reads memory-map the .npy, which takes
+#milliseconds instead of seconds. The .asc is only hashed again if its size
+#or modification time changed; if its checksum then no longer matches, the
+#cache is rebuilt.
+
+#Usage (from the model_simulations folder), to build the cache ahead of a
+#batch of runs:
+#   python raster_cache.py ben_creek laurel_creek mud_river spruce_fork white_oak
+
+#Please cite Bower et al., in review
+
+######################################
+
+import os
+import sys
+import json
+import hashlib
+import numpy as np
+from landlab import RasterModelGrid
+from landlab.io.esri_ascii import read_esri_ascii, read_asc_header
+
+
+def cache_files(asc_file):
+    """The .npy and .json cache files for an .asc file."""
+    stem = os.path.splitext(asc_file)[0]
+    return stem + '.cache.npy', stem + '.cache.json'
+
+
+def source_checksum(asc_file):
+    """sha256 of an .asc file's contents."""
+    checksum = hashlib.sha256()
+    with open(asc_file, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            checksum.update(chunk)
+    return checksum.hexdigest()
+
+
+def source_stat(asc_file):
+    """Size and modification time (ns) of an .asc file, as stored in its cache."""
+    stat = os.stat(asc_file)
+    return dict(size = stat.st_size, mtime_ns = stat.st_mtime_ns)
+
+
+def _write_metadata(json_file, metadata):
+    tmp = json_file + '.%d.tmp' % os.getpid()
+    try:
+        with open(tmp, 'w') as f:
+            json.dump(metadata, f)
+        os.replace(tmp, json_file)
+    except OSError:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def convert_raster(asc_file, checksum = None):
+    """Parse an .asc file and write its cache. Returns (values, metadata).
+
+    The values are in landlab node order, as read_esri_ascii returns them.
+    Both cache files are written to a temporary name and then moved into
+    place, so jobs converting the same file at once never read a partial
+    cache. If the folder is not writable, the parsed values are returned
+    without a cache.
+    """
+    #stat before reading, so a file changed while it is read looks changed later
+    stat = source_stat(asc_file)
+    grid, values = read_esri_ascii(asc_file)
+    with open(asc_file) as f:
+        header = read_asc_header(f)
+    metadata = {
+        'shape': list(grid.shape),
+        'xy_spacing': float(grid.dx),
+        'xy_of_lower_left': [float(xy) for xy in grid.xy_of_lower_left],
+        'header': {key: value.item() if hasattr(value, 'item') else value for key, value in header.items()},
+        'dtype': np.asarray(values).dtype.str,
+        'sha256': checksum or source_checksum(asc_file),
+    }
+    metadata.update(stat)
+    npy_file, json_file = cache_files(asc_file)
+    tmp = '.%d.tmp' % os.getpid()
+    try:
+        with open(npy_file + tmp, 'wb') as f:
+            np.save(f, np.asarray(values))
+        with open(json_file + tmp, 'w') as f:
+            json.dump(metadata, f)
+        os.replace(npy_file + tmp, npy_file)
+        os.replace(json_file + tmp, json_file)
+    except OSError:
+        for leftover in (npy_file + tmp, json_file + tmp):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+    return np.asarray(values), metadata
+
+
+def raster_values(asc_file):
+    """Read-only node values of an .asc file and its metadata, from the cache.
+
+    The values are a np.memmap of the .npy cache (landlab node order). The
+    cache is built or rebuilt first if it is missing or was made from a
+    different version of the .asc. The .asc is only hashed when its size or
+    modification time differ from the cache's; if the contents turn out
+    the same (e.g. the file was copied), the new ones are stored.
+    """
+    npy_file, json_file = cache_files(asc_file)
+    stat = source_stat(asc_file)
+    checksum = None
+    if os.path.exists(npy_file) and os.path.exists(json_file):
+        with open(json_file) as f:
+            metadata = json.load(f)
+        if all(metadata.get(key) == value for key, value in stat.items()):
+            return np.load(npy_file, mmap_mode = 'r'), metadata
+        checksum = source_checksum(asc_file)
+        if metadata['sha256'] == checksum:
+            metadata.update(stat)
+            _write_metadata(json_file, metadata)
+            return np.load(npy_file, mmap_mode = 'r'), metadata
+    values, metadata = convert_raster(asc_file, checksum)
+    values.flags.writeable = False
+    return values, metadata
+
+
+def read_raster(asc_file, name = None):
+    """read_esri_ascii through the cache: returns (grid, values).
+
+    As with read_esri_ascii, values is a field of the new grid (a writable
+    copy of the cache) if name is given, and a plain array otherwise.
+    """
+    cached, metadata = raster_values(asc_file)
+    grid = RasterModelGrid(tuple(metadata['shape']), xy_spacing = metadata['xy_spacing'],
+        xy_of_lower_left = tuple(metadata['xy_of_lower_left']))
+    values = np.array(cached)
+    if name is not None:
+        values = grid.add_field(name, values, at = 'node')
+    return grid, values
+
+
+def raster_array(asc_file):
+    """np.loadtxt(asc_file, skiprows=6) through the cache: rows as in the file, top row first."""
+    cached, metadata = raster_values(asc_file)
+    return np.flipud(cached.reshape(metadata['shape'])).copy()
+
+
+if __name__ == '__main__':
+    from model_inputs import WATERSHEDS, RASTERS
+    for watershed in sys.argv[1:]:
+        for raster in RASTERS:
+            asc_file = os.path.join(watershed, 'inputs', WATERSHEDS[watershed][raster])
+            if os.path.exists(asc_file):
+                convert_raster(asc_file)
+                print('cached ' + asc_file)
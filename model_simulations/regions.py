@@ -0,0 +1,35 @@
+######################################
+
+#Node regions of a watershed grid for the landscape evolution scripts in
+#each watershed folder. Once the boundary conditions are set (and the grid
+#cropped), the mined, unmined, closed, core and outlet nodes never change,
+#so their node ids are found once here and the step loops index with them
+#instead of building masks over the whole grid or asking landlab for them.
+
+#Please cite Bower et al., in review
+
+######################################
+
+import numpy as np
+from landlab import NodeStatus
+
+
+def region_index(grid, shape = None, outlet_node = None):
+    """Node ids of each region of a set-up watershed grid.
+
+    Returns a dict of sorted int arrays: 'closed', 'core' and 'outlet'
+    (the outlet_node returned by set_watershed_boundary_condition), and,
+    with a K mask (shape), 'mined' (mask == 1) and 'unmined' (the rest).
+    The arrays are writeable copies, because np.take copies read-only
+    index arrays.
+    """
+    regions = {
+        'closed': np.flatnonzero(grid.status_at_node == NodeStatus.CLOSED),
+        'core': np.array(grid.core_nodes),
+        'outlet': np.atleast_1d(np.array(outlet_node, dtype = int)) if outlet_node is not None else np.array([], dtype = int),
+    }
+    if shape is not None:
+        mined = np.asarray(shape) == 1
+        regions['mined'] = np.flatnonzero(mined)
+        regions['unmined'] = np.flatnonzero(~mined)
+    return regions
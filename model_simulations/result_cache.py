@@ -0,0 +1,141 @@
+######################################
+
+#Result cache for the landscape evolution scripts in each watershed folder.
+#A run is identified by a hash of everything that determines its outputs:
+#the input rasters, the climate record, the K trajectory, the scenario, the
+#run parameters and the model code (the script and the model modules it
+#imports). If a run with the same hash has finished
+#before, its outputs are copied from the cache instead of rerunning it.
+#Finished runs are added to the cache, and the least recently used ones are
+#evicted once the cache grows past its size limit.
+
+#Please cite Bower et al., in review
+
+######################################
+
+import os
+import ast
+import json
+import shutil
+import hashlib
+import numpy as np
+import landlab
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def array_checksum(*arrays):
+    """sha256 of the values, dtypes and shapes of some arrays."""
+    checksum = hashlib.sha256()
+    for a in arrays:
+        a = np.ascontiguousarray(a)
+        checksum.update(('%s%s' % (a.dtype.str, a.shape)).encode())
+        checksum.update(a.tobytes())
+    return checksum.hexdigest()
+
+
+def _imported_modules(filename):
+    with open(filename) as f:
+        tree = ast.parse(f.read(), filename)
+    for node in ast.walk(tree):
+        if isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            yield node.module
+        elif isinstance(node, ast.Import):
+            for alias in node.names:
+                yield alias.name
+
+
+def model_code_files(script):
+    """A script and the model modules (this folder's .py files) it imports.
+
+    Modules imported by those modules are followed too, so editing a module
+    no run imports (e.g. benchmark.py) leaves the cache keys alone.
+    """
+    script = os.path.abspath(script)
+    files, todo = set(), [script]
+    while todo:
+        filename = todo.pop()
+        if filename in files:
+            continue
+        files.add(filename)
+        for module in _imported_modules(filename):
+            module_file = os.path.join(HERE, module.split('.')[0] + '.py')
+            if os.path.exists(module_file):
+                todo.append(module_file)
+    return [script] + sorted(files - {script})
+
+
+def result_key(input_checksum, params, code_files):
+    """Cache key of a run: a sha256 of its inputs, parameters and code.
+
+    params is a dict of everything else the outputs depend on; arrays in it
+    are hashed by value. The numpy and landlab versions are part of the key.
+    """
+    key = hashlib.sha256()
+    key.update(input_checksum.encode())
+    for name in sorted(params):
+        value = params[name]
+        if isinstance(value, np.ndarray):
+            value = array_checksum(value)
+        key.update(json.dumps([name, value], sort_keys = True, default = str).encode())
+    key.update(('numpy %s landlab %s' % (np.__version__, landlab.__version__)).encode())
+    for code_file in code_files:
+        with open(code_file, 'rb') as f:
+            key.update(hashlib.sha256(f.read()).digest())
+    return key.hexdigest()
+
+
+def fetch_cached_run(cache_dir, key, output_path, prefix):
+    """Copy a cached run's outputs to output_path. Returns False if there is none."""
+    entry = os.path.join(cache_dir, key)
+    if not os.path.isdir(entry):
+        return False
+    for suffix in os.listdir(entry):
+        if suffix != 'last_used':
+            shutil.copyfile(os.path.join(entry, suffix), output_path + prefix + suffix)
+    #the entry's last_used time orders eviction
+    os.utime(os.path.join(entry, 'last_used'))
+    return True
+
+
+def store_run(cache_dir, key, output_path, prefix, suffixes, max_gb):
+    """Add a finished run's outputs (prefix + each suffix) to the cache.
+
+    The entry is built under a temporary name and renamed into place, so
+    other jobs never see half of one. Least recently used entries are then
+    removed until the cache is at most max_gb.
+    """
+    entry = os.path.join(cache_dir, key)
+    if os.path.isdir(entry):
+        return
+    os.makedirs(cache_dir, exist_ok = True)
+    tmp = entry + '.%d.tmp' % os.getpid()
+    os.makedirs(tmp, exist_ok = True)
+    for suffix in suffixes:
+        shutil.copyfile(output_path + prefix + suffix, os.path.join(tmp, suffix))
+    open(os.path.join(tmp, 'last_used'), 'w').close()
+    try:
+        os.rename(tmp, entry)
+    except OSError:
+        #another job stored the same run first
+        shutil.rmtree(tmp, ignore_errors = True)
+    evict(cache_dir, max_gb, keep = key)
+
+
+def evict(cache_dir, max_gb, keep = None):
+    """Remove least recently used entries until the cache is at most max_gb."""
+    entries = []
+    for name in os.listdir(cache_dir):
+        entry = os.path.join(cache_dir, name)
+        if name.endswith('.tmp') or not os.path.exists(os.path.join(entry, 'last_used')):
+            continue
+        size = sum(os.path.getsize(os.path.join(entry, f)) for f in os.listdir(entry))
+        entries.append((os.path.getmtime(os.path.join(entry, 'last_used')), size, name))
+    total = sum(size for _, size, _ in entries)
+    for _, size, name in sorted(entries):
+        if total <= max_gb * 1e9:
+            break
+        if name == keep:
+            continue
+        shutil.rmtree(os.path.join(cache_dir, name), ignore_errors = True)
+        total -= size
@@ -0,0 +1,85 @@
+######################################
+
+#Run summaries for the landscape evolution scripts in each watershed folder.
+#The figures only need a few numbers from each run: the total sediment
+#export, the export and flux at a few model years, how much the flux
+#changed between those years, and when the flux peaked. These are kept up
+#to date as the flux record grows, the same way the flux log is written
+#(see flux_log.py), and written to a small JSON file at the end of the run,
+#so the figure scripts read that instead of whole flux records and DEMs.
+
+#Volumes are in m^3 and fluxes in m^3/yr (the flux record times the cell
+#area). The flux at a year is that of the step the run was in at that year
+#(the step starting at it, if a step starts there), or of the last step,
+#for the year the run ends. The export at a year counts the step it falls
+#in pro rata. The peak year is the end of the peak step, as times are in
+#the flux log.
+
+#Please cite Bower et al., in review
+
+######################################
+
+import json
+import numpy as np
+
+
+def open_run_summary(milestones, cell_area):
+    """Start the summary of a run's flux record and return its state.
+
+    milestones are the model years to record the export and flux at.
+    """
+    return dict(milestones = {float(year): dict(exported = None, flux = None) for year in sorted(milestones)},
+        cell_area = cell_area, records = 0, time = 0., exported = 0., last_flux = None, peak_flux = None, peak_time = None)
+
+
+def add_to_summary(summary, sed_flux, sed_flux_dt, counter):
+    """Fold the flux record's entries since the last call, up to counter, into the summary."""
+    start = summary['records']
+    if counter <= start:
+        return
+    flux, dt = sed_flux[start:counter], sed_flux_dt[start:counter]
+    end = summary['time'] + np.cumsum(dt)
+    exported = summary['exported'] + np.cumsum(flux * dt)
+    peak = np.argmax(flux)
+    if summary['peak_flux'] is None or flux[peak] > summary['peak_flux']:
+        summary['peak_flux'], summary['peak_time'] = float(flux[peak]), float(end[peak])
+    for year, milestone in summary['milestones'].items():
+        if milestone['exported'] is None and end[-1] >= year:
+            i = np.searchsorted(end, year)
+            milestone['exported'] = float(exported[i] - flux[i] * (end[i] - year))
+        if milestone['flux'] is None and end[-1] > year:
+            milestone['flux'] = float(flux[np.searchsorted(end, year, side = 'right')])
+    summary['records'], summary['time'] = counter, float(end[-1])
+    summary['exported'], summary['last_flux'] = float(exported[-1]), float(flux[-1])
+
+
+def write_run_summary(summary, filename, **info):
+    """Write the summary as JSON, with info (watershed, run, ...) added.
+
+    Milestones after the end of the run are left out.
+    """
+    a = summary['cell_area']
+    milestones = {}
+    for year, milestone in summary['milestones'].items():
+        if milestone['exported'] is None:
+            continue
+        flux = milestone['flux'] if milestone['flux'] is not None else summary['last_flux']
+        milestones['%g' % year] = dict(exported_volume_m3 = milestone['exported'] * a, flux_m3_per_yr = flux * a)
+    #percent change of the flux from each milestone to each later one
+    flux_change = {}
+    for i, first in enumerate(milestones):
+        for last in list(milestones)[i + 1:]:
+            before, after = milestones[first]['flux_m3_per_yr'], milestones[last]['flux_m3_per_yr']
+            flux_change[first + '-' + last] = (after - before) / before * 100 if before else None
+    record = dict(info, time = summary['time'], records = summary['records'], cell_area = a,
+        exported_volume_m3 = summary['exported'] * a, milestones = milestones, flux_change_percent = flux_change,
+        peak_flux_m3_per_yr = summary['peak_flux'] * a if summary['peak_flux'] is not None else None,
+        peak_year = summary['peak_time'])
+    with open(filename, 'w') as f:
+        json.dump(record, f, indent = 1, default = str)
+
+
+def read_run_summary(filename):
+    """The dict written by write_run_summary."""
+    with open(filename) as f:
+        return json.load(f)
@@ -0,0 +1,246 @@
+######################################
+
+#Scenario trees for one watershed. Runs that share a forcing prefix (the
+#same DEM, parameters, K trajectory and climate up to some model year) only
+#differ after it, so the prefix is run once and the run is forked there
+#into branches, each of which changes some of the forcing from that year
+#on. Branches can fork again. A tree is a JSON file like
+
+#   {"name": "recovery", "scenarios": [0, 5, 10], "until": 100,
+#    "params": {"total_time": 10000},
+#    "children": [
+#       {"name": "base"},
+#       {"name": "wet", "precip_scale": 1.2},
+#       {"name": "lowering", "BL_lowering_rate": 5.4e-5},
+#       {"name": "late10", "scenarios": [10, 10, 10]}]}
+
+#The root runs the listed recovery scenarios packed into one grid (see
+#packed_scenarios.py), with params overriding SCENARIO_PARAMS. Each node
+#runs to model year until (total_time by default) and then forks into its
+#children. A child can set precip_scale (multiplies the climate from the
+#first whole year after the fork on), BL_lowering_rate, and scenarios (one
+#recovery scenario per copy, whose K is used from then on). As in the
+#scripts, the fast phase after the recovery period erodes with the discharge
+#and K of the last recovery step, so precip_scale and scenarios only change
+#a run during recovery, and check_tree rejects them in nodes that fork
+#later (precip_scale at the first whole year after the fork). Forks after
+#recovery can change BL_lowering_rate. Every leaf
+#writes the scripts' outputs for each copy at the end of its run, named
+#after its path through the tree and the copy's scenario at the root, e.g.
+#recovery_wet_scenario_5_elev_01.asc.
+#Sediment flux records run from year 0, prefix included.
+
+#Branches are forked processes (os.fork), so a branch starts from the
+#parent's state in copy-on-write memory, with up to --workers of them at a
+#time. Where os.fork is not available, or with one worker, the branches run
+#one after the other from an in-memory snapshot of the fork point. With
+#--fork-dir, the state at every fork point is also saved there, keyed by a
+#hash of everything the prefix depends on, and later runs of a tree with
+#the same prefix start from it instead of rerunning the prefix.
+
+#Usage (from the model_simulations folder):
+#   python scenario_tree.py ben_creek tree.json --workers 4
+
+#Please cite Bower et al., in review
+
+######################################
+
+import os
+import sys
+import json
+import argparse
+import traceback
+
+import numpy as np
+
+from model_inputs import WATERSHEDS
+from flow_routing import routing_stage
+from packed_scenarios import set_up_packed, set_scenario, start_fast_phase, advance, write_outputs, OUTPUT_PATH, HERE
+from result_cache import array_checksum, result_key, model_code_files
+from telemetry import open_progress, close_progress
+
+#what a branch may change, besides its own children and until
+BRANCH_OVERRIDES = ('scenarios', 'precip_scale', 'BL_lowering_rate')
+
+
+def snapshot_run(run):
+    """Copies of everything in a packed run that changes as it runs, as a dict of arrays."""
+    grid = run['grid']
+    state = {'field:' + name: grid.at_node[name].copy() for name in grid.at_node.keys()}
+    state.update(
+        timer = np.array(run['timer']), counter = np.array(run['counter']), phase = np.array(run['phase']),
+        space_discharge = run['space_discharge'].copy(), sed_flux_via_diff = run['sed_flux_via_diff'].copy(),
+        sed_flux_dt = run['sed_flux_dt'].copy(), K_modeled = run['K_modeled'].copy(),
+        precip_forcing = run['precip_forcing'].copy(), scenario_ids = np.array(run['scenario_ids']),
+        BL_lowering_rate = np.array(run['params']['BL_lowering_rate']))
+    return state
+
+
+def restore_run(run, state):
+    """Put a packed run back to a snapshot (from snapshot_run, or loaded from a .npz).
+
+    The recovery eroder and discharge array from set-up are put back first,
+    with routing writing to its own array again (the fast phase eroder is
+    rebuilt on them, as at the end of recovery),
+    then field values are copied in place, because the components keep
+    references to the arrays. The flow router is rebuilt so it routes the
+    restored surface from scratch, which gives the same result as routing
+    it incrementally.
+    """
+    grid = run['grid']
+    run['SPACE'], run['phase'] = run['recovery_SPACE'], 'recovery'
+    grid.at_node['surface_water__discharge'] = run['space_discharge'].copy()
+    if str(state['phase']) == 'fast':
+        start_fast_phase(run)
+    for key in state:
+        if key.startswith('field:'):
+            grid.at_node[key[len('field:'):]][:] = state[key]
+    run['space_discharge'][:] = state['space_discharge']
+    run['timer'] = state['timer'][()]
+    run['counter'] = int(state['counter'])
+    for name in ('sed_flux_via_diff', 'sed_flux_dt', 'K_modeled', 'precip_forcing'):
+        run[name][:] = state[name]
+    run['scenario_ids'] = state['scenario_ids'].tolist()
+    run['params'] = dict(run['params'], BL_lowering_rate = float(state['BL_lowering_rate']))
+    run['route_flow'] = routing_stage(run['FA'], grid, run['params']['incremental_routing'])
+
+
+def branch(run, node):
+    """Apply a tree node's forcing changes to a run from its current model time on."""
+    if 'scenarios' in node:
+        if len(node['scenarios']) != len(run['scenario_ids']):
+            raise ValueError('%s: one scenario per copy (%d) is needed' % (node['name'], len(run['scenario_ids'])))
+        for i, scenario in enumerate(node['scenarios']):
+            set_scenario(run, i, scenario)
+    if 'precip_scale' in node:
+        run['precip_forcing'][int(np.ceil(run['timer'])):] *= node['precip_scale']
+    if 'BL_lowering_rate' in node:
+        run['params'] = dict(run['params'], BL_lowering_rate = node['BL_lowering_rate'])
+
+
+def check_tree(node, total_time, recovery_period, start = 0):
+    """Raise a ValueError if a tree is malformed, or changes forcing that would have no effect.
+
+    start is the model year the node forks at.
+    """
+    unknown = set(node) - {'name', 'until', 'children'} - set(BRANCH_OVERRIDES) - ({'params'} if start == 0 else set())
+    if 'name' not in node or unknown:
+        raise ValueError('tree node %s: needs a name, and %s are not known' % (node.get('name'), sorted(unknown)))
+    #the first recovery year each change would be used in
+    first_year = {'scenarios': start, 'precip_scale': np.ceil(start)}
+    for name, year in first_year.items():
+        if name in node and year >= recovery_period:
+            raise ValueError('%s: %s has no effect in a fork at year %s, as the fast phase after the recovery period '
+                '(%s years) erodes with the discharge and K of the end of recovery' % (node['name'], name, start, recovery_period))
+    until = node.get('until', total_time)
+    if not start <= until <= total_time:
+        raise ValueError('%s: until must be between %s and %s' % (node['name'], start, total_time))
+    names = [child.get('name') for child in node.get('children', [])]
+    if len(set(names)) != len(names):
+        raise ValueError('%s: children need different names' % node['name'])
+    for child in node.get('children', []):
+        check_tree(child, total_time, recovery_period, until)
+
+
+def _fork_key(run, path_nodes):
+    #the prefix is the root set-up plus every node's until and forcing changes
+    prefix = [{k: v for k, v in node.items() if k != 'children'} for node in path_nodes]
+    return result_key(run['input_checksum'], dict(watershed = run['watershed'], prefix = prefix),
+        model_code_files(__file__))
+
+
+def _wait(pids):
+    pid, status = os.wait()
+    pids.remove(pid)
+    return status == 0
+
+
+def run_node(run, node, path, output_path, workers = 1, fork_dir = None):
+    """Run a tree node from the run's current state, then its children (path: the nodes above it)."""
+    path = path + [node]
+    name = '_'.join(n['name'] for n in path)
+    branch(run, node)
+    if run['progress'] is not None:
+        run['progress']['labels']['run'] = name
+    children = node.get('children', [])
+    snapshot_file = os.path.join(fork_dir, _fork_key(run, path) + '.npz') if fork_dir and children else None
+    if snapshot_file and os.path.exists(snapshot_file):
+        with np.load(snapshot_file) as state:
+            restore_run(run, state)
+        print('%s: starting branches from the fork point saved at year %s' % (name, run['timer']))
+    else:
+        advance(run, node.get('until', run['params']['total_time']))
+    if not children:
+        #copies keep the names of their scenarios at the root, as branches can switch them
+        write_outputs(run, output_path, [name + '_scenario_' + str(s) + '_' for s in path[0]['scenarios']],
+            tree_path = [n['name'] for n in path], branches = [{k: n[k] for k in BRANCH_OVERRIDES if k in n} for n in path])
+        return
+
+    if snapshot_file and not os.path.exists(snapshot_file):
+        os.makedirs(fork_dir, exist_ok = True)
+        tmp = snapshot_file + '.%d.tmp.npz' % os.getpid()
+        np.savez(tmp, **snapshot_run(run))
+        os.replace(tmp, snapshot_file)
+
+    if workers > 1 and hasattr(os, 'fork'):
+        #each branch gets a share of the workers for its own branches
+        child_workers = max(1, workers // len(children))
+        pids, failed = set(), 0
+        for child in children:
+            if len(pids) >= workers:
+                failed += not _wait(pids)
+            sys.stdout.flush()
+            pid = os.fork()
+            if pid == 0:
+                code = 0
+                try:
+                    run_node(run, child, path, output_path, child_workers, fork_dir)
+                except BaseException:
+                    traceback.print_exc()
+                    code = 1
+                finally:
+                    sys.stdout.flush()
+                    sys.stderr.flush()
+                    os._exit(code)
+            pids.add(pid)
+        while pids:
+            failed += not _wait(pids)
+        if failed:
+            raise RuntimeError('%d of the branches of %s failed' % (failed, name))
+    else:
+        state = snapshot_run(run)
+        for i, child in enumerate(children):
+            if i > 0:
+                restore_run(run, state)
+            run_node(run, child, path, output_path, 1, fork_dir)
+
+
+def run_tree(watershed_dir, watershed, tree, output_path, inputs = None, workers = 1, fork_dir = None):
+    """Run a scenario tree (a dict, as in the JSON files) for one watershed."""
+    params = dict(tree.get('params', {}), profile_steps = False)
+    run = set_up_packed(watershed_dir, watershed, tree['scenarios'], inputs, **params)
+    check_tree(tree, run['params']['total_time'], run['params']['recovery_period'])
+    grid = run['grid']
+    #the set-up state every fork point depends on (the run parameters are in the tree)
+    run['input_checksum'] = array_checksum(grid.at_node['topographic__elevation'], grid.at_node['bedrock__elevation'],
+        grid.status_at_node, *(run['K_weights'][name] for name in sorted(run['K_weights'])),
+        run['K_modeled'], run['precip_forcing'])
+    run['recovery_SPACE'] = run['SPACE']
+    run['progress'] = open_progress(run['params']['progress_interval_seconds'], run['params']['total_time'],
+        watershed = WATERSHEDS[watershed]['name'], run = tree['name'])
+    run_node(run, tree, [], output_path, workers, fork_dir)
+    close_progress(run['progress'], run['timer'], run['counter'])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'Run a tree of scenarios of one watershed that share forcing prefixes.')
+    parser.add_argument('watershed', choices = sorted(WATERSHEDS))
+    parser.add_argument('tree', help = 'JSON file of the scenario tree')
+    parser.add_argument('--output-path', default = None, help = "defaults to the scripts' output path")
+    parser.add_argument('--workers', type = int, default = 1, help = 'branches run at a time')
+    parser.add_argument('--fork-dir', default = None, help = 'save the state at fork points here, and reuse it')
+    args = parser.parse_args()
+    with open(args.tree) as f:
+        tree = json.load(f)
+    run_tree(os.path.join(HERE, args.watershed), args.watershed, tree, args.output_path or OUTPUT_PATH % args.watershed,
+        workers = args.workers, fork_dir = args.fork_dir)
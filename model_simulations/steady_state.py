@@ -0,0 +1,78 @@
+######################################
+
+#Detects when the post-recovery sediment flux has settled into a steady
+#decay, so the landscape evolution scripts in each watershed folder can stop
+#early and extrapolate the rest of the flux record
+
+#Please cite Bower et al., in review
+
+######################################
+
+import numpy as np
+
+
+def _trailing_ages(sed_flux_dt, counter, span):
+    """Start of the record's tail that covers span years, and how long ago each of its steps ended.
+
+    Only the tail is summed, doubling it until it reaches span years back or
+    the start of the record, so the cost does not grow with the record.
+    """
+    n = 64
+    while True:
+        start = max(counter - n, 0)
+        #years from the end of each step to the end of the record
+        back = np.cumsum(sed_flux_dt[start:counter][::-1])
+        ages = np.concatenate(([0.], back[:-1]))[::-1]
+        if start == 0 or ages[0] >= span:
+            return start, ages, back[-1]
+        n *= 2
+
+
+def flux_has_settled(sed_flux, sed_flux_dt, counter, window, tolerance):
+    """Whether the flux record has stopped changing.
+
+    Compares the mean flux over the last `window` years with the mean over
+    the `window` years before that. The flux has settled when the relative
+    change between the two is below tolerance. Returns False until the
+    record covers two full windows. Only the last two windows of the record
+    are read.
+    """
+    start, ages, length = _trailing_ages(sed_flux_dt, counter, 2 * window)
+    if start == 0 and length < 2 * window:
+        return False
+    flux, dt = sed_flux[start:counter], sed_flux_dt[start:counter]
+    last = ages < window
+    previous = (ages < 2 * window) & ~last
+    mean_last = np.average(flux[last], weights = dt[last])
+    mean_previous = np.average(flux[previous], weights = dt[previous])
+    if mean_previous == 0:
+        return mean_last == 0
+    return abs(mean_last - mean_previous) / abs(mean_previous) < tolerance
+
+
+def extrapolate_flux(sed_flux, sed_flux_dt, counter, window, dt, time_left):
+    """Extend the flux record after counter by extrapolating the last window.
+
+    Fits an exponential decay, flux = a * exp(b * t), to the last `window`
+    years of the record and continues it in steps of dt for time_left
+    years. If the flux is not positive everywhere in the window, or the fit
+    is not a decay, the window mean is carried forward instead. Fills
+    sed_flux and sed_flux_dt in place and returns the new length of the
+    record.
+    """
+    t = np.cumsum(sed_flux_dt[:counter])
+    last = t > t[-1] - window
+    t_fit = t[last]
+    flux_fit = sed_flux[:counter][last]
+
+    n_new = int(round(time_left / dt))
+    t_new = t[-1] + dt * np.arange(1, n_new + 1)
+    b = 0.
+    if np.all(flux_fit > 0) and len(flux_fit) > 1:
+        b, log_a = np.polyfit(t_fit, np.log(flux_fit), 1)
+    if b < 0:
+        sed_flux[counter:counter + n_new] = np.exp(log_a + b * t_new)
+    else:
+        sed_flux[counter:counter + n_new] = np.average(flux_fit, weights = sed_flux_dt[:counter][last])
+    sed_flux_dt[counter:counter + n_new] = dt
+    return counter + n_new
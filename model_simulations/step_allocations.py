@@ -0,0 +1,126 @@
+######################################
+
+#Benchmark of the memory allocated per model step. Runs the old step loop
+#(fresh arrays every step) and the current one (work arrays allocated once,
+#updated in place) on a synthetic basin, and reports how much memory each
+#stage of a step allocates after warm-up, measured with tracemalloc.
+
+#Usage (from the model_simulations folder):
+#   python step_allocations.py --rows 400 --cols 400 --steps 10
+
+#Please cite Bower et al., in review
+
+######################################
+
+import copy
+import argparse
+import tracemalloc
+
+import numpy as np
+from landlab import RasterModelGrid
+from landlab.components import PriorityFloodFlowRouter, SpaceLargeScaleEroder, LinearDiffuser
+
+from flow_routing import routing_stage
+
+
+def synthetic_basin(rows, cols, seed = 0):
+    """Tilted, noisy grid with one outlet, set up the way the scripts set up a watershed."""
+    rng = np.random.default_rng(seed)
+    mg = RasterModelGrid((rows, cols), xy_spacing = 10.)
+    y, x = np.mgrid[0:rows, 0:cols]
+    z = mg.add_field('topographic__elevation', (300 + 2. * y + 0.5 * np.abs(x - cols / 2) + rng.random((rows, cols)) * 2).ravel(), at = 'node')
+    mg.set_closed_boundaries_at_grid_edges(True, True, True, True)
+    mg.status_at_node[cols // 2] = mg.BC_NODE_IS_FIXED_VALUE
+    mg.add_field('bedrock__elevation', z - 0.5, at = 'node')
+    mg.add_field('soil__depth', z - mg.at_node['bedrock__elevation'], at = 'node')
+
+    FA = PriorityFloodFlowRouter(mg, flow_metric = "D8", suppress_out = True)
+    FA.run_one_step()
+    LD = LinearDiffuser(mg, linear_diffusivity = 0.01)
+    mg.at_node["surface_water__discharge"] = mg.at_node["drainage_area"] * 1.
+    SPACE = SpaceLargeScaleEroder(mg, K_sed = 1e-5, K_br = 1e-6, F_f = 0., phi = 0.3, H_star = 0.1,
+        v_s = 1., m_sp = 0.5, n_sp = 1., sp_crit_sed = 0, sp_crit_br = 0, erode_flooded_nodes = False)
+    return mg, FA, LD, SPACE
+
+
+def legacy_step(mg, FA, LD, SPACE, dt, precip, work):
+    """One fast-phase step as the scripts ran it before the work arrays."""
+    yield 'copy topography'
+    pre_dt_topo = copy.deepcopy(mg.at_node['topographic__elevation'])
+    yield 'flow routing'
+    FA.run_one_step()
+    FA.remove_depressions()
+    mg.at_node["flood_status_code"] = np.where(mg.at_node["depression_free_elevation"] == mg.at_node["topographic__elevation"],0,3)
+    mg.at_node["surface_water__discharge"] = mg.at_node["drainage_area"] * precip
+    yield 'SPACE and LinearDiffuser'
+    SPACE.run_one_step(dt = dt)
+    LD.run_one_step(dt = dt)
+    yield 'soil depth and flux'
+    mg.at_node["soil__depth"] = mg.at_node["topographic__elevation"] - mg.at_node["bedrock__elevation"]
+    return np.sum(pre_dt_topo[mg.core_nodes] - mg.at_node['topographic__elevation'][mg.core_nodes]) / dt
+
+
+def buffered_step(mg, FA, LD, SPACE, dt, precip, work):
+    """One fast-phase step as the scripts run it now."""
+    yield 'copy topography'
+    np.take(mg.at_node['topographic__elevation'], work['core_nodes'], out = work['core_dz'], mode = 'clip')
+    yield 'flow routing'
+    work['route_flow'](precip, mg.at_node["surface_water__discharge"])
+    yield 'SPACE and LinearDiffuser'
+    SPACE.run_one_step(dt = dt)
+    LD.run_one_step(dt = dt)
+    yield 'soil depth and flux'
+    np.subtract(mg.at_node["topographic__elevation"], mg.at_node["bedrock__elevation"], out = mg.at_node["soil__depth"])
+    np.take(mg.at_node['topographic__elevation'], work['core_nodes'], out = work['core_topo'], mode = 'clip')
+    np.subtract(work['core_dz'], work['core_topo'], out = work['core_dz'])
+    return np.sum(work['core_dz']) / dt
+
+
+def measure(step, rows, cols, n_steps, warmup = 2):
+    """Mean bytes allocated per step by each stage of step, after warm-up.
+
+    Each stage is measured as the tracemalloc peak above the memory in use
+    when the stage started, so temporaries that are freed again by the end
+    of the stage still count.
+    """
+    mg, FA, LD, SPACE = synthetic_basin(rows, cols)
+    work = dict(core_nodes = np.array(mg.core_nodes), core_dz = np.empty(len(mg.core_nodes)),
+        core_topo = np.empty(len(mg.core_nodes)), route_flow = routing_stage(FA, mg))
+    mg.at_node["surface_water__discharge"] = np.zeros(mg.number_of_nodes)
+    allocated = {}
+    tracemalloc.start()
+    for i in range(warmup + n_steps):
+        stages = step(mg, FA, LD, SPACE, 1., 1., work)
+        stage = next(stages)
+        while True:
+            tracemalloc.reset_peak()
+            start = tracemalloc.get_traced_memory()[0]
+            try:
+                next_stage = next(stages)
+            except StopIteration:
+                next_stage = None
+            if i >= warmup:
+                allocated[stage] = allocated.get(stage, 0) + tracemalloc.get_traced_memory()[1] - start
+            if next_stage is None:
+                break
+            stage = next_stage
+    tracemalloc.stop()
+    return {stage: total / n_steps for stage, total in allocated.items()}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'Memory allocated per model step, old vs current step loop.')
+    parser.add_argument('--rows', type = int, default = 400)
+    parser.add_argument('--cols', type = int, default = 400)
+    parser.add_argument('--steps', type = int, default = 10)
+    args = parser.parse_args()
+
+    grid_array = 8. * args.rows * args.cols
+    results = {name: measure(step, args.rows, args.cols, args.steps)
+        for name, step in (('old', legacy_step), ('current', buffered_step))}
+    print('bytes allocated per step, %d x %d nodes (in full-grid float arrays)' % (args.rows, args.cols))
+    print('%-26s %22s %22s' % ('stage', 'old', 'current'))
+    for stage in results['old']:
+        print('%-26s %12.0f (%6.2f) %12.0f (%6.2f)' % (stage,
+            results['old'][stage], results['old'][stage] / grid_array,
+            results['current'][stage], results['current'][stage] / grid_array))
@@ -0,0 +1,92 @@
+######################################
+
+#Progress telemetry for the landscape evolution scripts in each watershed
+#folder. Instead of printing a line every step, the loops ask
+#progress_due after each step, and at most once every so many seconds of
+#wall-clock time report_progress writes one JSON line: model time, steps
+#per second, an ETA, memory in use, the latest sediment flux and whatever
+#diagnostics the script passes in. Diagnostics that need a pass over the
+#grid are only worked out when a record is actually written.
+
+#Please cite Bower et al., in review
+
+######################################
+
+import os
+import sys
+import json
+import time
+
+
+def _rss_mb():
+    """Resident memory of this process in MB (the peak, where the current one is unknown)."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1e6
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+        #kB on Linux, bytes on macOS
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return rss / 1e6 if sys.platform == 'darwin' else rss / 1e3
+    except ImportError:
+        return None
+
+
+def open_progress(interval_seconds, total_time, model_time = 0., step = 0, filename = None, **labels):
+    """Start a run's progress telemetry and return its state (None if interval_seconds is None).
+
+    Records go to stdout, or are appended to filename. labels (watershed,
+    run, ...) are repeated in every record, so the records of many runs
+    sharing one job log can be told apart. model_time and step are where a
+    resumed run starts, so rates only count the steps run here.
+    """
+    if interval_seconds is None:
+        return None
+    now = time.monotonic()
+    return dict(
+        interval = interval_seconds, total_time = total_time, labels = labels,
+        file = open(filename, 'a') if filename else sys.stdout, close = bool(filename),
+        next = now, last = dict(wall = now, time = model_time, step = step))
+
+
+def progress_due(progress):
+    """Whether the next progress record is due (never if progress is None)."""
+    return progress is not None and time.monotonic() >= progress['next']
+
+
+def report_progress(progress, model_time, step, phase, flux = None, **diagnostics):
+    """Write one progress record and schedule the next.
+
+    Steps per second and the ETA come from the steps since the previous
+    record, so they follow the change from recovery to fast steps.
+    """
+    if progress is None:
+        return
+    now = time.monotonic()
+    last = progress['last']
+    elapsed = now - last['wall']
+    steps_per_s = eta = None
+    if elapsed > 0 and step > last['step']:
+        steps_per_s = (step - last['step']) / elapsed
+        years_per_s = (model_time - last['time']) / elapsed
+        if years_per_s > 0:
+            eta = max(0., progress['total_time'] - model_time) / years_per_s
+    record = dict(progress['labels'], phase = phase, time = float(model_time), step = int(step),
+        steps_per_s = steps_per_s, eta_s = eta, rss_mb = _rss_mb(),
+        flux = None if flux is None else float(flux))
+    record.update((name, float(value)) for name, value in diagnostics.items())
+    progress['file'].write(json.dumps(record) + '\n')
+    progress['file'].flush()
+    progress['last'] = dict(wall = now, time = model_time, step = step)
+    progress['next'] = now + progress['interval']
+
+
+def close_progress(progress, model_time, step, flux = None, **diagnostics):
+    """Write a final 'done' record and close the progress file."""
+    if progress is None:
+        return
+    report_progress(progress, model_time, step, 'done', flux, **diagnostics)
+    if progress['close']:
+        progress['file'].close()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+#the model modules import each other from the model_simulations folder
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,93 @@
+######################################
+
+#Shared set-up for the regression tests: small synthetic watersheds in the
+#form load_watershed_inputs returns, and short runs of the watershed
+#scripts with some of their parameters changed
+
+######################################
+
+import os
+import re
+import numpy as np
+import pandas as pd
+
+from model_inputs import WATERSHEDS
+
+HERE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+#short runs: 8 recovery steps and 3 fast steps
+SHORT_RUN = dict(total_time = 7, recovery_period = 4)
+
+
+def synthetic_inputs(watershed, rows = 34, cols = 28, seed = 0):
+    """Inputs of a small synthetic watershed with the real climate table of watershed.
+
+    The DEM is an elliptical basin draining to one node on its lower edge,
+    with a block of mined land in the middle of the K mask; before mining
+    that block stood 5 m higher (pre_dem, for the unmined control). The climate
+    alternates by 10% from year to year, so a step that erodes with another
+    year's discharge changes the flux.
+    """
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:rows, 0:cols]
+    z = 300 + 2.0 * y + 0.5 * np.abs(x - cols / 2) + rng.random((rows, cols)) * 2
+    inside = ((y - rows / 2) / (rows / 2 - 2)) ** 2 + ((x - cols / 2) / (cols / 2 - 2)) ** 2 < 1
+    inside[:4, cols // 2] = True
+    z[~inside] = -99999
+    mask = np.zeros((rows, cols))
+    mask[(y > rows * 0.4) & (y < rows * 0.8) & (x > cols * 0.3) & (x < cols * 0.7)] = 1
+    mask[~inside] = -9999
+    grid = dict(shape = (rows, cols), xy_spacing = (10., 10.), xy_of_lower_left = (0., 0.))
+    yearly_data = pd.read_csv(os.path.join(HERE, watershed, 'inputs', 'yearly_data.csv')).to_numpy()
+    pre = np.where(mask == 1, z + 5, z)
+    inputs = dict(post_dem = z.ravel(), post_dem_grid = grid, pre_dem = pre.ravel(), pre_dem_grid = grid,
+        K_mask = mask.ravel(), K_mask_grid = grid, yearly_data = np.full(yearly_data.shape, np.nan))
+    inputs['yearly_data'][:, 2:] = yearly_data[:, 2:].astype('float') * (1 + 0.1 * (np.arange(yearly_data.shape[1] - 2) % 2))
+    return inputs
+
+
+def padded_inputs(watershed, top = 9, left = 7, right = 5):
+    """synthetic_inputs with nodata added above and beside the basin, so cropping removes it."""
+    inputs = synthetic_inputs(watershed)
+    rows, cols = inputs['post_dem_grid']['shape']
+    for name, nodata in (('post_dem', -99999), ('pre_dem', -99999), ('K_mask', -9999)):
+        inputs[name] = np.pad(inputs[name].reshape(rows, cols), ((0, top), (left, right)),
+            constant_values = nodata).ravel()
+        inputs[name + '_grid'] = dict(inputs[name + '_grid'], shape = (rows + top, cols + left + right))
+    return inputs
+
+
+def load_script(watershed, script, output_path, **params):
+    """landscape_evolution of a watershed script, with some of its parameters changed.
+
+    params replace the values of the parameter lines at the top of the
+    function (e.g. total_time = 10000). Outputs go to output_path, and the
+    result cache and progress records are off unless params turn them on.
+    """
+    filename = os.path.join(HERE, watershed, script)
+    with open(filename) as f:
+        source = f.read()
+    params = dict(dict(result_cache_dir = None, progress_interval_seconds = None), **params)
+    params['output_path'] = output_path
+    for name, value in params.items():
+        source, n = re.subn(r'^    %s = .*$' % name, '    %s = %r' % (name, value), source, count = 1, flags = re.M)
+        if n != 1:
+            raise ValueError('%s has no parameter %s' % (script, name))
+    namespace = dict(__name__ = 'script_under_test', __file__ = filename)
+    exec(compile(source, filename, 'exec'), namespace)
+    return namespace['landscape_evolution']
+
+
+def run_script(watershed, script, scenario, inputs, output_path, **params):
+    """Run a watershed script on inputs and return its flux record."""
+    output_path = os.path.join(str(output_path), '')
+    os.makedirs(output_path, exist_ok = True)
+    load_script(watershed, script, output_path, **params)(scenario, inputs)
+    prefix = script.split('_control_')[1][:-3] if '_control_' in script else None
+    run = 'control_' + prefix + '_' if prefix else 'scenario_' + str(scenario) + '_'
+    return np.loadtxt(output_path + run + 'sedflux.txt')
+
+
+def script_name(watershed, kind = '0'):
+    """File name of a watershed's script: kind is a scenario (0, 5, 10) or 'control_mined'/'control_unmined'."""
+    return WATERSHEDS[watershed]['prefix'] + ('_' if kind.startswith('control') else '') + kind + '.py'
@@ -0,0 +1,52 @@
+import os
+
+import numpy as np
+import pytest
+
+import checkpoint
+from helpers import SHORT_RUN, synthetic_inputs, load_script
+
+WATERSHED = 'white_oak'
+OUTPUTS = ['sedflux.txt', 'elev_01.asc', 'DA_01.asc', 'slope_01.asc']
+
+
+class Interrupted(Exception):
+    pass
+
+
+def run(output_path, **params):
+    os.makedirs(output_path, exist_ok = True)
+    load_script(WATERSHED, 'wo5.py', output_path, **dict(SHORT_RUN, **params))(5, synthetic_inputs(WATERSHED))
+
+
+def read_outputs(output_path):
+    return {name: np.loadtxt(output_path + 'scenario_5_' + name, skiprows = 6 if name.endswith('.asc') else 0)
+        for name in OUTPUTS}
+
+
+#stops in the recovery and in the fast phase (recovery_period is 4)
+@pytest.mark.parametrize('stop_year', [2, 5])
+@pytest.mark.parametrize('adaptive_dt', [False, True])
+def test_resumed_run_matches_an_uninterrupted_one(tmp_path, monkeypatch, stop_year, adaptive_dt):
+    reference = str(tmp_path / 'reference') + '/'
+    run(reference, adaptive_dt = adaptive_dt)
+
+    resumed = str(tmp_path / 'resumed') + '/'
+    save = checkpoint.save_checkpoint
+
+    def save_and_stop(filename, grid, timer, *args, **kwargs):
+        save(filename, grid, timer, *args, **kwargs)
+        if timer >= stop_year:
+            raise Interrupted()
+
+    monkeypatch.setattr(checkpoint, 'save_checkpoint', save_and_stop)
+    with pytest.raises(Interrupted):
+        run(resumed, adaptive_dt = adaptive_dt, checkpoint_interval_years = 1)
+    assert os.path.exists(resumed + 'scenario_5_checkpoint.npz')
+    monkeypatch.setattr(checkpoint, 'save_checkpoint', save)
+    run(resumed, adaptive_dt = adaptive_dt, checkpoint_interval_years = 1)
+    assert not os.path.exists(resumed + 'scenario_5_checkpoint.npz')
+
+    expected, outputs = read_outputs(reference), read_outputs(resumed)
+    for name in OUTPUTS:
+        np.testing.assert_array_equal(outputs[name], expected[name], err_msg = name)
@@ -0,0 +1,20 @@
+import numpy as np
+import pytest
+
+from helpers import SHORT_RUN, padded_inputs, run_script, script_name
+
+OUTPUTS = ['elev_01.asc', 'DA_01.asc', 'slope_01.asc']
+
+
+@pytest.mark.parametrize('watershed, kind', [('spruce_fork', '10'), ('ben_creek', 'control_unmined')])
+def test_cropped_run_matches_the_whole_raster(tmp_path, watershed, kind):
+    inputs = padded_inputs(watershed)
+    script = script_name(watershed, kind)
+    run = 'control_unmined_' if kind.startswith('control') else 'scenario_%s_' % kind
+    flux = {crop: run_script(watershed, script, int(kind) if kind.isdigit() else 0, inputs, tmp_path / str(crop),
+        crop_to_watershed = crop, **SHORT_RUN) for crop in (True, False)}
+    np.testing.assert_array_equal(flux[True], flux[False])
+    for name in OUTPUTS:
+        #the grids are written on the full raster extent either way
+        cropped, whole = (open(str(tmp_path / str(crop) / (run + name))).read() for crop in (True, False))
+        assert cropped == whole, name
@@ -0,0 +1,43 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from helpers import SHORT_RUN, synthetic_inputs, load_script, run_script
+from model_inputs import share_inputs, attach_inputs
+
+WATERSHED = 'spruce_fork'
+
+
+def run_on_shared_inputs(spec, scenario, output_path):
+    #what an ensemble worker does: map the shared inputs read-only and run the script on them
+    inputs, blocks = attach_inputs(spec)
+    os.makedirs(output_path)
+    load_script(WATERSHED, 'sf%d.py' % scenario, output_path, **SHORT_RUN)(scenario, inputs)
+    return np.loadtxt(output_path + 'scenario_%d_sedflux.txt' % scenario)
+
+
+def test_runs_on_shared_inputs_match_plain_runs(tmp_path):
+    inputs = synthetic_inputs(WATERSHED)
+    original = {key: np.array(value) for key, value in inputs.items()}
+    blocks, spec = share_inputs(inputs)
+    try:
+        with ProcessPoolExecutor(max_workers = 2) as pool:
+            shared = {scenario: pool.submit(run_on_shared_inputs, spec, scenario, str(tmp_path / ('shared_%d' % scenario)) + '/')
+                for scenario in (0, 10)}
+            shared = {scenario: future.result() for scenario, future in shared.items()}
+        for scenario in (0, 10):
+            plain = run_script(WATERSHED, 'sf%d.py' % scenario, scenario, inputs, tmp_path / ('plain_%d' % scenario),
+                **SHORT_RUN)
+            np.testing.assert_array_equal(shared[scenario], plain)
+        #the runs only read the shared inputs
+        attached, attached_blocks = attach_inputs(spec)
+        for key, value in original.items():
+            np.testing.assert_array_equal(attached[key], value)
+        del attached
+        for block in attached_blocks:
+            block.close()
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+from landlab import RasterModelGrid
+from scipy.signal import convolve2d
+
+from erodibility import (KERNEL_METHODS, smoothing_kernel, smooth_field, precompute_K_convolution_weights,
+    outside_K, convolved_erodibility, convolve_K_field, yearly_K_grids)
+
+
+def field(rows = 40, cols = 33, seed = 0):
+    return np.log10(np.random.default_rng(seed).uniform(1e-6, 4e-5, (rows, cols)))
+
+
+def baseline_smoothing(A, window_size, fillvalue):
+    #the K convolution of the original scripts
+    B = np.ones((window_size, window_size)) / np.power(window_size, 2)
+    return convolve2d(A, B, mode = 'same', boundary = 'fill', fillvalue = fillvalue)
+
+
+@pytest.mark.parametrize('window_size', [1, 3, 9, 21])
+@pytest.mark.parametrize('kernel, method', [(k, m) for k, methods in KERNEL_METHODS.items() for m in methods + ('auto',)])
+def test_smoothing_methods_match_the_dense_convolution(kernel, method, window_size):
+    A = field()
+    B = smoothing_kernel(kernel, window_size)
+    expected = convolve2d(A, B, mode = 'same', boundary = 'fill', fillvalue = -5.)
+    np.testing.assert_allclose(smooth_field(A, window_size, kernel, method, fillvalue = -5.), expected, rtol = 1e-12)
+
+
+def test_direct_box_is_the_baseline_convolution():
+    A = field()
+    for window_size in (2, 4, 9):
+        np.testing.assert_array_equal(smooth_field(A, window_size, 'box', 'direct', fillvalue = -5.),
+            baseline_smoothing(A, window_size, -5.))
+
+
+@pytest.mark.parametrize('window_size', [2, 6, 16])
+def test_even_windows(window_size):
+    A = field()
+    for kernel, methods in KERNEL_METHODS.items():
+        expected = convolve2d(A, smoothing_kernel(kernel, window_size), mode = 'same', boundary = 'fill', fillvalue = -5.)
+        for method in methods + ('auto',):
+            if method in ('separable', 'sat'):
+                with pytest.raises(ValueError, match = 'odd window_size'):
+                    smooth_field(A, window_size, kernel, method, fillvalue = -5.)
+            else:
+                np.testing.assert_allclose(smooth_field(A, window_size, kernel, method, fillvalue = -5.), expected,
+                    rtol = 1e-12)
+
+
+def test_precomputed_weights_match_convolving_the_K_field():
+    grid = RasterModelGrid((25, 30))
+    rng = np.random.default_rng(0)
+    grid.status_at_node[rng.random(grid.number_of_nodes) < 0.2] = grid.BC_NODE_IS_CLOSED
+    shape = (rng.random(grid.number_of_nodes) < 0.4).astype(float)
+    K_mined, K_unmined = 3e-5, 1.3e-6
+    for window_size in (3, 9):
+        K = np.where(shape == 1, K_mined, K_unmined)
+        expected = convolve_K_field(grid, K, window_size)
+        weights = precompute_K_convolution_weights(grid, shape, window_size, method = 'direct')
+        K_smoothed = convolved_erodibility(weights, K_mined, K_unmined, outside_K(K_mined, K_unmined))
+        np.testing.assert_allclose(K_smoothed, expected, rtol = 1e-12)
+
+
+def test_yearly_K_grids_match_the_dense_matrix():
+    shape = np.array([-9999, 0, 1, 1, 0, -9999, 1, 0.])
+    K_modeled, K_unmined = np.linspace(3e-5, 2e-5, 6), 1.3e-6
+    #the K_grids matrix of the original scripts
+    K_grids = np.zeros((len(shape), len(K_modeled)))
+    scape = np.zeros(len(shape))
+    for i in range(len(K_modeled)):
+        scape[shape.all() < 1 and shape.all() > -9999] = K_unmined
+        scape[shape == 1] = K_modeled[i]
+        K_grids[:, i] = scape
+    K_grid = yearly_K_grids(shape, K_modeled, K_unmined)
+    for year in (0, 0, 3, 5, 1):
+        np.testing.assert_array_equal(K_grid(year), K_grids[:, year])
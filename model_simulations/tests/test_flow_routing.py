@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+from landlab import RasterModelGrid
+from landlab.components import PriorityFloodFlowRouter
+
+import flow_routing
+from flow_routing import incremental_flow_router, incremental_routing_supported, routing_stage
+
+FIELDS = ['flow__receiver_node', 'topographic__steepest_slope', 'flow__link_to_receiver_node', 'drainage_area',
+    'flow__upstream_node_order', 'depression_free_elevation', 'flood_status_code']
+
+
+def router(seed = 0):
+    rng = np.random.default_rng(seed)
+    grid = RasterModelGrid((30, 25), xy_spacing = 10.)
+    y, x = grid.node_y, grid.node_x
+    z = grid.add_field('topographic__elevation', 0.02 * y + 0.005 * np.abs(x - 120) + rng.random(grid.number_of_nodes), at = 'node')
+    grid.set_closed_boundaries_at_grid_edges(True, True, True, False)
+    #a closed patch inside the grid, like the nodata around a watershed
+    grid.status_at_node[grid.nodes[20:24, 5:9].ravel()] = grid.BC_NODE_IS_CLOSED
+    FA = PriorityFloodFlowRouter(grid, flow_metric = 'D8', suppress_out = True)
+    FA.run_one_step()
+    return grid, z, FA
+
+
+def test_incremental_routing_matches_run_one_step():
+    grids = [router(), router()]
+    route = incremental_flow_router(grids[0][2], grids[0][0])
+    rng = np.random.default_rng(1)
+    core = grids[0][0].core_nodes
+    for step in range(30):
+        #whole-grid changes, local pits and bumps, and no change at all
+        if step % 3 == 0:
+            change = rng.random(len(core)) * 0.01
+        elif step % 3 == 1:
+            change = np.zeros(len(core))
+            change[rng.integers(len(core), size = 3)] = rng.choice([-2., 2.], size = 3)
+        else:
+            change = np.zeros(len(core))
+        for grid, z, FA in grids:
+            z[core] += change
+        route()
+        grids[1][2].run_one_step()
+        for name in FIELDS:
+            np.testing.assert_array_equal(grids[0][0].at_node[name], grids[1][0].at_node[name], err_msg = name)
+
+
+def test_unsupported_landlab_falls_back_to_run_one_step(monkeypatch):
+    grid, z, FA = router()
+    assert incremental_routing_supported(FA)
+    monkeypatch.setattr(flow_routing, 'CHECKED_LANDLAB_VERSIONS', [])
+    assert not incremental_routing_supported(FA)
+    with pytest.warns(UserWarning):
+        route = routing_stage(FA, grid, incremental = True)
+    other_grid, other_z, other_FA = router()
+    z[grid.core_nodes] += 0.5 * (grid.node_x[grid.core_nodes] > 100)
+    other_z[:] = z
+    route(2., grid.at_node['surface_water__discharge'])
+    other_FA.run_one_step()
+    np.testing.assert_array_equal(grid.at_node['drainage_area'], other_grid.at_node['drainage_area'])
+    np.testing.assert_array_equal(grid.at_node['surface_water__discharge'], 2. * other_grid.at_node['drainage_area'])
@@ -0,0 +1,33 @@
+import numpy as np
+
+from helpers import SHORT_RUN, synthetic_inputs, run_script
+from flux_log import open_flux_log, write_flux_log, close_flux_log, read_flux_log
+
+
+def test_log_of_a_run_matches_its_text_record(tmp_path):
+    flux = run_script('mud_river', 'mr5.py', 5, synthetic_inputs('mud_river'), tmp_path, flux_log_chunk = 3, **SHORT_RUN)
+    header, records = read_flux_log(str(tmp_path / 'scenario_5_sedflux.bin'))
+    assert header['complete'] and header['scenario'] == 5
+    np.testing.assert_array_equal(records['flux'], flux)
+    #half-year steps through the recovery period, then one-year steps
+    recovery = SHORT_RUN['recovery_period']
+    dt = np.r_[np.full(2 * recovery, 0.5), np.ones(SHORT_RUN['total_time'] - recovery)]
+    np.testing.assert_array_equal(records['dt'], dt)
+    np.testing.assert_array_equal(records['time'], np.cumsum(dt))
+
+
+def test_partial_log_reads_every_chunk_written(tmp_path):
+    filename = str(tmp_path / 'log.bin')
+    sed_flux, sed_flux_dt = np.arange(10.), np.full(10, 0.5)
+    log = open_flux_log(filename, dict(run = 'test'), chunk = 4)
+    #everything waiting goes out once a full chunk has built up
+    for counter, expected in [(3, 0), (4, 4), (7, 4), (9, 9)]:
+        write_flux_log(log, sed_flux, sed_flux_dt, counter)
+        header, records = read_flux_log(filename)
+        assert not header['complete'] and len(records) == expected
+    write_flux_log(log, sed_flux, sed_flux_dt, 10, flush = True)
+    close_flux_log(log, stop_time = 5.)
+    header, records = read_flux_log(filename)
+    assert header['complete'] and header['stop_time'] == 5. and header['run'] == 'test'
+    np.testing.assert_array_equal(records['flux'], sed_flux)
+    np.testing.assert_array_equal(records['time'], np.cumsum(sed_flux_dt))
@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+from landlab import RasterModelGrid
+from landlab.components import LinearDiffuser
+
+from hillslope import implicit_diffuser
+from timestepping import diffusion_stability_limit
+
+D = 0.01
+
+
+def grid(seed = 0):
+    """A rough surface with closed edges, a closed patch inside and one open outlet node."""
+    mg = RasterModelGrid((20, 16), xy_spacing = 10.)
+    z = mg.add_field('topographic__elevation', np.random.default_rng(seed).random(mg.number_of_nodes) * 5 + 0.01 * mg.node_y,
+        at = 'node')
+    mg.set_closed_boundaries_at_grid_edges(True, True, True, True)
+    mg.status_at_node[mg.nodes[10:13, 4:7].ravel()] = mg.BC_NODE_IS_CLOSED
+    mg.status_at_node[mg.nodes[0, 8]] = mg.BC_NODE_IS_FIXED_VALUE
+    return mg, z
+
+
+def explicit_tendency(z):
+    #one tiny explicit step is exactly z + dt * L z, so this is L z as LinearDiffuser has it
+    mg, surface = grid()
+    surface[:] = z
+    dt = 1e-3
+    LinearDiffuser(mg, linear_diffusivity = D).run_one_step(dt)
+    return (surface - z) / dt
+
+
+@pytest.mark.parametrize('method', ['direct', 'cg'])
+def test_implicit_step_solves_backward_euler_with_the_explicit_operator(method):
+    mg, z = grid()
+    before = z.copy()
+    dt = 50 * diffusion_stability_limit(mg, D)
+    implicit_diffuser(mg, D, method, tolerance = 1e-12)(dt)
+    core = mg.core_nodes
+    np.testing.assert_allclose((z[core] - before[core]) / dt, explicit_tendency(z)[core], rtol = 1e-6, atol = 1e-12)
+    #nodes that are not core are left alone
+    np.testing.assert_array_equal(z[mg.status_at_node != mg.BC_NODE_IS_CORE], before[mg.status_at_node != mg.BC_NODE_IS_CORE])
+
+
+def test_implicit_steps_follow_explicit_diffusion_at_small_dt():
+    (mg_explicit, z_explicit), (mg_implicit, z_implicit) = grid(), grid()
+    dt = 0.1 * diffusion_stability_limit(mg_explicit, D)
+    LD = LinearDiffuser(mg_explicit, linear_diffusivity = D)
+    diffuse = implicit_diffuser(mg_implicit, D)
+    for step in range(20):
+        LD.run_one_step(dt)
+        diffuse(dt)
+    change = np.abs(z_explicit - grid()[1]).max()
+    assert np.abs(z_implicit - z_explicit).max() < 0.05 * change
+
+
+def test_cg_matches_direct_and_long_steps_stay_bounded():
+    (mg_direct, z_direct), (mg_cg, z_cg) = grid(), grid()
+    dt = 1000 * diffusion_stability_limit(mg_direct, D)
+    direct, cg = implicit_diffuser(mg_direct, D, 'direct'), implicit_diffuser(mg_cg, D, 'cg', tolerance = 1e-10)
+    core = mg_direct.core_nodes
+    low, high = z_direct[core].min(), z_direct[core].max()
+    for step in range(3):
+        direct(dt)
+        cg(dt)
+    np.testing.assert_allclose(z_cg, z_direct, rtol = 0, atol = 1e-8)
+    #backward Euler smooths without overshooting, unlike an explicit step this long
+    assert low - 1e-9 <= z_direct[core].min() and z_direct[core].max() <= high + 1e-9
@@ -0,0 +1,38 @@
+import os
+
+import numpy as np
+
+from helpers import HERE
+from k_trajectory import (FIG5_K_MIN, FIG5_K_MAX, gully_K_ratio, k_trajectory, recovery_fraction, trajectory_series,
+    trajectory_minimum, save_k_trajectory, load_k_trajectory)
+
+
+def test_whole_scenarios_match_the_k_table():
+    table = np.loadtxt(os.path.join(HERE, 'ben_creek', 'inputs', 'K_timeseries_scaled_CMS.txt'))
+    trajectory = k_trajectory(n_years = len(table))
+    #to rounding: t**0.25 differs in the last bits between numpy builds
+    for scenario in range(table.shape[1]):
+        np.testing.assert_allclose(trajectory_series(trajectory, recovery_fraction(scenario)), table[:, scenario],
+            rtol = 1e-14, atol = 0)
+    np.testing.assert_allclose(trajectory_minimum(trajectory), table.min(), rtol = 1e-14, atol = 0)
+
+
+def test_fractional_scenarios_lie_between_the_columns():
+    trajectory = k_trajectory()
+    assert recovery_fraction(3) == np.arange(0, 1.1, 0.1)[3] != 0.3
+    assert recovery_fraction(2.5) == 0.25
+    lower, middle, upper = (trajectory_series(trajectory, recovery_fraction(s)) for s in (2, 2.5, 3))
+    assert np.all(upper <= middle) and np.all(middle <= lower)
+
+
+def test_k_max_keeps_the_gully_ratio():
+    #FIG5_K_MAX is a copy of fig5.py's Kmax
+    np.testing.assert_allclose(FIG5_K_MAX, FIG5_K_MIN * gully_K_ratio(), rtol = 1e-14, atol = 0)
+
+
+def test_saved_trajectories_load_the_same(tmp_path):
+    trajectory = k_trajectory(K_max = 2e-5, recovery_period = 150, exponent = 0.5, n_years = 300)
+    save_k_trajectory(str(tmp_path / 'trajectory.npz'), trajectory)
+    loaded = load_k_trajectory(str(tmp_path / 'trajectory.npz'))
+    assert loaded == trajectory
+    np.testing.assert_array_equal(trajectory_series(loaded, 0.5), trajectory_series(trajectory, 0.5))
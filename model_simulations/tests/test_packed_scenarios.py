@@ -0,0 +1,58 @@
+import os
+import json
+
+import numpy as np
+import pytest
+
+from helpers import HERE, SHORT_RUN, synthetic_inputs, run_script, script_name
+from model_inputs import WATERSHEDS
+from landlab import RasterModelGrid
+from flux_log import read_flux_log
+from packed_scenarios import pack_grid, run_packed, set_up_packed
+
+
+@pytest.mark.parametrize('watershed', sorted(WATERSHEDS))
+def test_packed_run_matches_scripts(watershed, tmp_path):
+    #the packed run smooths K with the precomputed mask weights
+    inputs = synthetic_inputs(watershed)
+    (tmp_path / 'packed').mkdir()
+    run_packed(os.path.join(HERE, watershed), watershed, [0, 5], str(tmp_path / 'packed') + '/', inputs,
+        profile_steps = False, progress_interval_seconds = None, **SHORT_RUN)
+    for scenario in (0, 5):
+        standalone = run_script(watershed, script_name(watershed, str(scenario)), scenario, inputs,
+            tmp_path / ('script_%d' % scenario), K_convolution_method = 'precomputed', **SHORT_RUN)
+        packed = np.loadtxt(str(tmp_path / 'packed' / ('scenario_%d_sedflux.txt' % scenario)))
+        np.testing.assert_array_equal(packed, standalone)
+        #the file names are the scripts', so the outputs say how K was smoothed
+        header = read_flux_log(str(tmp_path / 'packed' / ('scenario_%d_sedflux.bin' % scenario)))[0]
+        assert header['params']['K_convolution_method'] == 'precomputed'
+        with open(str(tmp_path / 'packed' / ('scenario_%d_summary.json' % scenario))) as f:
+            assert json.load(f)['K_convolution_method'] == 'precomputed'
+
+
+def test_packed_runs_only_smooth_K_once():
+    with pytest.raises(ValueError, match = 'precomputed'):
+        set_up_packed(os.path.join(HERE, 'ben_creek'), 'ben_creek', [0], synthetic_inputs('ben_creek'),
+            K_convolution_method = 'direct')
+
+
+def test_gutters_hold_soil_like_closed_nodes():
+    #a gutter with zero bedrock would have -99999 m of soil
+    grid = RasterModelGrid((4, 5))
+    grid.add_zeros('topographic__elevation', at = 'node')
+    grid.add_field('soil__depth', np.full(grid.number_of_nodes, 500.), at = 'node')
+    grid.add_field('bedrock__elevation', grid.at_node['topographic__elevation'] - 500., at = 'node')
+    grid.set_closed_boundaries_at_grid_edges(True, True, True, True)
+    packed, blocks = pack_grid(grid, 2, 2, gutter = 3)
+    gutter = np.setdiff1d(np.arange(packed.number_of_nodes), blocks['nodes'])
+    assert len(gutter) == 3 * 4
+    np.testing.assert_array_equal(packed.at_node['topographic__elevation'][gutter], -99999.)
+    np.testing.assert_array_equal(packed.at_node['soil__depth'][gutter], 500.)
+    np.testing.assert_array_equal(packed.at_node['bedrock__elevation'][gutter], -99999. - 500.)
+
+
+def test_climate_rows_match_scripts():
+    #each script picks its watershed's row of yearly_data.csv itself
+    for watershed, files in WATERSHEDS.items():
+        with open(os.path.join(HERE, watershed, script_name(watershed))) as f:
+            assert 'climate_data[%d,2:]' % files['climate_row'] in f.read()
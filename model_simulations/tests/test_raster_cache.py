@@ -0,0 +1,63 @@
+import os
+import json
+
+import numpy as np
+from landlab.io import read_esri_ascii
+
+import raster_cache
+from raster_cache import cache_files, read_raster, raster_array
+
+
+def write_asc(filename, seed):
+    """A 12 x 9 DEM with a row of nodata, with the six header lines of the input rasters."""
+    z = np.random.default_rng(seed).random((12, 9)) * 100
+    z[-1] = -99999
+    header = 'ncols 9\nnrows 12\nxllcorner 500.0\nyllcorner 2000.0\ncellsize 10.0\nNODATA_value -99999\n'
+    with open(filename, 'w') as f:
+        f.write(header)
+        np.savetxt(f, z)
+
+
+def test_cached_reads_match_the_text(tmp_path):
+    filename = str(tmp_path / 'dem.asc')
+    write_asc(filename, 0)
+    for read in range(2):
+        grid, values = read_raster(filename, 'topographic__elevation')
+        expected_grid, expected = read_esri_ascii(filename, name = 'topographic__elevation')
+        assert all(os.path.exists(f) for f in cache_files(filename))
+        np.testing.assert_array_equal(values, expected)
+        assert grid.shape == expected_grid.shape and grid.dx == expected_grid.dx
+        np.testing.assert_array_equal(grid.xy_of_lower_left, expected_grid.xy_of_lower_left)
+        #the field is the grid's own copy, not the read-only cache
+        values[0] = 1.
+    np.testing.assert_array_equal(raster_array(filename), np.loadtxt(filename, skiprows = 6))
+
+
+def test_cache_is_rebuilt_when_the_text_changes(tmp_path):
+    filename = str(tmp_path / 'dem.asc')
+    write_asc(filename, 0)
+    read_raster(filename)
+    write_asc(filename, 1)
+    grid, values = read_raster(filename)
+    np.testing.assert_array_equal(values, read_esri_ascii(filename)[1])
+
+
+def test_unchanged_text_is_not_hashed_again(tmp_path, monkeypatch):
+    filename = str(tmp_path / 'dem.asc')
+    write_asc(filename, 0)
+    read_raster(filename)
+    hashed = []
+    checksum = raster_cache.source_checksum
+    monkeypatch.setattr(raster_cache, 'source_checksum', lambda f: hashed.append(f) or checksum(f))
+    read_raster(filename)
+    assert hashed == []
+    #a touched file with the same text is hashed once, and keeps its cache
+    npy_time = os.stat(cache_files(filename)[0]).st_mtime_ns
+    os.utime(filename, ns = (0, 0))
+    for read in range(2):
+        grid, values = read_raster(filename)
+    assert hashed == [filename]
+    assert os.stat(cache_files(filename)[0]).st_mtime_ns == npy_time
+    with open(cache_files(filename)[1]) as f:
+        assert json.load(f)['mtime_ns'] == 0
+    np.testing.assert_array_equal(values, read_esri_ascii(filename)[1])
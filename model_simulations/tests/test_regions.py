@@ -0,0 +1,23 @@
+import numpy as np
+from landlab import RasterModelGrid
+
+from helpers import synthetic_inputs
+from regions import region_index
+
+
+def test_regions_match_the_grid():
+    inputs = synthetic_inputs('ben_creek')
+    mg = RasterModelGrid(inputs['post_dem_grid']['shape'], xy_spacing = 10.)
+    z = mg.add_field('topographic__elevation', inputs['post_dem'].copy(), at = 'node')
+    outlet_node = mg.set_watershed_boundary_condition(z, nodata_value = -99999, return_outlet_id = True)
+    shape = inputs['K_mask']
+    regions = region_index(mg, shape, outlet_node)
+    #what the original scripts looked up every step
+    np.testing.assert_array_equal(regions['closed'], mg.closed_boundary_nodes)
+    np.testing.assert_array_equal(regions['core'], mg.core_nodes)
+    np.testing.assert_array_equal(regions['outlet'], outlet_node)
+    np.testing.assert_array_equal(regions['mined'], np.flatnonzero(shape == 1))
+    np.testing.assert_array_equal(np.union1d(regions['mined'], regions['unmined']), np.arange(mg.number_of_nodes))
+    for ids in regions.values():
+        assert ids.flags.writeable
+        assert np.all(np.diff(ids) > 0)
@@ -0,0 +1,46 @@
+import os
+
+import numpy as np
+
+from helpers import HERE, SHORT_RUN, synthetic_inputs, run_script, script_name
+from result_cache import model_code_files
+
+OUTPUTS = ['sedflux.txt', 'sedflux.bin', 'elev_01.asc', 'summary.json']
+
+
+def read_outputs(output_path):
+    outputs = {}
+    for name in OUTPUTS:
+        with open(os.path.join(str(output_path), 'scenario_5_' + name), 'rb') as f:
+            outputs[name] = f.read()
+    return outputs
+
+
+def test_identical_run_is_copied_and_a_changed_one_is_not(tmp_path, capsys):
+    inputs = synthetic_inputs('laurel_creek')
+    cache_dir = str(tmp_path / 'cache') + '/'
+    params = dict(SHORT_RUN, result_cache_dir = cache_dir)
+    first = run_script('laurel_creek', 'lc5.py', 5, inputs, tmp_path / 'first', **params)
+    assert len(os.listdir(cache_dir)) == 1
+    capsys.readouterr()
+    second = run_script('laurel_creek', 'lc5.py', 5, inputs, tmp_path / 'second', **params)
+    assert 'copied from the result cache' in capsys.readouterr().out
+    np.testing.assert_array_equal(second, first)
+    assert read_outputs(tmp_path / 'second') == read_outputs(tmp_path / 'first')
+
+    changed = run_script('laurel_creek', 'lc5.py', 5, inputs, tmp_path / 'changed', BL_lowering_rate = 0.05, **params)
+    assert 'copied from the result cache' not in capsys.readouterr().out
+    assert len(os.listdir(cache_dir)) == 2
+    assert not np.array_equal(changed, first)
+
+
+def test_keys_hash_only_the_code_a_script_runs():
+    script = os.path.join(HERE, 'laurel_creek', script_name('laurel_creek', '5'))
+    files = [os.path.basename(f) for f in model_code_files(script)]
+    assert files[0] == os.path.basename(script)
+    assert {'erodibility.py', 'model_inputs.py', 'k_trajectory.py', 'snapshots.py'} <= set(files)
+    for unused in ('benchmark.py', 'step_allocations.py', 'scenario_tree.py', 'packed_scenarios.py', 'helpers.py'):
+        assert unused not in files
+    #scenario trees reach the model modules through packed_scenarios
+    tree_files = [os.path.basename(f) for f in model_code_files(os.path.join(HERE, 'scenario_tree.py'))]
+    assert {'packed_scenarios.py', 'erodibility.py', 'k_trajectory.py'} <= set(tree_files)
@@ -0,0 +1,33 @@
+import numpy as np
+
+from run_summary import open_run_summary, add_to_summary, write_run_summary, read_run_summary
+
+
+def test_summary_built_as_the_run_goes_matches_the_whole_record(tmp_path):
+    rng = np.random.default_rng(0)
+    dt = np.r_[np.full(40, 0.5), np.ones(30), np.full(10, 3.)]
+    flux = rng.random(len(dt))
+    milestones, cell_area = [0, 5, 20, 50, 80, 1000], 100.
+    summary = open_run_summary(milestones, cell_area)
+    #fed in uneven chunks, as the flux log flushes
+    for counter in [3, 3, 17, 40, 41, 66, len(dt)]:
+        add_to_summary(summary, flux, dt, counter)
+    write_run_summary(summary, str(tmp_path / 'summary.json'), run = 'test')
+    record = read_run_summary(str(tmp_path / 'summary.json'))
+
+    #the same numbers from the whole record at the end of the run
+    start = np.r_[0, np.cumsum(dt)[:-1]]
+    end = np.cumsum(dt)
+    assert record['run'] == 'test' and record['time'] == end[-1] and record['records'] == len(dt)
+    np.testing.assert_allclose(record['exported_volume_m3'], np.sum(flux * dt) * cell_area, rtol = 1e-12)
+    peak = np.argmax(flux)
+    assert record['peak_year'] == end[peak] and record['peak_flux_m3_per_yr'] == flux[peak] * cell_area
+    assert list(record['milestones']) == ['0', '5', '20', '50', '80']
+    #the flux of the step the run was in at a year (the one starting there, if any)
+    at = lambda year: flux[np.flatnonzero(start <= year)[-1]]
+    for year in [0, 5, 20, 50, 80]:
+        milestone = record['milestones']['%g' % year]
+        exported = np.sum(flux * np.clip(year - start, 0, dt))
+        np.testing.assert_allclose(milestone['exported_volume_m3'], exported * cell_area, rtol = 1e-12, atol = 1e-12)
+        assert milestone['flux_m3_per_yr'] == at(year) * cell_area
+    np.testing.assert_allclose(record['flux_change_percent']['5-50'], (at(50) - at(5)) / at(5) * 100, rtol = 1e-12)
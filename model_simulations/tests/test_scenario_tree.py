@@ -0,0 +1,84 @@
+import os
+
+import numpy as np
+import pytest
+
+from helpers import HERE, SHORT_RUN, synthetic_inputs, run_script, script_name
+from scenario_tree import run_tree
+
+WATERSHED = 'mud_river'
+
+
+@pytest.fixture(scope = 'module')
+def inputs():
+    return synthetic_inputs(WATERSHED)
+
+
+@pytest.fixture(scope = 'module')
+def standalone(inputs, tmp_path_factory):
+    #the trees smooth K with the precomputed mask weights, as packed runs do
+    path = tmp_path_factory.mktemp('scripts')
+    return {scenario: run_script(WATERSHED, script_name(WATERSHED, str(scenario)), scenario, inputs,
+        path, K_convolution_method = 'precomputed', **SHORT_RUN) for scenario in (0, 5)}
+
+
+def tree(until):
+    #the unchanged branch runs last, so with one worker it starts from a restored snapshot
+    return dict(name = 'root', scenarios = [0, 5], until = until,
+        params = dict(SHORT_RUN, progress_interval_seconds = None),
+        children = [dict(name = 'lowering', BL_lowering_rate = 0.05), dict(name = 'base')])
+
+
+#forks in the recovery and the fast phase (recovery_period is 4)
+@pytest.mark.parametrize('until', [2, 5])
+@pytest.mark.parametrize('workers', [1, 2])
+def test_unchanged_branch_matches_scripts(inputs, standalone, tmp_path, until, workers):
+    output_path = str(tmp_path) + '/'
+    run_tree(os.path.join(HERE, WATERSHED), WATERSHED, tree(until), output_path, inputs, workers = workers)
+    for scenario in (0, 5):
+        base = np.loadtxt(output_path + 'root_base_scenario_%d_sedflux.txt' % scenario)
+        np.testing.assert_array_equal(base, standalone[scenario])
+        lowering = np.loadtxt(output_path + 'root_lowering_scenario_%d_sedflux.txt' % scenario)
+        #the branches share the prefix (half-year steps in recovery, then
+        #one-year steps) and differ after the fork
+        recovery = SHORT_RUN['recovery_period']
+        n = int(2 * until) if until <= recovery else 2 * recovery + until - recovery
+        np.testing.assert_array_equal(lowering[:n], base[:n])
+        assert not np.array_equal(lowering[n:], base[n:])
+
+
+@pytest.mark.parametrize('until', [2, 5])
+def test_saved_fork_point_is_reused(inputs, standalone, tmp_path, until):
+    fork_dir = str(tmp_path / 'forks')
+    for i in range(2):
+        output_path = str(tmp_path / str(i)) + '/'
+        os.makedirs(output_path)
+        run_tree(os.path.join(HERE, WATERSHED), WATERSHED, tree(until), output_path, inputs, fork_dir = fork_dir)
+        assert len(os.listdir(fork_dir)) == 1
+        for scenario in (0, 5):
+            base = np.loadtxt(output_path + 'root_base_scenario_%d_sedflux.txt' % scenario)
+            np.testing.assert_array_equal(base, standalone[scenario])
+
+
+def test_recovery_forks_can_change_climate_and_scenarios(inputs, tmp_path):
+    output_path = str(tmp_path) + '/'
+    tree = dict(name = 'root', scenarios = [0, 5], until = 2, params = dict(SHORT_RUN, progress_interval_seconds = None),
+        children = [dict(name = 'base'), dict(name = 'wet', precip_scale = 3.0), dict(name = 'late10', scenarios = [10, 10])])
+    run_tree(os.path.join(HERE, WATERSHED), WATERSHED, tree, output_path, inputs)
+    for scenario in (0, 5):
+        base = np.loadtxt(output_path + 'root_base_scenario_%d_sedflux.txt' % scenario)
+        for name in ('wet', 'late10'):
+            changed = np.loadtxt(output_path + 'root_%s_scenario_%d_sedflux.txt' % (name, scenario))
+            np.testing.assert_array_equal(changed[:4], base[:4])
+            assert not np.array_equal(changed[4:], base[4:])
+
+
+#the fast phase erodes with the discharge and K of the end of recovery (recovery_period is 4)
+@pytest.mark.parametrize('until, child', [(5, dict(name = 'wet', precip_scale = 3.0)), (3.5, dict(name = 'wet', precip_scale = 3.0)),
+    (4, dict(name = 'late10', scenarios = [10, 10])), (2, dict(name = 'fast', until = 5, children = [dict(name = 'wet', precip_scale = 3.0)]))])
+def test_forks_after_recovery_cannot_change_climate_or_scenarios(inputs, tmp_path, until, child):
+    tree = dict(name = 'root', scenarios = [0, 5], until = until, params = dict(SHORT_RUN, progress_interval_seconds = None),
+        children = [dict(name = 'base'), child])
+    with pytest.raises(ValueError, match = 'no effect'):
+        run_tree(os.path.join(HERE, WATERSHED), WATERSHED, tree, str(tmp_path) + '/', inputs)
+    assert os.listdir(str(tmp_path)) == []
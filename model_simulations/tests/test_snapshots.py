@@ -0,0 +1,46 @@
+import json
+
+import numpy as np
+
+from helpers import SHORT_RUN, synthetic_inputs, padded_inputs, run_script
+from snapshots import snapshot, snapshot_index, snapshot_series
+
+WATERSHED = 'laurel_creek'
+
+
+def test_cropped_snapshots_read_on_the_full_raster(tmp_path):
+    inputs = padded_inputs(WATERSHED)
+    cubes = {}
+    for crop in (True, False):
+        output_path = tmp_path / str(crop)
+        run_script(WATERSHED, 'lc5.py', 5, inputs, output_path, crop_to_watershed = crop, snapshot_interval = 2,
+            **SHORT_RUN)
+        cubes[crop] = str(output_path / 'scenario_5_snapshots')
+    index = snapshot_index(cubes[True])
+    assert index['full_shape'] == list(inputs['post_dem_grid']['shape'])
+    assert index['shape'] != index['full_shape'] and index['crop_origin'] != [0, 0]
+    r0, c0 = index['crop_origin']
+    rows, cols = index['shape']
+    for field in ('topographic__elevation', 'soil__depth', 'erosion'):
+        times, cropped = snapshot_series(cubes[True], field, full_grid = True)
+        full_times, full = snapshot_series(cubes[False], field)
+        np.testing.assert_array_equal(times, full_times)
+        inside = np.zeros(full.shape[1:], dtype = bool)
+        inside[r0:r0 + rows, c0:c0 + cols] = True
+        assert np.isnan(cropped[:, ~inside]).all()
+        np.testing.assert_array_equal(cropped[:, inside], full[:, inside])
+        #a window across the crop's edge
+        window = (r0 + rows - 3, r0 + rows + 2, c0 - 2, c0 + 4)
+        np.testing.assert_array_equal(snapshot(cubes[True], field, times[-1], window, full_grid = True),
+            cropped[-1, window[0]:window[1], window[2]:window[3]])
+
+
+def test_cubes_without_crop_origin_read_as_uncropped(tmp_path):
+    run_script(WATERSHED, 'lc5.py', 5, synthetic_inputs(WATERSHED), tmp_path, crop_to_watershed = False,
+        snapshot_interval = 2, **SHORT_RUN)
+    name = str(tmp_path / 'scenario_5_snapshots')
+    index = snapshot_index(name)
+    del index['crop_origin'], index['full_shape']
+    with open(name + '.json', 'w') as f:
+        json.dump(index, f)
+    np.testing.assert_array_equal(snapshot(name, 'soil__depth', 4, full_grid = True), snapshot(name, 'soil__depth', 4))
@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+from landlab import RasterModelGrid
+from landlab.components import PriorityFloodFlowRouter, SpaceLargeScaleEroder, LinearDiffuser
+
+from helpers import synthetic_inputs
+from flow_routing import routing_stage
+
+SPACE_PARAMS = dict(K_br = 0, F_f = 0, phi = 0.3, H_star = 1., v_s = 0.01, m_sp = 0.5, n_sp = 1, sp_crit_sed = 0,
+    sp_crit_br = 0, erode_flooded_nodes = False)
+DT = 0.5
+#K and precipitation change every step, so a step that used another step's values would show
+K = [3e-5, 2e-5, 2.5e-5, 1.5e-5, 3e-5, 1e-5]
+PRECIP = [1.1, 1.3, 0.9, 1.2, 1.0, 1.4]
+
+
+def watershed():
+    """Grid, router and diffuser set up as in the scripts."""
+    inputs = synthetic_inputs('ben_creek')
+    mg = RasterModelGrid(inputs['post_dem_grid']['shape'], xy_spacing = 10.)
+    z = mg.add_field('topographic__elevation', inputs['post_dem'].copy(), at = 'node')
+    mg.set_closed_boundaries_at_grid_edges(True, True, True, True)
+    mg.set_nodata_nodes_to_closed(z, -99999)
+    outlet = mg.set_watershed_boundary_condition(z, nodata_value = -99999, return_outlet_id = True)
+    mg.add_zeros('soil__depth', at = 'node')
+    mg.at_node['soil__depth'] += 500
+    mg.add_zeros('bedrock__elevation', at = 'node')
+    mg.at_node['bedrock__elevation'] = z - mg.at_node['soil__depth']
+    FA = PriorityFloodFlowRouter(mg, flow_metric = 'D8', suppress_out = True)
+    FA.run_one_step()
+    mg.at_node['surface_water__discharge'] = mg.at_node['drainage_area'] * PRECIP[0]
+    mined = inputs['K_mask'] == 1
+    return mg, FA, LinearDiffuser(mg, linear_diffusivity = 3e-3), outlet, mined
+
+
+def end_of_step(mg, LD, outlet):
+    LD.run_one_step(dt = DT)
+    mg.at_node['topographic__elevation'][outlet] -= 2.7e-5 * DT
+    mg.at_node['soil__depth'] = mg.at_node['topographic__elevation'] - mg.at_node['bedrock__elevation']
+
+
+def rebuilt_every_step():
+    #the recovery step of the original scripts
+    mg, FA, LD, outlet, mined = watershed()
+    for k, precip in zip(K, PRECIP):
+        mg.at_node['erodibility'] = np.where(mined, k, 1.3e-6)
+        SPACE = SpaceLargeScaleEroder(mg, K_sed = mg.at_node['erodibility'], **SPACE_PARAMS)
+        FA.run_one_step()
+        FA.remove_depressions()
+        mg.at_node['flood_status_code'] = np.where(mg.at_node['depression_free_elevation'] == mg.at_node['topographic__elevation'], 0, 3)
+        mg.at_node['surface_water__discharge'] = mg.at_node['drainage_area'] * precip
+        SPACE.run_one_step(dt = DT)
+        end_of_step(mg, LD, outlet)
+    return mg.at_node['topographic__elevation']
+
+
+def built_once(incremental):
+    #the recovery step of the scripts now
+    mg, FA, LD, outlet, mined = watershed()
+    mg.add_zeros('erodibility', at = 'node')
+    SPACE = SpaceLargeScaleEroder(mg, K_sed = mg.at_node['erodibility'], **SPACE_PARAMS)
+    space_discharge = mg.at_node['surface_water__discharge']
+    mg.at_node['surface_water__discharge'] = space_discharge.copy()
+    route_flow = routing_stage(FA, mg, incremental)
+    for k, precip in zip(K, PRECIP):
+        mg.at_node['erodibility'] = np.where(mined, k, 1.3e-6)
+        SPACE.K_sed = mg.at_node['erodibility']
+        route_flow(precip, mg.at_node['surface_water__discharge'])
+        SPACE.run_one_step(dt = DT)
+        space_discharge[:] = mg.at_node['surface_water__discharge']
+        end_of_step(mg, LD, outlet)
+    return mg.at_node['topographic__elevation']
+
+
+@pytest.mark.parametrize('incremental', [True, False])
+def test_one_SPACE_for_the_recovery_matches_one_per_step(incremental):
+    np.testing.assert_array_equal(built_once(incremental), rebuilt_every_step())
@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+
+from steady_state import flux_has_settled
+
+
+def settled_over_whole_record(sed_flux, sed_flux_dt, counter, window, tolerance):
+    #the check as first written, with the time of every step summed from the start
+    t = np.cumsum(sed_flux_dt[:counter])
+    if t[-1] < 2 * window:
+        return False
+    last = t > t[-1] - window
+    previous = (t > t[-1] - 2 * window) & ~last
+    mean_last = np.average(sed_flux[:counter][last], weights = sed_flux_dt[:counter][last])
+    mean_previous = np.average(sed_flux[:counter][previous], weights = sed_flux_dt[:counter][previous])
+    if mean_previous == 0:
+        return mean_last == 0
+    return abs(mean_last - mean_previous) / abs(mean_previous) < tolerance
+
+
+@pytest.mark.parametrize('steps', ['recovery then fast', 'random', 'growing'])
+def test_trailing_windows_match_the_whole_record(steps):
+    rng = np.random.default_rng(0)
+    dt = {'recovery then fast': np.r_[np.full(400, 0.5), np.ones(3000)],
+        'random': rng.uniform(0.1, 3, 3000),
+        'growing': np.r_[np.full(400, 0.5), np.ones(500), 2 ** np.arange(5.), np.full(300, 16.)]}[steps]
+    flux = np.exp(-np.cumsum(dt) / 1500) * (1 + 0.001 * rng.random(len(dt)))
+    flux[-200:] = 0
+    for window in (50, 500):
+        for tolerance in (0.01, 0.05):
+            for counter in range(1, len(dt) + 1, 7):
+                assert flux_has_settled(flux, dt, counter, window, tolerance) == \
+                    settled_over_whole_record(flux, dt, counter, window, tolerance)
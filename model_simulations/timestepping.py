@@ -0,0 +1,38 @@
+######################################
+
+#Adaptive timestep control for the post-recovery phase of the landscape
+#evolution scripts in each watershed folder
+
+#Please cite Bower et al., in review
+
+######################################
+
+import numpy as np
+
+
+def diffusion_stability_limit(grid, D, CFL = 0.2):
+    """Longest step LinearDiffuser takes without substepping internally.
+
+    LinearDiffuser is explicit and splits any longer step into substeps of
+    this length, so stepping past it buys nothing for the hillslope stage.
+    """
+    return CFL * np.min(grid.length_of_link) ** 2 / D
+
+
+def next_timestep(dt, max_dz, max_dz_allowed, dt_min, dt_max, time_left, max_growth = 2.):
+    """Timestep for the next post-recovery step.
+
+    Scales the last step so that the largest elevation change at any core
+    node would be max_dz_allowed at the current rate of change, growing by
+    at most max_growth per step and shrinking as fast as the rate speeds
+    up. Steps are whole multiples of dt_min, so the forcing (indexed by
+    year) and checkpoints (written on whole years) stay on the same time
+    axis as the fixed-step runs, and the last step lands on total_time.
+    """
+    if max_dz > 0:
+        dt_new = min(dt * max_growth, max_dz_allowed * dt / max_dz)
+    else:
+        dt_new = dt * max_growth
+    dt_new = min(dt_new, dt_max)
+    dt_new = max(dt_min, np.floor(dt_new / dt_min) * dt_min)
+    return min(dt_new, time_left)